@@ -26,9 +26,16 @@ for /f "tokens=5" %%a in ('netstat -aon ^| findstr :5000') do taskkill /f /pid %
 
 echo [3/3] Lanzando Servidor y Aplicacion...
 set PORT=5000
-start "RPK_SIM_LOCAL" /B "%PYTHON_LOCAL%" -m uvicorn backend.api.server:app --host 127.0.0.1 --port %PORT%
+:: RPK_WORKERS=N arranca N procesos que comparten el maestro
+if not defined RPK_WORKERS set RPK_WORKERS=1
+start "RPK_SIM_LOCAL" /B "%PYTHON_LOCAL%" -m uvicorn backend.api.server:app --host 127.0.0.1 --port %PORT% --workers %RPK_WORKERS%
 
-timeout /t 3 >nul
+:: Esperar a que el servidor haya cargado el maestro (/ready), como mucho 60 s
+for /l %%i in (1,1,60) do (
+    curl -s -f http://127.0.0.1:%PORT%/ready >nul 2>&1 && goto :servidor_listo
+    timeout /t 1 >nul
+)
+:servidor_listo
 start "" "http://127.0.0.1:%PORT%"
 
 echo.
@@ -21,6 +21,12 @@ for /f "tokens=5" %%a in ('netstat -aon ^| findstr :5000') do taskkill /f /pid %
 
 echo Lanzando servidor en puerto 5000...
 set PORT=5000
-"%PYTHON_PORTABLE%" -m uvicorn backend.api.server:app --host 0.0.0.0 --port %PORT% --reload
+:: RPK_WORKERS=N arranca N procesos que comparten el maestro (sin recarga automatica del codigo)
+if not defined RPK_WORKERS set RPK_WORKERS=1
+if "%RPK_WORKERS%"=="1" (
+    "%PYTHON_PORTABLE%" -m uvicorn backend.api.server:app --host 0.0.0.0 --port %PORT% --reload
+) else (
+    "%PYTHON_PORTABLE%" -m uvicorn backend.api.server:app --host 0.0.0.0 --port %PORT% --workers %RPK_WORKERS%
+)
 
 pause
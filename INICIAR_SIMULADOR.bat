@@ -20,10 +20,17 @@ if not exist "%PYTHON_PORTABLE%" (
 echo [2/3] Iniciando Servidor API en segundo plano...
 :: Usamos port 5000 estandarizado para la V2
 set PORT=5000
-start "RPK_PRENSAS_SERVER_V2" /B "%PYTHON_PORTABLE%" -m uvicorn backend.api.server:app --host 0.0.0.0 --port %PORT%
+:: RPK_WORKERS=N arranca N procesos que comparten el maestro
+if not defined RPK_WORKERS set RPK_WORKERS=1
+start "RPK_PRENSAS_SERVER_V2" /B "%PYTHON_PORTABLE%" -m uvicorn backend.api.server:app --host 0.0.0.0 --port %PORT% --workers %RPK_WORKERS%
 
 echo [3/3] Abriendo interfaz en el navegador...
-timeout /t 3 >nul
+:: Esperar a que el servidor haya cargado el maestro (/ready), como mucho 60 s
+for /l %%i in (1,1,60) do (
+    curl -s -f http://localhost:%PORT%/ready >nul 2>&1 && goto :servidor_listo
+    timeout /t 1 >nul
+)
+:servidor_listo
 start "" "http://localhost:%PORT%"
 
 echo.
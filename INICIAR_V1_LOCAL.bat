@@ -24,7 +24,12 @@ echo [2/2] Lanzando V1 Clasico en puerto 8000...
 set PORT=8000
 start "RPK_V1_CLASICO" /B "%PYTHON_LOCAL%" -m uvicorn backend.api.server:app --host 127.0.0.1 --port %PORT%
 
-timeout /t 3 >nul
+:: Esperar a que el servidor responda (la V1 no tiene /ready, solo /health), como mucho 60 s
+for /l %%i in (1,1,60) do (
+    curl -s -f http://127.0.0.1:%PORT%/health >nul 2>&1 && goto :servidor_listo
+    timeout /t 1 >nul
+)
+:servidor_listo
 start "" "http://127.0.0.1:%PORT%"
 
 echo ✅ Proceso completado.
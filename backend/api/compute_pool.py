@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ComputePoolFull(Exception):
+    """No quedan huecos en el pool de cálculo ni en su cola de espera."""
+
+
+class ComputePool:
+    """
+    Pool acotado para el trabajo pesado de pandas/numpy, fuera del event loop.
+    Admite como mucho `max_workers` cálculos en paralelo y `max_queue` esperando;
+    por encima rechaza con ComputePoolFull (la API responde 503).
+
+    Es un pool de hilos: el motor (maestro, caché de resultados, sesiones de preview)
+    vive en memoria del proceso y numpy libera el GIL en las operaciones vectoriales.
+    """
+
+    def __init__(self, max_workers=2, max_queue=8):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rpk-compute")
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+        self.run_total = 0.0
+
+    async def run(self, func, *args, **kwargs):
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ComputePoolFull(
+                    f"Servidor ocupado: {self.running} cálculos en curso y {self.in_flight - self.running} en cola"
+                )
+            self.in_flight += 1
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                wait = started - submitted
+                self.wait_total += wait
+                self.wait_last = wait
+                self.wait_max = max(self.wait_max, wait)
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.run_total += time.perf_counter() - started
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        # El hueco se libera cuando termina el cálculo, no cuando deja de esperarlo la petición:
+        # si el cliente se desconecta, el hilo sigue ocupado hasta acabar (si aún estaba en
+        # cola, la cancelación lo descarta y el hueco se libera en ese momento)
+        try:
+            future = self._executor.submit(task)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.in_flight - self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_avg_s": round(self.wait_total / finished, 6) if finished else 0.0,
+                "wait_max_s": round(self.wait_max, 6),
+                "wait_last_s": round(self.wait_last, 6),
+                "run_avg_s": round(self.run_total / finished, 6) if finished else 0.0,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
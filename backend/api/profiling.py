@@ -0,0 +1,113 @@
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+
+# Clientes (IP) que pueden pedir ?profile=1. Por defecto solo el propio equipo; "*" permite cualquiera
+ALLOWED_CLIENTS = {c.strip() for c in os.environ.get("RPK_PROFILE_CLIENTS", "127.0.0.1,::1").split(",") if c.strip()}
+
+# Informes que se guardan en memoria (los más antiguos se descartan)
+MAX_REPORTS = int(os.environ.get("RPK_PROFILE_KEEP", 20))
+
+# Funciones por informe, ordenadas por tiempo acumulado
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 15
+
+_requested = contextvars.ContextVar('rpk_profile_report', default=None)
+_reports = OrderedDict()
+_reports_lock = threading.Lock()
+# cProfile y tracemalloc son globales al proceso: un solo perfilado a la vez
+_profile_lock = threading.Lock()
+
+
+def allowed(client_host):
+    return '*' in ALLOWED_CLIENTS or client_host in ALLOWED_CLIENTS
+
+
+def request(label):
+    """Marca la petición actual para perfilarla. Retorna el informe (se completa al terminar el cálculo)."""
+    report = {
+        "id": uuid.uuid4().hex[:12],
+        "label": label,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "status": "pending",
+    }
+    _requested.set(report)
+    return report
+
+
+def requested():
+    return _requested.get()
+
+
+def run(work, report, timings=None):
+    """
+    Ejecuta `work` bajo cProfile y tracemalloc y completa `report` con las funciones más
+    costosas, el pico de memoria reservada durante la llamada y los tiempos por etapa.
+    Si ya hay otro perfilado en curso el cálculo se ejecuta sin perfilar.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        report.update(status="skipped", error="Otro perfilado en curso; cálculo ejecutado sin perfilar")
+        _store(report)
+        return work()
+    try:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profiler.runcall(work)
+        finally:
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            allocations = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ALLOCATIONS]
+            if not tracing:
+                tracemalloc.stop()
+
+            buffer = io.StringIO()
+            stats = pstats.Stats(profiler, stream=buffer)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            report.update(
+                status="done",
+                elapsed_seconds=round(elapsed, 4),
+                tracemalloc_peak_bytes=peak - baseline,
+                tracemalloc_retained_bytes=current - baseline,
+                top_allocations=[
+                    {"where": str(stat.traceback), "bytes": stat.size, "blocks": stat.count}
+                    for stat in allocations
+                ],
+                timings={k: round(v * 1000, 3) for k, v in (timings or {}).items()},
+                cprofile=buffer.getvalue(),
+            )
+            _store(report)
+    finally:
+        _profile_lock.release()
+
+
+def _store(report):
+    with _reports_lock:
+        _reports[report["id"]] = report
+        while len(_reports) > MAX_REPORTS:
+            _reports.popitem(last=False)
+
+
+def get_report(report_id):
+    with _reports_lock:
+        return _reports.get(report_id)
+
+
+def list_reports():
+    with _reports_lock:
+        return [
+            {k: r.get(k) for k in ("id", "label", "created_at", "status", "elapsed_seconds", "tracemalloc_peak_bytes")}
+            for r in reversed(_reports.values())
+        ]
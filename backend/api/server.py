@@ -4,6 +4,7 @@ import sys
 import json
 import time
 import logging
+from contextlib import asynccontextmanager
 
 # Configuración de Logging para producción/remoto
 logging.basicConfig(
@@ -20,28 +21,54 @@ if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
 print("DEBUG: Importando FastAPI...", flush=True)
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel
 
 print("DEBUG: Importando modulos locales...", flush=True)
 from backend.db import database
-from backend.core import simulation_core
+from backend.core import simulation_core, projection, serialization, batch, compare, montecarlo, optimizer, goalseek, master_ingest, metrics
+from backend.core.master_watcher import MasterWatcher
+from backend.api.compute_pool import ComputePool, ComputePoolFull
+from backend.api.warmup import WarmUp
+from backend.api import profiling
 
-print("DEBUG: Inicializando DB...", flush=True)
-try:
-    database.init_db()
-    print("DEBUG: DB Iniciada OK", flush=True)
-except Exception as e:
-    print(f"ERROR DB: {e}", flush=True)
-    logger.error(f"Error inicializando DB: {e}")
+# Vigilancia del Excel maestro: recarga en caliente sin reiniciar (RPK_MASTER_WATCH=0 la desactiva)
+master_watcher = MasterWatcher(interval_seconds=float(os.environ.get("RPK_MASTER_WATCH_INTERVAL", 5)))
+
+# Calentamiento al arrancar: maestro y simulación base en segundo plano (RPK_WARMUP=0 lo desactiva)
+warmup = WarmUp()
+
+def _init_db():
+    print("DEBUG: Inicializando DB...", flush=True)
+    try:
+        warmup.phase('init_db', database.init_db)
+        print("DEBUG: DB Iniciada OK", flush=True)
+    except Exception as e:
+        print(f"ERROR DB: {e}", flush=True)
+        logger.error(f"Error inicializando DB: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    _init_db()
+    warmup.start(enabled=os.environ.get("RPK_WARMUP", "1") != "0")
+    if os.environ.get("RPK_MASTER_WATCH", "1") != "0":
+        master_watcher.start()
+    yield
+    master_watcher.stop()
 
 print("DEBUG: Creando instancia FastAPI...", flush=True)
-app = FastAPI(title="RPK Simulator API")
+app = FastAPI(title="RPK Simulator API", lifespan=lifespan)
+
+# Pool acotado para las simulaciones: por encima de workers + cola se responde 503
+compute_pool = ComputePool(
+    max_workers=int(os.environ.get("RPK_COMPUTE_WORKERS", 2)),
+    max_queue=int(os.environ.get("RPK_COMPUTE_QUEUE", 8)),
+)
 
 # Determinar rutas relativas para el frontend
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -56,10 +83,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Duración y código de respuesta por ruta (plantilla, no la URL concreta) para /metrics,
+    cabecera Server-Timing con las etapas del cálculo y, para los clientes permitidos,
+    perfilado de la petición con ?profile=1 (informe en /api/profiles/{id}).
+    """
+    start = time.perf_counter()
+    timings = metrics.start_request()
+    report = None
+    if request.query_params.get("profile") == "1" and request.client is not None and profiling.allowed(request.client.host):
+        report = profiling.request(f"{request.method} {request.url.path}")
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    if timings:
+        response.headers["Server-Timing"] = metrics.server_timing(timings, total=elapsed)
+        response.headers["Timing-Allow-Origin"] = "*"
+    # Solo las rutas de cálculo generan informe: en el resto la petición no lleva la cabecera
+    if report is not None and report["status"] != "pending":
+        response.headers["X-RPK-Profile"] = report["id"]
+    if metrics.ENABLED:
+        route = getattr(request.scope.get("route"), "path", None) or "otros"
+        metrics.observe('rpk_http_request_seconds', elapsed, route=route, method=request.method)
+        metrics.inc('rpk_http_requests_total', route=route, method=request.method, status=response.status_code)
+    return response
+
+def _runtime_metrics():
+    """Métricas que ya cuentan la caché, el pool de cálculo y el maestro, leídas al exportar."""
+    cache = simulation_core.cache_stats()
+    pool = compute_pool.stats()
+    master = simulation_core.current_master()
+    return [
+        ("rpk_cache_hits_total", "counter", "Aciertos de la caché de resultados", [({}, cache['hits'])]),
+        ("rpk_cache_misses_total", "counter", "Fallos de la caché de resultados", [({}, cache['misses'])]),
+        ("rpk_cache_evictions_total", "counter", "Entradas desalojadas de la caché de resultados", [({}, cache['evictions'])]),
+        ("rpk_cache_entries", "gauge", "Entradas en la caché de resultados", [({}, cache['entries'])]),
+        ("rpk_cache_result_bytes", "gauge", "Memoria propia de los resultados cacheados (bytes)", [({}, cache['result_bytes'])]),
+        ("rpk_compute_running", "gauge", "Cálculos en curso en el pool", [({}, pool['running'])]),
+        ("rpk_compute_queued", "gauge", "Cálculos esperando en la cola del pool", [({}, pool['queued'])]),
+        ("rpk_compute_rejected_total", "counter", "Cálculos rechazados con 503 por pool lleno", [({}, pool['rejected'])]),
+        ("rpk_master_rows", "gauge", "Filas de la versión del maestro cargada",
+         [({"version": master.version}, master.n_rows)] if master is not None else []),
+    ]
+
+metrics.registry.register_collector(_runtime_metrics)
+
+@app.get("/metrics")
+def get_metrics():
+    """Histogramas por etapa y por ruta y contadores, en formato de texto de Prometheus."""
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas (RPK_METRICS=0)")
+    return Response(content=metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    """
+    Estado del calentamiento (a diferencia de /health, que solo indica que el proceso responde).
+    200 cuando el maestro y la simulación base están listos; 503 mientras tanto o si ha fallado.
+    """
+    status = warmup.status()
+    return Response(content=serialization.dumps(status), status_code=200 if status["ready"] else 503, media_type="application/json")
+
 # Dependency
 def get_db():
     db = database.SessionLocal()
@@ -166,17 +255,93 @@ def create_scenario(scenario_data: ScenarioCreate, db: Session = Depends(get_db)
     
     return db_scenario
 
-@app.get("/api/simulate/base")
-async def get_base_simulation(db: Session = Depends(get_db), dias_laborales: Optional[int] = None, horas_turno: Optional[int] = None):
+def _negotiate(request: Request, format: Optional[str]):
     try:
-        return simulation_core.get_simulation_data(db, dias_laborales=dias_laborales, horas_turno=horas_turno)
+        return serialization.negotiate_format(format, request.headers.get("accept"))
+    except serialization.UnsupportedFormat as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+class DetailQuery:
+    """
+    Filtrado, ordenación, paginación y proyección del detalle en el servidor:
+    ?centros=504,506&columns=Articulo,Centro,Saturacion&sort=-Saturacion&limit=100&offset=0&summary_only=true
+    """
+    def __init__(
+        self,
+        centros: Optional[str] = None,
+        columns: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1),
+        offset: int = Query(0, ge=0),
+        summary_only: bool = False,
+    ):
+        self.centros = centros
+        self.columns = columns
+        self.sort = sort
+        self.limit = limit
+        self.offset = offset
+        self.summary_only = summary_only
+
+    def is_empty(self):
+        return not (self.centros or self.columns or self.sort or self.limit or self.offset or self.summary_only)
+
+def _simulation_response(result, meta, fmt, query: DetailQuery = None):
+    """Serializa el resultado directamente (sin jsonable_encoder) en el formato negociado."""
+    if query is not None and not query.is_empty():
+        result, page = result.project(
+            centros=query.centros, columns=query.columns, sort=query.sort,
+            limit=query.limit, offset=query.offset, summary_only=query.summary_only,
+        )
+        meta = {**meta, "page": page}
+        if meta.get("incremental"):
+            meta["detail_positions"] = projection.row_positions(result.detail)
+    return Response(content=result.render(meta, fmt), media_type=serialization.MEDIA_TYPES[fmt])
+
+async def _run_compute(work, label):
+    """
+    Ejecuta el cálculo (simulación + serialización) en el pool acotado, fuera del event loop,
+    para que /health, los estáticos y el resto de usuarios no se bloqueen.
+    Los tiempos por etapa se acumulan en los de la petición (Server-Timing).
+    """
+    timings = metrics.request_timings()
+    report = profiling.requested()
+
+    def task():
+        with metrics.collect(timings):
+            if report is not None:
+                return profiling.run(work, report, timings)
+            return work()
+
+    try:
+        return await compute_pool.run(task)
+    except ComputePoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except simulation_core.MasterLoadError as e:
+        logger.error(f"Error en {label}: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(simulation_core.LOAD_RETRY_SECONDS))})
+    except HTTPException:
+        raise
+    except projection.InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error en simulation/base: {e}")
+        logger.error(f"Error en {label}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/simulate/base")
+async def get_base_simulation(request: Request, db: Session = Depends(get_db), dias_laborales: Optional[int] = None, horas_turno: Optional[int] = None, format: Optional[str] = None, query: DetailQuery = Depends()):
+    fmt = _negotiate(request, format)
+
+    def work():
+        result, meta = simulation_core.simulate(db, dias_laborales=dias_laborales, horas_turno=horas_turno)
+        return _simulation_response(result, meta, fmt, query)
+
+    return await _run_compute(work, "simulation/base")
+
 @app.get("/api/simulate/{scenario_id}")
-async def get_scenario_simulation(scenario_id: int, db: Session = Depends(get_db), dias_laborales: Optional[int] = None, horas_turno: Optional[int] = None):
-    try:
+async def get_scenario_simulation(scenario_id: int, request: Request, db: Session = Depends(get_db), dias_laborales: Optional[int] = None, horas_turno: Optional[int] = None, format: Optional[str] = None, query: DetailQuery = Depends()):
+    fmt = _negotiate(request, format)
+
+    def work():
         db_sc = db.query(database.Scenario).filter(database.Scenario.id == scenario_id).first()
         if not db_sc:
             raise HTTPException(status_code=404, detail="Scenario not found")
@@ -185,34 +350,360 @@ async def get_scenario_simulation(scenario_id: int, db: Session = Depends(get_db
         h_tur = horas_turno if horas_turno is not None else db_sc.horas_turno_global
         c_conf = json.loads(db_sc.center_configs_json) if db_sc.center_configs_json else {}
 
-        return simulation_core.get_simulation_data(
+        result, meta = simulation_core.simulate(
             db, 
             scenario_id, 
             dias_laborales=d_lab, 
             horas_turno=h_tur, 
             center_configs=c_conf
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return _simulation_response(result, meta, fmt, query)
+
+    return await _run_compute(work, f"simulation/{scenario_id}")
 
 class PreviewPayload(BaseModel):
     overrides: List[OverrideBase]
     dias_laborales: Optional[int] = None
     horas_turno: Optional[int] = None
     center_configs: Optional[dict] = None
+    # Con session_id el servidor recuerda el último resultado y responde solo con el delta
+    # respecto al que indica base_token (el meta.preview_token de la última respuesta aplicada)
+    session_id: Optional[str] = None
+    base_token: Optional[str] = None
 
 @app.post("/api/simulate/preview")
-async def get_preview_simulation(payload: PreviewPayload, db: Session = Depends(get_db)):
+async def get_preview_simulation(payload: PreviewPayload, request: Request, db: Session = Depends(get_db), format: Optional[str] = None, query: DetailQuery = Depends()):
+    fmt = _negotiate(request, format)
+
+    def work():
+        if payload.session_id:
+            result, meta = simulation_core.simulate_preview_incremental(
+                payload.session_id,
+                overrides_list=payload.overrides,
+                dias_laborales=payload.dias_laborales,
+                horas_turno=payload.horas_turno,
+                center_configs=payload.center_configs,
+                base_token=payload.base_token,
+            )
+        else:
+            result, meta = simulation_core.simulate(
+                db, 
+                overrides_list=payload.overrides, 
+                dias_laborales=payload.dias_laborales,
+                horas_turno=payload.horas_turno,
+                center_configs=payload.center_configs
+            )
+        return _simulation_response(result, meta, fmt, query)
+
+    return await _run_compute(work, "simulation/preview")
+
+class BatchScenarioSpec(BaseModel):
+    name: Optional[str] = None
+    # Escenario guardado como punto de partida: sus overrides van antes que los de la spec
+    scenario_id: Optional[int] = None
+    overrides: List[OverrideBase] = []
+    dias_laborales: Optional[int] = None
+    horas_turno: Optional[int] = None
+    center_configs: Optional[dict] = None
+
+class BatchPayload(BaseModel):
+    scenarios: List[BatchScenarioSpec]
+
+def _get_saved_scenario(db: Session, scenario_id: int):
+    db_sc = db.query(database.Scenario).filter(database.Scenario.id == scenario_id).first()
+    if not db_sc:
+        raise HTTPException(status_code=404, detail=f"Scenario {scenario_id} not found")
+    return db_sc
+
+def _resolve_batch_spec(db: Session, spec: BatchScenarioSpec) -> BatchScenarioSpec:
+    """Completa una spec que referencia un escenario guardado con sus overrides y parámetros."""
+    if not spec.scenario_id:
+        return spec
+    db_sc = _get_saved_scenario(db, spec.scenario_id)
+    return BatchScenarioSpec.model_construct(
+        name=spec.name or db_sc.name,
+        scenario_id=spec.scenario_id,
+        overrides=list(db_sc.details) + list(spec.overrides),
+        dias_laborales=spec.dias_laborales if spec.dias_laborales is not None else db_sc.dias_laborales,
+        horas_turno=spec.horas_turno if spec.horas_turno is not None else db_sc.horas_turno_global,
+        center_configs=spec.center_configs if spec.center_configs is not None else (
+            json.loads(db_sc.center_configs_json) if db_sc.center_configs_json else {}
+        ),
+    )
+
+@app.post("/api/simulate/batch")
+async def simulate_batch(payload: BatchPayload, db: Session = Depends(get_db)):
+    """
+    Evalúa varios escenarios en una pasada y devuelve la matriz escenario × centro
+    de saturación (más horas totales y número de artículos), sin el detalle por artículo.
+    """
+    if not payload.scenarios:
+        raise HTTPException(status_code=400, detail="El lote no contiene escenarios")
+
+    def work():
+        specs = [_resolve_batch_spec(db, spec) for spec in payload.scenarios]
+        try:
+            matrix = batch.simulate_batch(specs)
+        except batch.BatchTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        return Response(content=serialization.dumps(matrix), media_type="application/json")
+
+    return await _run_compute(work, "simulation/batch")
+
+def _compare_spec(db: Session, ref: str) -> BatchScenarioSpec:
+    """`base` o el id de un escenario guardado, con los mismos parámetros que /api/simulate/{id}."""
+    if ref == "base":
+        return BatchScenarioSpec(name="Base")
     try:
-        return simulation_core.get_simulation_data(
-            db, 
-            overrides_list=payload.overrides, 
+        scenario_id = int(ref)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Escenario no válido: {ref!r} (usa 'base' o un id)")
+    return _resolve_batch_spec(db, BatchScenarioSpec(scenario_id=scenario_id))
+
+@app.get("/api/compare")
+async def compare_simulations(request: Request, db: Session = Depends(get_db)):
+    """
+    Comparativa de escenarios en el servidor: /api/compare?a=base&b=3[&c=5...].
+    Devuelve los totales por centro de `a` y, para el resto, solo las diferencias por centro
+    (saturación, horas, MOD) y los artículos que cambian de centro o de horas.
+    """
+    refs = sorted((k, v) for k, v in request.query_params.items() if len(k) == 1 and k.isalpha() and k.islower())
+    keys = [k for k, _ in refs]
+    if keys[:2] != ["a", "b"]:
+        raise HTTPException(status_code=400, detail="Indica al menos los escenarios a y b (?a=base&b=3)")
+
+    def work():
+        specs = [_compare_spec(db, ref) for _, ref in refs]
+        try:
+            result = compare.compare_scenarios(specs, keys)
+        except batch.BatchTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        return Response(content=serialization.dumps(result), media_type="application/json")
+
+    return await _run_compute(work, "compare")
+
+class SweepRange(BaseModel):
+    start: int
+    stop: int  # incluido
+    step: int = 1
+
+class SweepPayload(BaseModel):
+    # Cada eje admite una lista de valores o un rango {start, stop, step}
+    dias_laborales: Optional[Union[List[int], SweepRange]] = None
+    horas_turno: Optional[Union[List[int], SweepRange]] = None
+    # Opciones de turno a explorar por centro, p.ej. {"504": [8, 16, 24]}
+    center_shift_options: Optional[dict] = None
+    scenario_id: Optional[int] = None
+    overrides: List[OverrideBase] = []
+    center_configs: Optional[dict] = None
+
+@app.post("/api/simulate/sweep")
+async def simulate_sweep(payload: SweepPayload, db: Session = Depends(get_db)):
+    """
+    Rejilla de saturación por centro para todos los valores de días laborales, turno global
+    y turnos por centro pedidos, calculada de una vez para que la UI la recorra en local.
+    """
+    def work():
+        overrides = list(payload.overrides)
+        c_conf = payload.center_configs
+        if payload.scenario_id:
+            db_sc = _get_saved_scenario(db, payload.scenario_id)
+            overrides = list(db_sc.details) + overrides
+            if c_conf is None:
+                c_conf = json.loads(db_sc.center_configs_json) if db_sc.center_configs_json else {}
+        try:
+            grid = batch.simulate_sweep(
+                dias_laborales=payload.dias_laborales,
+                horas_turno=payload.horas_turno,
+                center_shift_options=payload.center_shift_options,
+                overrides_list=overrides,
+                center_configs=c_conf,
+            )
+        except batch.BatchTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        return Response(content=serialization.dumps(grid), media_type="application/json")
+
+    return await _run_compute(work, "simulation/sweep")
+
+class DistributionSpec(BaseModel):
+    # Factor multiplicativo sobre el valor de cada fila: none, normal, lognormal, uniform, triangular
+    dist: str = "normal"
+    sd: Optional[float] = None
+    sigma: Optional[float] = None
+    low: Optional[float] = None
+    mode: Optional[float] = None
+    high: Optional[float] = None
+    # Un único factor por muestra para todas las filas (incertidumbre correlada)
+    shared: bool = False
+
+class MonteCarloPayload(BaseModel):
+    samples: int = 1000
+    seed: Optional[int] = None
+    oee: Optional[DistributionSpec] = None
+    demanda: Optional[DistributionSpec] = None
+    percentiles: List[float] = [50, 90]
+    threshold: float = 1.0
+    scenario_id: Optional[int] = None
+    overrides: List[OverrideBase] = []
+    dias_laborales: Optional[int] = None
+    horas_turno: Optional[int] = None
+    center_configs: Optional[dict] = None
+
+@app.post("/api/simulate/montecarlo")
+async def simulate_montecarlo(payload: MonteCarloPayload, db: Session = Depends(get_db)):
+    """Percentiles de saturación por centro y probabilidad de superar el umbral (100% por defecto)."""
+    def work():
+        spec = _resolve_batch_spec(db, BatchScenarioSpec(
+            scenario_id=payload.scenario_id,
+            overrides=payload.overrides,
             dias_laborales=payload.dias_laborales,
             horas_turno=payload.horas_turno,
-            center_configs=payload.center_configs
+            center_configs=payload.center_configs,
+        ))
+        stats = montecarlo.simulate_monte_carlo(
+            spec,
+            samples=payload.samples,
+            seed=payload.seed,
+            oee=payload.oee.model_dump() if payload.oee else None,
+            demanda=payload.demanda.model_dump() if payload.demanda else None,
+            percentiles=payload.percentiles,
+            threshold=payload.threshold,
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return Response(content=serialization.dumps(stats), media_type="application/json")
+
+    return await _run_compute(work, "simulation/montecarlo")
+
+class OptimizePayload(BaseModel):
+    # Centros destino permitidos por artículo y/o tabla de compatibilidad centro -> centros
+    allowed_targets: Optional[Dict[str, List[str]]] = None
+    compatibility: Optional[Dict[str, List[str]]] = None
+    max_moves: int = 20
+    # Parar en cuanto la saturación máxima quede por debajo de este valor (1.0 = 100%)
+    target_saturacion: Optional[float] = None
+    scenario_id: Optional[int] = None
+    overrides: List[OverrideBase] = []
+    dias_laborales: Optional[int] = None
+    horas_turno: Optional[int] = None
+    center_configs: Optional[dict] = None
+
+@app.post("/api/optimize/rebalance")
+async def optimize_rebalance(payload: OptimizePayload, db: Session = Depends(get_db)):
+    """Propone traslados new_centro que minimizan la saturación máxima, como lista de overrides."""
+    def work():
+        spec = _resolve_batch_spec(db, BatchScenarioSpec(
+            scenario_id=payload.scenario_id,
+            overrides=payload.overrides,
+            dias_laborales=payload.dias_laborales,
+            horas_turno=payload.horas_turno,
+            center_configs=payload.center_configs,
+        ))
+        plan = optimizer.optimize_moves(
+            spec,
+            allowed_targets=payload.allowed_targets,
+            compatibility=payload.compatibility,
+            max_moves=payload.max_moves,
+            target=payload.target_saturacion,
+        )
+        return Response(content=serialization.dumps(plan), media_type="application/json")
+
+    return await _run_compute(work, "optimize/rebalance")
+
+class GoalSeekPayload(BaseModel):
+    target_saturacion: float = 1.0
+    # "shifts": elegir entre shift_options (8/16/24 por defecto); "hours": horas en pasos de hours_step
+    mode: str = "shifts"
+    shift_options: Optional[List[int]] = None
+    hours_step: int = 1
+    max_hours: int = 24
+    # Centros a resolver (todos si no se indica)
+    centros: Optional[List[str]] = None
+    scenario_id: Optional[int] = None
+    overrides: List[OverrideBase] = []
+    dias_laborales: Optional[int] = None
+    horas_turno: Optional[int] = None
+    center_configs: Optional[dict] = None
+
+@app.post("/api/simulate/goalseek")
+async def simulate_goalseek(payload: GoalSeekPayload, db: Session = Depends(get_db)):
+    """Turno mínimo por centro para quedar por debajo de la saturación objetivo."""
+    def work():
+        spec = _resolve_batch_spec(db, BatchScenarioSpec(
+            scenario_id=payload.scenario_id,
+            overrides=payload.overrides,
+            dias_laborales=payload.dias_laborales,
+            horas_turno=payload.horas_turno,
+            center_configs=payload.center_configs,
+        ))
+        plan = goalseek.goal_seek_shifts(
+            spec,
+            target=payload.target_saturacion,
+            mode=payload.mode,
+            shift_options=payload.shift_options,
+            hours_step=payload.hours_step,
+            max_hours=payload.max_hours,
+            centros=payload.centros,
+        )
+        return Response(content=serialization.dumps(plan), media_type="application/json")
+
+    return await _run_compute(work, "simulation/goalseek")
+
+@app.get("/api/master")
+def get_master_status():
+    """Versión del maestro publicada y estado de la vigilancia del Excel."""
+    master = simulation_core.current_master()
+    return {
+        "loaded": master is not None,
+        "master_version": master.version if master is not None else None,
+        "rows": master.n_rows if master is not None else None,
+        "generation": master.generation if master is not None else None,
+        "pid": os.getpid(),
+        "store": {k: v for k, v in master.meta.items() if k != 'columns'} if master is not None else None,
+        "memory": master.memory_usage() if master is not None else None,
+        "watcher": master_watcher.stats(),
+    }
+
+@app.post("/api/master/reload")
+async def reload_master(force: bool = False):
+    """Comprueba el Excel ahora (sin esperar a la vigilancia) y publica la versión nueva si ha cambiado."""
+    def work():
+        changed = simulation_core.reload_master(force=force)
+        return {"reloaded": changed, "master_version": simulation_core.get_master().version}
+
+    return await _run_compute(work, "master/reload")
+
+@app.get("/api/master/changes")
+def get_master_changes(limit: int = Query(10, ge=1, le=200)):
+    """Informes de cambios de las últimas recargas del maestro (altas, bajas y modificaciones por fila)."""
+    return master_ingest.load_reports(simulation_core.EXCEL_PATH, limit=limit)
+
+def _require_profile_client(request: Request):
+    if request.client is None or not profiling.allowed(request.client.host):
+        raise HTTPException(status_code=403, detail="Cliente no autorizado para perfilar (RPK_PROFILE_CLIENTS)")
+
+@app.get("/api/profiles")
+def list_profiles(request: Request):
+    """Informes de las peticiones hechas con ?profile=1 (los más recientes primero)."""
+    _require_profile_client(request)
+    return profiling.list_reports()
+
+@app.get("/api/profiles/{report_id}")
+def get_profile(report_id: str, request: Request):
+    """Informe completo: cProfile, pico de tracemalloc, reservas principales y tiempos por etapa."""
+    _require_profile_client(request)
+    report = profiling.get_report(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Informe de perfilado no encontrado")
+    return report
+
+@app.get("/api/compute/stats")
+def get_compute_stats():
+    """Estado del pool de cálculo: en curso, en cola, rechazados y tiempos de espera."""
+    return compute_pool.stats()
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    """Contadores de la caché de resultados de simulación (aciertos, fallos, desalojos)."""
+    return simulation_core.cache_stats()
 
 @app.delete("/api/scenarios/{scenario_id}")
 def delete_scenario(scenario_id: int, db: Session = Depends(get_db)):
@@ -305,9 +796,15 @@ if __name__ == "__main__":
     import uvicorn
     # Puerto estandarizado a 5000 para acceso remoto
     port = int(os.environ.get("PORT", 5000))
-    print(f"DEBUG: Arrancando Uvicorn en http://0.0.0.0:{port} ...", flush=True)
+    # Varios procesos comparten el maestro mapeado en memoria (ver master_shared)
+    workers = int(os.environ.get("RPK_WORKERS", 1))
+    print(f"DEBUG: Arrancando Uvicorn en http://0.0.0.0:{port} con {workers} worker(s)...", flush=True)
     try:
-        uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
+        if workers > 1:
+            # Con varios workers uvicorn necesita la app como cadena de importación
+            uvicorn.run("backend.api.server:app", host="0.0.0.0", port=port, log_level="info", workers=workers)
+        else:
+            uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
     except Exception as e:
         logger.error(f"Error al arrancar servidor: {e}")
         print(f"ERROR: {e}", flush=True)
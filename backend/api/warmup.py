@@ -0,0 +1,94 @@
+import threading
+import time
+
+from backend.core import serialization, simulation_core
+
+
+class WarmUp:
+    """
+    Fase de arranque del servidor: carga el maestro (almacén columnar, índices, arrays del
+    motor) y calcula la simulación base en un hilo en segundo plano, para que la primera
+    petición del día no espere la lectura del Excel.
+
+    `status()` alimenta /ready: `starting` -> `warming` -> `ready` (o `failed`), con el
+    tiempo de cada fase. Si el calentamiento falla el servidor sigue atendiendo y el
+    maestro se intentará cargar de nuevo en la primera petición; en cuanto hay un maestro
+    cargado el estado pasa de `failed` a `ready` (el error queda en `last_error`).
+    """
+
+    PHASES = ('init_db', 'master', 'base_simulation')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = 'starting'
+        self.timings = {}
+        self.error = None
+        self.last_error = None
+        self.started_at = time.perf_counter()
+        self.ready_at = None
+
+    def phase(self, name, func):
+        """Ejecuta una fase y guarda su duración. Los errores se propagan."""
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            with self._lock:
+                self.timings[name] = round(time.perf_counter() - start, 4)
+
+    def start(self, enabled=True):
+        """Lanza el calentamiento en segundo plano (o marca el servidor listo si está desactivado)."""
+        if not enabled:
+            self._finish('ready')
+            return
+        self.state = 'warming'
+        self._thread = threading.Thread(target=self._run, name="rpk-warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            master = self.phase('master', simulation_core.get_master)
+            def base():
+                result, meta = simulation_core.simulate(None)
+                # Codificación de la respuesta JSON (partes cacheadas en el resultado)
+                result.render(meta, serialization.FORMAT_RECORDS)
+            self.phase('base_simulation', base)
+            print(f"🔥 Servidor listo: maestro {master.version} ({master.n_rows} filas) y simulación base "
+                  f"calculados en {time.perf_counter() - self.started_at:.4f} segundos.", flush=True)
+            self._finish('ready')
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Falló el calentamiento del servidor: {self.error}", flush=True)
+            self._finish('failed')
+
+    def _finish(self, state):
+        with self._lock:
+            self.state = state
+            self.ready_at = time.perf_counter()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def ready(self):
+        return self.status()['ready']
+
+    def status(self):
+        master = simulation_core.current_master()
+        with self._lock:
+            if self.state == 'failed' and master is not None:
+                # Una petición posterior ha cargado el maestro: el servidor ya está listo
+                self.state, self.last_error, self.error = 'ready', self.error, None
+                self.ready_at = time.perf_counter()
+            elapsed = (self.ready_at or time.perf_counter()) - self.started_at
+            return {
+                "status": self.state,
+                "ready": self.state == 'ready',
+                "elapsed_seconds": round(elapsed, 4),
+                "timings": dict(self.timings),
+                "error": self.error,
+                "last_error": self.last_error,
+                "master_version": master.version if master is not None else None,
+            }
@@ -0,0 +1,284 @@
+import os
+
+import numpy as np
+
+from backend.core import projection, simulation_core
+
+# Máximo de celdas escenario × fila que se apilan a la vez (acota la memoria de los arrays 2-D)
+MAX_BLOCK_CELLS = int(os.environ.get("RPK_BATCH_BLOCK_CELLS", 4_000_000))
+# Máximo de escenarios por petición de lote
+MAX_SCENARIOS = int(os.environ.get("RPK_BATCH_MAX_SCENARIOS", 500))
+
+
+class BatchTooLarge(ValueError):
+    """La petición supera el tamaño máximo (escenarios de un lote, celdas de una rejilla)."""
+
+
+class ResolvedScenario:
+    """Un escenario del lote con sus parámetros normalizados y su overlay disperso."""
+
+    def __init__(self, master, spec, index):
+        self.name = getattr(spec, 'name', None) or f"escenario_{index + 1}"
+        self.overrides = list(getattr(spec, 'overrides', None) or [])
+        d_lab = getattr(spec, 'dias_laborales', None)
+        h_turno = getattr(spec, 'horas_turno', None)
+        self.d_lab = int(d_lab) if d_lab is not None else None
+        self.h_turno = int(h_turno) if h_turno is not None else 16
+        self.center_configs = getattr(spec, 'center_configs', None) or {}
+        self.shifts = simulation_core.center_shifts(self.center_configs)
+        self.overlay = simulation_core.build_overlay(master, self.overrides)
+
+
+def centro_categories(master, overlays):
+    """Centros del maestro más los destinos nuevos de `new_centro` que aparezcan en los overlays."""
+    centros = [str(c) for c in master.centros]
+    code_of = {c: i for i, c in enumerate(centros)}
+    for overlay in overlays:
+        for c in overlay.centro:
+            if str(c) not in code_of:
+                code_of[str(c)] = len(centros)
+                centros.append(str(c))
+    return centros, code_of
+
+
+def scenario_capacity(master, sc, code_of):
+    """
+    Códigos de centro final y capacidad anual (días × turno) por fila de un escenario.
+    El turno sale del centro original (configuración del centro o global) salvo que un
+    override lo fuerce, igual que en simulation_core.run_engine.
+    """
+    overlay = sc.overlay
+    horas_turno = master.shifts_by_centro(sc.h_turno, sc.center_configs)[master.centro_codes]
+
+    codes = master.centro_codes
+    if len(overlay.positions):
+        codes = codes.copy()
+        codes[overlay.positions] = [code_of[str(c)] for c in overlay.centro]
+        forced = ~np.isnan(overlay.horas_turno)
+        horas_turno[overlay.positions[forced]] = overlay.horas_turno[forced].astype(np.int64)
+
+    dias = sc.d_lab if sc.d_lab is not None else master.base['dias laborales 2026']
+    return codes, dias * horas_turno
+
+
+def _reduce_block(master, block, code_of, n_centros):
+    """
+    Calcula un bloque de escenarios apilando sus valores por fila en arrays (escenario × fila)
+    y agrega por (escenario, centro) con un único bincount.
+    Retorna matrices (escenario × centro) de saturación, horas totales y número de artículos.
+    """
+    k, n = len(block), master.n_rows
+    codes = np.empty((k, n), dtype=np.int64)
+    capacidad = np.empty((k, n))
+    horas_totales = np.empty((k, n))
+    for i, sc in enumerate(block):
+        codes[i], capacidad[i] = scenario_capacity(master, sc, code_of)
+        horas_totales[i] = sc.overlay.patched(master, 'Horas_Totales')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saturacion = horas_totales / capacidad
+    saturacion[~np.isfinite(saturacion)] = 0
+
+    # Una sola agrupación: código plano escenario * n_centros + centro
+    flat = (np.arange(k)[:, None] * n_centros + codes).ravel()
+    size = k * n_centros
+    sat = np.bincount(flat, weights=saturacion.ravel(), minlength=size).reshape(k, n_centros)
+    horas = np.bincount(flat, weights=np.nan_to_num(horas_totales).ravel(), minlength=size).reshape(k, n_centros)
+    count = np.bincount(flat, minlength=size).reshape(k, n_centros)
+    return sat, horas, count
+
+
+def simulate_batch(specs):
+    """
+    Evalúa N escenarios en una sola pasada sobre el maestro compartido.
+    Cada spec tiene los atributos de una preview (overrides, dias_laborales, horas_turno,
+    center_configs) y opcionalmente `name`.
+
+    Retorna un dict compacto con la matriz escenario × centro:
+    {"centros": [...], "scenarios": [...], "saturacion": [[...]], "horas_totales": [[...]],
+     "num_articulos": [[...]], "meta": {...}}
+    La saturación por centro es la suma de la saturación de sus artículos, como en el resumen
+    de /api/simulate.
+    """
+    if len(specs) > MAX_SCENARIOS:
+        raise BatchTooLarge(f"Demasiados escenarios en el lote: {len(specs)} (máximo {MAX_SCENARIOS})")
+
+    master = simulation_core.get_master()
+    scenarios = [ResolvedScenario(master, spec, i) for i, spec in enumerate(specs)]
+    centros, code_of = centro_categories(master, [sc.overlay for sc in scenarios])
+    n_centros = len(centros)
+
+    sat = np.zeros((len(scenarios), n_centros))
+    horas = np.zeros((len(scenarios), n_centros))
+    count = np.zeros((len(scenarios), n_centros), dtype=np.int64)
+
+    block_size = max(1, MAX_BLOCK_CELLS // max(master.n_rows, 1))
+    for start in range(0, len(scenarios), block_size):
+        stop = start + block_size
+        sat[start:stop], horas[start:stop], count[start:stop] = _reduce_block(
+            master, scenarios[start:stop], code_of, n_centros
+        )
+
+    return {
+        "centros": centros,
+        "scenarios": [
+            {
+                "name": sc.name,
+                "dias_laborales": sc.d_lab if sc.d_lab is not None else 238,
+                "horas_turno_global": sc.h_turno,
+                "center_configs": sc.center_configs,
+                "num_overrides": len(sc.overrides),
+            } for sc in scenarios
+        ],
+        "saturacion": sat,
+        "horas_totales": horas,
+        "num_articulos": count,
+        "meta": {
+            "master_version": master.version,
+            "num_scenarios": len(scenarios),
+            "num_centros": n_centros,
+        },
+    }
+
+
+# Máximo de celdas (días × turno global × centro) de una rejilla de sensibilidad
+MAX_SWEEP_CELLS = int(os.environ.get("RPK_SWEEP_MAX_CELLS", 2_000_000))
+
+
+def expand_range(value):
+    """
+    Valores de un eje del barrido: lista explícita o rango {start, stop, step} con `stop`
+    incluido. None o lista vacía -> [None] (valor por defecto del motor).
+    """
+    if value is None:
+        return [None]
+    if isinstance(value, dict) or hasattr(value, 'start'):
+        get = value.get if isinstance(value, dict) else lambda k, d=None: getattr(value, k, d)
+        start, stop, step = int(get('start')), int(get('stop')), int(get('step', 1) or 1)
+        if step <= 0 or stop < start:
+            raise projection.InvalidQuery(f"Rango no válido: start={start}, stop={stop}, step={step}")
+        return list(range(start, stop + 1, step))
+    values = [int(v) for v in value]
+    return values or [None]
+
+
+def capacity_terms(master, overlay, code_of, dias_axis):
+    """
+    Descompone la saturación por centro para poder cambiar días y turnos sin recalcular filas:
+
+        saturacion[d, c] = fija[d, c] + sum_p sumas[d, p] / turno(origen_p)   (pares p con centro c)
+
+    `fija` son las filas con turno forzado por override; el resto se suma por pareja
+    (centro actual, centro original), porque el turno lo marca el centro original.
+    Cada valor de `dias_axis` es un día laboral fijo o None (días del Excel por fila).
+    Retorna (fija [días × centros], sumas [días × pares], centro de cada par, origen de cada par).
+    """
+    n_centros, n_orig = len(code_of), len(master.centros)
+    horas_totales = overlay.patched(master, 'Horas_Totales')
+    codes = master.centro_codes
+    forced_ht = np.full(master.n_rows, np.nan)
+    if len(overlay.positions):
+        codes = codes.copy()
+        codes[overlay.positions] = [code_of[str(c)] for c in overlay.centro]
+        forced_ht[overlay.positions] = np.trunc(overlay.horas_turno)
+    forced = ~np.isnan(forced_ht)
+
+    # Horas / días por fila, una fila por valor del eje de días
+    dias = np.array([
+        np.full(master.n_rows, d, dtype=float) if d is not None else master.base['dias laborales 2026']
+        for d in dias_axis
+    ])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_day = horas_totales[None, :] / dias
+        forced_part = per_day[:, forced] / forced_ht[forced]
+    per_day[~np.isfinite(per_day)] = 0
+    forced_part[~np.isfinite(forced_part)] = 0
+    fixed = np.array([np.bincount(codes[forced], weights=row, minlength=n_centros) for row in forced_part])
+
+    free = ~forced
+    pair_key = codes[free] * n_orig + master.centro_codes[free]
+    pairs, pair_idx = np.unique(pair_key, return_inverse=True)
+    pair_sums = np.array([np.bincount(pair_idx, weights=row[free], minlength=len(pairs)) for row in per_day])
+    return fixed, pair_sums, pairs // n_orig, pairs % n_orig
+
+
+def combine_terms(fixed, pair_sums, pair_centro, pair_origin, turno_origin):
+    """
+    Saturación [días × turnos × centros] a partir de capacity_terms y del turno por centro
+    original para cada caso (`turno_origin`: [turnos × centros originales]).
+    """
+    to_centro = np.zeros((len(pair_centro), fixed.shape[1]))
+    to_centro[np.arange(len(pair_centro)), pair_centro] = 1.0
+    contrib = pair_sums[:, None, :] / turno_origin[None, :, pair_origin]
+    return fixed[:, None, :] + contrib @ to_centro
+
+
+def simulate_sweep(dias_laborales=None, horas_turno=None, center_shift_options=None,
+                   overrides_list=None, center_configs=None):
+    """
+    Rejilla de sensibilidad sobre días laborales, turno global y opciones de turno por centro.
+
+    Las horas de producción no dependen de días ni turnos, así que se calculan una vez
+    (overlay de la petición incluido) y se agregan por (centro actual, centro original);
+    cada punto de la rejilla solo divide esas sumas por su capacidad (días × turno).
+
+    Retorna {"centros", "dias_laborales", "horas_turno", "saturacion": [días][turno][centro],
+    "center_shifts": {centro: {"options", "saturacion": [días][turno][opción]}}, "meta"}.
+    `center_shifts` da la saturación del centro cuando sus propios artículos (los de ese
+    centro original) trabajan con cada opción de turno; lo que ese cambio provoque en los
+    centros destino de artículos trasladados no se refleja ahí.
+    """
+    master = simulation_core.get_master()
+    dias_axis = expand_range(dias_laborales)
+    turno_axis = [v if v is not None else 16 for v in expand_range(horas_turno)]
+    if any(v is not None and v <= 0 for v in dias_axis) or any(v <= 0 for v in turno_axis):
+        raise projection.InvalidQuery("Días laborales y horas de turno deben ser positivos")
+    shift_options = {str(c): [int(v) for v in opts] for c, opts in (center_shift_options or {}).items() if opts}
+    if any(v <= 0 for opts in shift_options.values() for v in opts):
+        raise projection.InvalidQuery("Las opciones de turno por centro deben ser positivas")
+
+    overlay = simulation_core.build_overlay(master, overrides_list or [])
+    centros, code_of = centro_categories(master, [overlay])
+    n_centros, n_orig = len(centros), len(master.centros)
+    n_cells = len(dias_axis) * len(turno_axis) * n_centros
+    if n_cells > MAX_SWEEP_CELLS:
+        raise BatchTooLarge(f"Rejilla demasiado grande: {n_cells} celdas (máximo {MAX_SWEEP_CELLS})")
+
+    fixed, pair_sums, pair_centro, pair_origin = capacity_terms(master, overlay, code_of, dias_axis)
+
+    # Turno por (turno global, centro original): configuración del centro o el global
+    configured = np.full(n_orig, np.nan)
+    for centro, shifts in simulation_core.center_shifts(center_configs).items():
+        if centro in code_of and code_of[centro] < n_orig:
+            configured[code_of[centro]] = shifts
+    turno_origin = np.where(np.isnan(configured)[None, :], np.array(turno_axis, dtype=float)[:, None], configured[None, :])
+
+    saturacion = combine_terms(fixed, pair_sums, pair_centro, pair_origin, turno_origin)
+
+    center_shifts = {}
+    own_pairs = pair_centro == pair_origin
+    for centro, options in shift_options.items():
+        c = code_of.get(centro)
+        if c is None or c >= n_orig:
+            continue
+        own = pair_sums[:, own_pairs & (pair_centro == c)].sum(axis=1)  # [días]
+        current = saturacion[:, :, c] - own[:, None] / turno_origin[None, :, c]
+        center_shifts[centro] = {
+            "options": options,
+            "saturacion": current[:, :, None] + own[:, None, None] / np.array(options, dtype=float)[None, None, :],
+        }
+
+    return {
+        "centros": centros,
+        "dias_laborales": dias_axis,
+        "horas_turno": turno_axis,
+        "saturacion": saturacion,
+        "center_shifts": center_shifts,
+        "meta": {
+            "master_version": master.version,
+            "center_configs": center_configs or {},
+            "num_overrides": len(overrides_list or []),
+            "shape": [len(dias_axis), len(turno_axis), n_centros],
+        },
+    }
+
@@ -0,0 +1,180 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.core import batch, serialization, simulation_core
+
+# Máximo de artículos cambiados por escenario en la respuesta (los de mayor cambio de horas)
+MAX_CHANGED_ARTICLES = int(os.environ.get("RPK_COMPARE_MAX_ARTICLES", 1000))
+
+# Columnas del detalle que se agregan por centro y nombre con que se devuelven
+AGGREGATES = {
+    'saturacion': 'Saturacion',
+    'horas_totales': 'Horas_Totales',
+    'horas_hombre': 'Horas_Hombre',  # MOD
+}
+
+# Columnas del artículo (en el escenario comparado) que acompañan a cada artículo cambiado
+ARTICLE_COLUMNS = ['Volumen anual', 'Piezas por minuto', '%OEE', 'Ratio_MOD']
+
+
+def _days_key(master, d_lab):
+    """Días laborales de la pasada base: None si coinciden con los del Excel en todas las filas."""
+    if d_lab is None or np.all(master.base['dias laborales 2026'] == d_lab):
+        return None
+    return d_lab
+
+
+def _centro_totals(codes, detail, n_centros, positions=None):
+    """Sumas por centro (códigos `codes`) de las columnas de AGGREGATES y número de artículos."""
+    totals = {}
+    for name, col in AGGREGATES.items():
+        values = detail[col].to_numpy()
+        if positions is not None:
+            values = values[positions]
+        totals[name] = np.bincount(codes, weights=np.nan_to_num(values.astype(float)), minlength=n_centros)
+    totals['num_articulos'] = np.bincount(codes, minlength=n_centros)
+    return totals
+
+
+class _ComparedScenario(batch.ResolvedScenario):
+    """Escenario de la comparación: su pasada base compartida y las filas que difieren de ella."""
+
+    def __init__(self, master, spec, index, key):
+        super().__init__(master, spec, index)
+        self.key = key
+        self.base_key = (_days_key(master, self.d_lab), self.h_turno)
+        # Filas distintas de la pasada base: las de overrides y las de centros con turno propio
+        shift_rows = np.flatnonzero(np.isin(master.centro, list(self.shifts))) if self.shifts else []
+        self.rows = np.union1d(self.overlay.positions, shift_rows).astype(np.int64)
+        self.new_rows = None
+        self.totals = None
+
+    def values(self, base_detail, col, positions):
+        """Valores de `col` del escenario en `positions`: los recalculados o, si no, los de la pasada base."""
+        values = base_detail[col].to_numpy()[positions]
+        if len(self.rows) and len(positions):
+            idx = np.minimum(np.searchsorted(self.rows, positions), len(self.rows) - 1)
+            hit = self.rows[idx] == positions
+            if hit.any():
+                values = values.copy()
+                values[hit] = self.new_rows[col].to_numpy()[idx[hit]]
+        return values
+
+
+def _changed_articles(master, reference, other, base_ref, base_other):
+    """Artículos cuyo centro o cuyas horas totales cambian de `reference` a `other`."""
+    if reference.base_key == other.base_key:
+        positions = np.union1d(reference.rows, other.rows)
+    else:
+        positions = np.arange(master.n_rows)
+
+    centro_a = reference.values(base_ref, 'Centro', positions).astype(str)
+    centro_b = other.values(base_other, 'Centro', positions).astype(str)
+    horas_a = reference.values(base_ref, 'Horas_Totales', positions).astype(float)
+    horas_b = other.values(base_other, 'Horas_Totales', positions).astype(float)
+    changed = (centro_a != centro_b) | ~np.isclose(horas_a, horas_b, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    sel = positions[changed]
+    frame = pd.DataFrame({
+        'Articulo': master.articulo[sel],
+        'centro_original': master.centro[sel],
+        'Centro_a': centro_a[changed],
+        'Centro_b': centro_b[changed],
+        'Horas_Totales_a': horas_a[changed],
+        'Horas_Totales_b': horas_b[changed],
+        'Horas_Hombre_a': reference.values(base_ref, 'Horas_Hombre', sel),
+        'Horas_Hombre_b': other.values(base_other, 'Horas_Hombre', sel),
+        'Saturacion_a': reference.values(base_ref, 'Saturacion', sel),
+        'Saturacion_b': other.values(base_other, 'Saturacion', sel),
+    })
+    # Parámetros del artículo en el escenario comparado (lo que muestra la tabla de la comparativa)
+    for col in ARTICLE_COLUMNS:
+        frame[col] = other.values(base_other, col, sel)
+    frame['Delta_Horas'] = frame['Horas_Totales_b'] - frame['Horas_Totales_a']
+    total = len(frame)
+    if total > MAX_CHANGED_ARTICLES:
+        order = np.argsort(-np.nan_to_num(frame['Delta_Horas'].abs().to_numpy()), kind='stable')
+        frame = frame.iloc[np.sort(order[:MAX_CHANGED_ARTICLES])]
+    return serialization.to_records(frame), total
+
+
+def compare_scenarios(specs, keys=None):
+    """
+    Compara escenarios contra el primero (la referencia) sin calcular cada uno entero.
+
+    Los escenarios con los mismos días laborales y turno global comparten una pasada base
+    (la simulación sin overrides, normalmente ya en caché); de cada escenario solo se
+    calculan las filas que difieren de ella (overrides y centros con turno propio) y los
+    totales por centro se corrigen con esas filas. Cada spec tiene los atributos de una spec
+    de lote (overrides, dias_laborales, horas_turno, center_configs, name); `keys` son los
+    nombres con que se identifican en la respuesta (por defecto, su posición).
+
+    Retorna {"centros", "scenarios", "reference": totales por centro de la referencia,
+    "deltas": {key: diferencias por centro}, "articles": {key: artículos con otro centro u
+    otras horas}, "meta"}. Saturación por centro = suma de la de sus artículos, como en el
+    resumen de /api/simulate; la MOD son las Horas_Hombre.
+    """
+    if len(specs) > batch.MAX_SCENARIOS:
+        raise batch.BatchTooLarge(f"Demasiados escenarios en la comparación: {len(specs)} (máximo {batch.MAX_SCENARIOS})")
+
+    master = simulation_core.get_master()
+    keys = keys or [str(i) for i in range(len(specs))]
+    scenarios = [_ComparedScenario(master, spec, i, key) for i, (spec, key) in enumerate(zip(specs, keys))]
+    centros, code_of = batch.centro_categories(master, [sc.overlay for sc in scenarios])
+    n_centros = len(centros)
+    new_code = np.vectorize(lambda c: code_of[str(c)], otypes=[np.int64])
+
+    # Una pasada base por (días, turno global), con sus totales por centro
+    bases = {}
+    for sc in scenarios:
+        if sc.base_key not in bases:
+            d_lab, h_turno = sc.base_key
+            result, _ = simulation_core.simulate(None, dias_laborales=d_lab, horas_turno=h_turno)
+            bases[sc.base_key] = (result.detail, _centro_totals(master.centro_codes, result.detail, n_centros))
+
+    rows_computed = 0
+    for sc in scenarios:
+        base_detail, base_totals = bases[sc.base_key]
+        if not len(sc.rows):
+            sc.totals = base_totals
+            continue
+        sc.new_rows = simulation_core.run_engine(master, sc.overlay, sc.d_lab, sc.h_turno, sc.center_configs, rows=sc.rows)
+        rows_computed += len(sc.rows)
+        before = _centro_totals(master.centro_codes[sc.rows], base_detail, n_centros, positions=sc.rows)
+        after = _centro_totals(new_code(sc.new_rows['Centro'].to_numpy()), sc.new_rows, n_centros)
+        sc.totals = {name: base_totals[name] - before[name] + after[name] for name in base_totals}
+
+    reference = scenarios[0]
+    base_ref = bases[reference.base_key][0]
+    deltas, articles, articles_total = {}, {}, {}
+    for sc in scenarios[1:]:
+        deltas[sc.key] = {name: sc.totals[name] - reference.totals[name] for name in reference.totals}
+        articles[sc.key], articles_total[sc.key] = _changed_articles(master, reference, sc, base_ref, bases[sc.base_key][0])
+
+    return {
+        "centros": centros,
+        "scenarios": [
+            {
+                "key": sc.key,
+                "name": sc.name,
+                "dias_laborales": sc.d_lab if sc.d_lab is not None else 238,
+                "horas_turno_global": sc.h_turno,
+                "center_configs": sc.center_configs,
+                "num_overrides": len(sc.overrides),
+            } for sc in scenarios
+        ],
+        "reference": reference.totals,
+        "deltas": deltas,
+        "articles": articles,
+        "meta": {
+            "master_version": master.version,
+            "reference": reference.key,
+            "num_scenarios": len(scenarios),
+            "base_passes": len(bases),
+            "rows_computed": rows_computed,
+            "changed_articles": articles_total,
+            "max_changed_articles": MAX_CHANGED_ARTICLES,
+        },
+    }
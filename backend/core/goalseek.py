@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from backend.core import batch, projection, serialization, simulation_core
+
+# Turnos estándar: 1T / 2T / 3T
+SHIFT_OPTIONS = [8, 16, 24]
+SHIFT_LABELS = {8: '1T', 16: '2T', 24: '3T'}
+
+
+def goal_seek_shifts(spec, target=1.0, mode='shifts', shift_options=None, hours_step=1, max_hours=24, centros=None):
+    """
+    Turno mínimo por centro para que su saturación no pase de `target` (1.0 = 100%).
+
+    Se resuelve en forma cerrada con las sumas por centro de batch.capacity_terms: la carga
+    de un centro es una parte que no depende de su turno (filas con turno forzado y artículos
+    trasladados desde otros centros, con el turno de su origen) más sus propios artículos
+    divididos por su turno, así que el turno necesario es propios / (target - resto).
+
+    `mode='shifts'` elige la menor opción de `shift_options` (8/16/24 por defecto) que llega;
+    `mode='hours'` redondea hacia arriba a múltiplos de `hours_step` hasta `max_hours`.
+    Con `centros` solo se resuelven esos; el resto mantiene su turno del escenario.
+    Retorna el resumen por centro (turno, saturación antes/después, horas y horas hombre)
+    y el `center_configs` resultante.
+    """
+    if target is None or target <= 0:
+        raise projection.InvalidQuery("target_saturacion debe ser positivo")
+    if mode == 'shifts':
+        options = np.array(sorted({int(v) for v in (shift_options or SHIFT_OPTIONS)}), dtype=float)
+        if not len(options) or options[0] <= 0:
+            raise projection.InvalidQuery("Las opciones de turno deben ser positivas")
+    elif mode == 'hours':
+        if hours_step <= 0 or max_hours < hours_step:
+            raise projection.InvalidQuery("hours_step debe ser positivo y no mayor que max_hours")
+    else:
+        raise projection.InvalidQuery(f"Modo desconocido '{mode}'. Usa: shifts, hours")
+
+    master = simulation_core.get_master()
+    sc = batch.ResolvedScenario(master, spec, 0)
+    names, code_of = batch.centro_categories(master, [sc.overlay])
+    n_centros, n_orig = len(names), len(master.centros)
+
+    fixed, pair_sums, pair_centro, pair_origin = batch.capacity_terms(master, sc.overlay, code_of, [sc.d_lab])
+    fixed, pair_sums = fixed[0], pair_sums[0]
+    current = master.shifts_by_centro(sc.h_turno, sc.center_configs).astype(float)
+
+    own_pairs = pair_centro == pair_origin
+    own = np.bincount(pair_centro[own_pairs], weights=pair_sums[own_pairs], minlength=n_orig)
+    other = ~own_pairs
+    rest = fixed + np.bincount(pair_centro[other], weights=pair_sums[other] / current[pair_origin[other]], minlength=n_centros)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        needed = np.where(own > 0, own / (target - rest[:n_orig]), 0.0)
+    needed[(own > 0) & (rest[:n_orig] >= target)] = np.inf
+
+    # Margen relativo para que un turno que llega justo no salte al siguiente por redondeo
+    if mode == 'shifts':
+        idx = np.searchsorted(options, needed * (1 - 1e-9))
+        feasible = idx < len(options)
+        chosen = options[np.minimum(idx, len(options) - 1)]
+    else:
+        feasible = needed <= max_hours * (1 + 1e-9)
+        steps = np.ceil(np.minimum(needed, max_hours) * (1 - 1e-9) / hours_step)
+        chosen = np.clip(steps * hours_step, hours_step, max_hours)
+
+    solve = np.ones(n_orig, dtype=bool)
+    if centros:
+        solve = np.isin(np.asarray(master.centros, dtype=str), [str(c) for c in centros])
+    chosen = np.where(solve, chosen, current)
+
+    before = batch.combine_terms(fixed[None], pair_sums[None], pair_centro, pair_origin, current[None])[0, 0]
+    after = batch.combine_terms(fixed[None], pair_sums[None], pair_centro, pair_origin, chosen[None])[0, 0]
+
+    codes, _ = batch.scenario_capacity(master, sc, code_of)
+    horas_totales = np.bincount(codes, weights=np.nan_to_num(sc.overlay.patched(master, 'Horas_Totales')), minlength=n_centros)
+    horas_hombre = np.bincount(codes, weights=np.nan_to_num(sc.overlay.patched(master, 'Horas_Hombre')), minlength=n_centros)
+
+    # Centros nuevos (solo destinos de traslados): sin turno propio que decidir
+    pad = [None] * (n_centros - n_orig)
+    turno = [int(h) for h in chosen] + pad
+    summary = pd.DataFrame({
+        'Centro': names,
+        'horas_turno': pd.array(turno, dtype='Int64'),
+        'turno': [SHIFT_LABELS.get(h, f"{h}h") if h is not None else None for h in turno],
+        'horas_turno_actual': pd.array([int(h) for h in current] + pad, dtype='Int64'),
+        'horas_necesarias': [float(v) if np.isfinite(v) else None for v in needed] + pad,
+        'Saturacion_actual': before,
+        'Saturacion': after,
+        'cumple': after <= target * (1 + 1e-9),
+        'Horas_Totales': horas_totales,
+        'Horas_Hombre': horas_hombre,
+    })
+    summary['cumple'] &= np.concatenate([feasible | ~solve, np.ones(n_centros - n_orig, dtype=bool)])
+
+    return {
+        "summary": serialization.to_records(summary),
+        "center_configs": {
+            str(master.centros[c]): {"shifts": int(chosen[c])} for c in range(n_orig) if chosen[c] != sc.h_turno
+        },
+        "meta": {
+            "master_version": master.version,
+            "target": target,
+            "mode": mode,
+            "options": options.astype(int).tolist() if mode == 'shifts' else None,
+            "dias_laborales": sc.d_lab if sc.d_lab is not None else 238,
+            "horas_turno_global": sc.h_turno,
+            "num_overrides": len(sc.overrides),
+            "centros_sin_solucion": [str(master.centros[c]) for c in np.flatnonzero(solve & ~feasible)],
+        },
+    }
@@ -0,0 +1,121 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.core import serialization
+
+# Clave de fila del maestro. Si un (Articulo, Centro) se repite, se empareja por orden de aparición.
+KEY_COLUMNS = ['Articulo', 'Centro']
+
+# Filas de detalle que se guardan en cada informe (los contadores siempre son completos)
+MAX_REPORT_ROWS = 500
+
+
+def changes_path_for(excel_path):
+    return excel_path + ".changes.jsonl"
+
+
+def _keyed(df: pd.DataFrame, pos_name):
+    keys = pd.DataFrame({col: df[col].astype(str).to_numpy() for col in KEY_COLUMNS})
+    keys['_occ'] = keys.groupby(KEY_COLUMNS, sort=False).cumcount()
+    keys[pos_name] = np.arange(len(keys))
+    return keys
+
+
+def _differs(old_values, new_values):
+    """Comparación por elementos en la que dos nulos se consideran iguales."""
+    old_na, new_na = pd.isna(old_values), pd.isna(new_values)
+    with np.errstate(invalid='ignore'):
+        equal = old_values == new_values
+    return ~(np.asarray(equal, dtype=bool) | (old_na & new_na))
+
+
+def diff_frames(old: pd.DataFrame, new: pd.DataFrame, old_version=None, new_version=None):
+    """
+    Compara dos versiones canónicas del maestro fila a fila por (Articulo, Centro).
+
+    Retorna (informe, reuse): `reuse[p]` es la posición en la versión anterior de la fila `p`
+    de la nueva si no ha cambiado en nada, o -1 si es nueva o ha cambiado. El informe cuenta
+    altas, bajas y modificaciones, lista los centros afectados y guarda el detalle de las
+    primeras MAX_REPORT_ROWS filas (en las modificaciones, columna -> [antes, después]).
+    """
+    old_keys = _keyed(old, '_old')
+    new_keys = _keyed(new, '_new')
+    merged = new_keys.merge(old_keys, on=KEY_COLUMNS + ['_occ'], how='outer')
+
+    both = merged[merged['_new'].notna() & merged['_old'].notna()]
+    new_pos = both['_new'].to_numpy(dtype=np.int64)
+    old_pos = both['_old'].to_numpy(dtype=np.int64)
+    inserted = merged.loc[merged['_old'].isna(), '_new'].to_numpy(dtype=np.int64)
+    deleted = merged.loc[merged['_new'].isna(), '_old'].to_numpy(dtype=np.int64)
+
+    skip = set(KEY_COLUMNS) | {'centro_original'}
+    common = [c for c in new.columns if c in old.columns and c not in skip]
+    changed_cols = {}
+    updated = np.zeros(len(both), dtype=bool)
+    for col in common:
+        mask = _differs(old[col].to_numpy()[old_pos], new[col].to_numpy()[new_pos])
+        if mask.any():
+            changed_cols[col] = mask
+            updated |= mask
+
+    reuse = np.full(len(new), -1, dtype=np.int64)
+    reuse[new_pos[~updated]] = old_pos[~updated]
+
+    centros = set(new['Centro'].astype(str).to_numpy()[inserted])
+    centros |= set(old['Centro'].astype(str).to_numpy()[deleted])
+    centros |= set(new['Centro'].astype(str).to_numpy()[new_pos[updated]])
+
+    changes = []
+    for p in inserted[:MAX_REPORT_ROWS]:
+        changes.append({"type": "insert", "articulo": str(new['Articulo'].iat[p]), "centro": str(new['Centro'].iat[p])})
+    for p in deleted[:max(0, MAX_REPORT_ROWS - len(changes))]:
+        changes.append({"type": "delete", "articulo": str(old['Articulo'].iat[p]), "centro": str(old['Centro'].iat[p])})
+    for i in np.flatnonzero(updated)[:max(0, MAX_REPORT_ROWS - len(changes))]:
+        o, n = old_pos[i], new_pos[i]
+        changes.append({
+            "type": "update",
+            "articulo": str(new['Articulo'].iat[n]),
+            "centro": str(new['Centro'].iat[n]),
+            "columns": {col: [old[col].iat[o], new[col].iat[n]] for col, mask in changed_cols.items() if mask[i]},
+        })
+
+    report = {
+        "from_version": old_version,
+        "to_version": new_version,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "rows_before": len(old),
+        "rows_after": len(new),
+        "inserted": int(len(inserted)),
+        "deleted": int(len(deleted)),
+        "updated": int(updated.sum()),
+        "unchanged": int((reuse >= 0).sum()),
+        "columns_added": [c for c in new.columns if c not in old.columns],
+        "columns_removed": [c for c in old.columns if c not in new.columns],
+        "changed_columns": {col: int(mask.sum()) for col, mask in changed_cols.items()},
+        "changed_centros": sorted(centros),
+        "changes": changes,
+        "truncated": len(inserted) + len(deleted) + int(updated.sum()) > len(changes),
+    }
+    return report, reuse
+
+
+def record_report(report, excel_path):
+    """Añade el informe al histórico `<excel>.changes.jsonl`."""
+    try:
+        with open(changes_path_for(excel_path), 'ab') as f:
+            f.write(serialization.dumps(report) + b'\n')
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el informe de cambios del maestro: {e}", flush=True)
+
+
+def load_reports(excel_path, limit=10):
+    """Últimos informes del histórico (el más reciente primero)."""
+    try:
+        with open(changes_path_for(excel_path), 'rb') as f:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+    except OSError:
+        return []
+    return [json.loads(line) for line in reversed(lines[-limit:])]
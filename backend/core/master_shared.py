@@ -0,0 +1,164 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # sin pyarrow no hay almacén columnar ni modo compartido
+    pa = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from backend.core.master_store import SCHEMA_VERSION, MasterStoreError
+
+# Tiempo máximo esperando a que otro proceso termine de publicar una versión del maestro
+LOCK_TIMEOUT_SECONDS = float(os.environ.get("RPK_MASTER_LOCK_TIMEOUT", 300))
+
+
+def lock_path_for(store_path):
+    return store_path + ".lock"
+
+
+def generation_path_for(store_path):
+    return store_path + ".generation"
+
+
+def engine_path_for(store_path, version, dtype=np.float64):
+    """Arrays del motor de una versión y tipo concretos (uno por versión: nunca se sobrescribe uno mapeado)."""
+    return f"{store_path}.engine.v{SCHEMA_VERSION}.{np.dtype(dtype).str[1:]}.{version}"
+
+
+@contextmanager
+def publish_lock(store_path, timeout=LOCK_TIMEOUT_SECONDS):
+    """
+    Cerrojo entre procesos (workers de uvicorn) sobre `<almacén>.lock`: solo uno lee el
+    Excel y escribe el almacén a la vez; el resto espera y después adjunta lo publicado.
+    """
+    with open(lock_path_for(store_path), 'a+b') as f:
+        deadline = time.monotonic() + timeout
+        if fcntl is not None:
+            while True:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() > deadline:
+                        raise MasterStoreError(f"Tiempo de espera agotado esperando el cerrojo {lock_path_for(store_path)}")
+                    time.sleep(0.05)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise MasterStoreError(f"Tiempo de espera agotado esperando el cerrojo {lock_path_for(store_path)}")
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_generation(store_path):
+    """Versión publicada: {generation, version, store, engine, published_at} o None."""
+    try:
+        with open(generation_path_for(store_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def publish_generation(store_path, version, store_file, engine_file):
+    """
+    Anuncia `version` al resto de workers. El contador solo sube si la versión cambia.
+    Se llama con publish_lock tomado. Retorna (generación, True si la ha publicado este proceso).
+    """
+    current = read_generation(store_path)
+    if current is not None and current.get('version') == version and current.get('store') == store_file:
+        return current['generation'], False
+    record = {
+        'generation': (current or {}).get('generation', 0) + 1,
+        'version': version,
+        'store': store_file,
+        'engine': engine_file,
+        'published_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    path = generation_path_for(store_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f)
+    # En Windows el reemplazo falla si otro proceso está leyendo el fichero justo en ese momento
+    for attempt in range(20):
+        try:
+            os.replace(tmp_path, path)
+            break
+        except PermissionError:
+            if attempt == 19:
+                raise
+            time.sleep(0.05)
+    return record['generation'], True
+
+
+def write_engine(path, arrays, rows):
+    """
+    Guarda los arrays del motor (float64 / int64, una fila por fila del maestro) en Arrow IPC
+    sin compresión, para que cada worker los mapee sin copiarlos. Los NaN se guardan como
+    valores, no como nulos, para poder leerlos sin copia.
+    """
+    if pa is None:
+        raise MasterStoreError("pyarrow no está instalado")
+    names = sorted(arrays)
+    table = pa.table({name: pa.array(np.ascontiguousarray(arrays[name]), from_pandas=False) for name in names})
+    table = table.replace_schema_metadata({b'rpk_engine_rows': str(rows).encode('utf-8')})
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def open_engine(path, rows):
+    """
+    Mapea los arrays del motor de `path` (solo lectura, sin copia). None si no existe o no
+    corresponde a un maestro de `rows` filas.
+    """
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    except (pa.ArrowInvalid, OSError):
+        return None
+    if table.num_rows != rows or (table.schema.metadata or {}).get(b'rpk_engine_rows') != str(rows).encode('utf-8'):
+        return None
+    arrays = {}
+    for name in table.column_names:
+        column = table.column(name)
+        # Un único bloque sin nulos: el array de numpy apunta directamente a las páginas mapeadas
+        arrays[name] = column.chunk(0).to_numpy(zero_copy_only=True) if column.num_chunks == 1 else column.to_numpy()
+    return arrays
+
+
+def remove_old_engines(store_path, keep):
+    """Borra ficheros de arrays de versiones anteriores (los que otro proceso siga mapeando en Windows no se pueden)."""
+    folder, name = os.path.split(os.path.abspath(f"{store_path}.engine."))
+    for entry in os.listdir(folder):
+        if entry.startswith(name) and os.path.join(folder, entry) != os.path.abspath(keep) and not entry.endswith('.tmp'):
+            try:
+                os.remove(os.path.join(folder, entry))
+            except OSError:
+                pass
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pyarrow es opcional: sin él se trabaja directamente con el Excel
+    pa = None
+
+# Versión del esquema del almacén columnar. Subirla obliga a regenerar el fichero desde el Excel.
+# v2: columnas del motor con sus valores por defecto ya aplicados (ver canonicalize)
+SCHEMA_VERSION = 2
+
+# Claves del maestro: se guardan como columnas diccionario (categóricas)
+KEY_COLUMNS = ['Articulo', 'Centro', 'centro_original']
+
+# Columnas numéricas que usa el motor: se coercionan siempre aunque traigan texto basura
+ENGINE_NUMERIC_COLUMNS = [
+    'Volumen anual', 'Piezas por minuto', '%OEE', 'dias laborales 2026',
+    'Ratio_MOD', 'Ratio MOD', 'Ratio Persona Maquina', 'Ratio Persona Articulo', 'MOD',
+    'Setup (h)',
+]
+
+# Valor por defecto de las columnas del motor cuando la celda está vacía o no es numérica
+ENGINE_DEFAULTS = {
+    'Volumen anual': 0.0,
+    'Piezas por minuto': 0.0,
+    '%OEE': 0.0,
+    'dias laborales 2026': 238.0,
+    'Ratio_MOD': 1.0,
+}
+
+# Nombres alternativos del ratio de personal (MOD); gana el primero que exista
+RATIO_MOD_ALIASES = ['Ratio_MOD', 'Ratio MOD', 'Ratio Persona Maquina', 'Ratio Persona Articulo', 'MOD']
+
+_METADATA_KEY = b'rpk_master'
+
+
+class MasterStoreError(Exception):
+    """El almacén columnar no existe, está corrupto o no corresponde al Excel actual."""
+
+
+def is_available():
+    """Indica si pyarrow está instalado y por tanto se puede usar el almacén columnar."""
+    return pa is not None
+
+
+def store_path_for(excel_path):
+    return excel_path + ".arrow"
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """SHA-256 del fichero fuente, usado para detectar si el almacén está obsoleto."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def coerce_master_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fija un esquema explícito para el maestro:
+    - Claves como texto (se guardan diccionario-codificadas).
+    - Columnas del motor siempre numéricas (float64, NaN si no se pueden convertir).
+    - Resto de columnas object: numéricas si todos sus valores lo son, texto en caso contrario.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col in KEY_COLUMNS:
+            df[col] = df[col].astype(str)
+        elif col in ENGINE_NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif df[col].dtype == object:
+            converted = pd.to_numeric(df[col], errors='coerce')
+            if converted.notna().sum() == df[col].notna().sum():
+                df[col] = converted
+            else:
+                df[col] = df[col].astype('string')
+    return df
+
+
+def canonicalize(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Esquema canónico del maestro: tipos explícitos (coerce_master_types) y columnas del
+    motor sin huecos, con sus valores por defecto. Se hace una vez al ingerir el Excel.
+    """
+    df = coerce_master_types(df)
+    for col, default in ENGINE_DEFAULTS.items():
+        if col in df.columns:
+            df[col] = df[col].fillna(default)
+    return df
+
+
+def normalize_oee(oee):
+    """OEE como fracción: los valores por encima de 1.1 vienen en porcentaje (85 -> 0.85)."""
+    oee = np.asarray(oee, dtype=float)
+    return np.where(oee > 1.1, oee / 100.0, oee)
+
+
+def engine_arrays(df: pd.DataFrame) -> dict:
+    """
+    Arrays float limpios con los que trabaja el motor, a partir de las columnas del maestro:
+    numéricos con sus valores por defecto, Ratio_MOD resuelto entre sus alias y el OEE ya
+    normalizado en `OEE_calc`. 'Setup (h)' solo aparece si el maestro la trae (puede tener NaN).
+    """
+    n = len(df)
+
+    def numeric(col, default):
+        if col not in df.columns:
+            return np.full(n, default, dtype=float)
+        return pd.to_numeric(df[col], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+    arrays = {col: numeric(col, default) for col, default in ENGINE_DEFAULTS.items() if col != 'Ratio_MOD'}
+    ratio_col = next((col for col in RATIO_MOD_ALIASES if col in df.columns), None)
+    arrays['Ratio_MOD'] = numeric(ratio_col, ENGINE_DEFAULTS['Ratio_MOD'])
+    arrays['OEE_calc'] = normalize_oee(arrays['%OEE'])
+    if 'Setup (h)' in df.columns:
+        arrays['Setup (h)'] = pd.to_numeric(df['Setup (h)'], errors='coerce').to_numpy(dtype=float)
+    return arrays
+
+
+def write_store(df: pd.DataFrame, path, source_checksum):
+    """
+    Guarda el maestro en formato Arrow IPC sin compresión (apto para memory-map).
+    Se escribe en un temporal y se renombra, de modo que una versión anterior que siga
+    mapeada en memoria conserva su fichero. En Windows no se puede reemplazar un fichero
+    mapeado: entonces el almacén nuevo queda junto al anterior (`<path>.<checksum>`).
+    Retorna la ruta donde ha quedado el almacén.
+    """
+    if pa is None:
+        raise MasterStoreError("pyarrow no está instalado")
+
+    df = canonicalize(df)
+    for col in KEY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = {
+        'schema_version': SCHEMA_VERSION,
+        'source_checksum': source_checksum,
+        'rows': len(df),
+        'columns': {field.name: str(field.type) for field in table.schema},
+        'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        _METADATA_KEY: json.dumps(metadata).encode('utf-8'),
+    })
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        _verify_store(tmp_path, table.schema.names, len(df), source_checksum)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    try:
+        os.replace(tmp_path, path)
+        _remove_side_stores(path)
+        return path
+    except PermissionError:
+        side_path = f"{path}.{(source_checksum or 'nuevo')[:12]}"
+        os.replace(tmp_path, side_path)
+        return side_path
+
+
+def _verify_store(path, columns, rows, source_checksum):
+    """
+    Relee el fichero recién escrito antes de publicarlo: tiene que abrirse entero y traer
+    las mismas columnas, filas y checksum del Excel que se han escrito.
+    """
+    with pa.memory_map(path, 'r') as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            written = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            raw = (reader.schema.metadata or {}).get(_METADATA_KEY)
+            names = reader.schema.names
+        except pa.ArrowInvalid as e:
+            raise MasterStoreError(f"El almacén escrito es ilegible ({path}): {e}")
+    metadata = json.loads(raw.decode('utf-8')) if raw else {}
+    if names != list(columns) or written != rows or metadata.get('rows') != rows or metadata.get('source_checksum') != source_checksum:
+        raise MasterStoreError(f"El almacén escrito no coincide con el maestro ({path}: {written} filas de {rows})")
+
+
+def _remove_side_stores(path):
+    """Borra almacenes `<path>.<checksum>` de versiones anteriores (los que sigan en uso no se pueden borrar)."""
+    folder, name = os.path.split(os.path.abspath(path))
+    for entry in os.listdir(folder):
+        suffix = entry[len(name) + 1:]
+        if entry.startswith(name + '.') and len(suffix) == 12 and all(c in '0123456789abcdef' for c in suffix):
+            try:
+                os.remove(os.path.join(folder, entry))
+            except OSError:
+                pass
+
+
+def open_store(path):
+    """
+    Abre el almacén mapeado en memoria. Devuelve (tabla Arrow, metadatos).
+    La tabla referencia directamente las páginas del fichero: nada se copia hasta
+    que se materializa una columna.
+    """
+    if pa is None:
+        raise MasterStoreError("pyarrow no está instalado")
+    if not os.path.exists(path):
+        raise MasterStoreError(f"No existe el almacén columnar: {path}")
+
+    try:
+        source = pa.memory_map(path, 'r')
+        table = pa.ipc.open_file(source).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise MasterStoreError(f"Almacén columnar ilegible ({path}): {e}")
+
+    raw = (table.schema.metadata or {}).get(_METADATA_KEY)
+    if raw is None:
+        raise MasterStoreError(f"El almacén {path} no tiene metadatos RPK")
+    metadata = json.loads(raw.decode('utf-8'))
+    if metadata.get('schema_version') != SCHEMA_VERSION:
+        raise MasterStoreError(
+            f"Versión de esquema {metadata.get('schema_version')} != {SCHEMA_VERSION}"
+        )
+    if metadata.get('rows') != table.num_rows:
+        raise MasterStoreError(f"El almacén {path} está incompleto: {table.num_rows} filas de {metadata.get('rows')}")
+    return table, metadata
+
+
+def materialize_columns(table, columns) -> pd.DataFrame:
+    """Convierte a pandas solo las columnas pedidas. Las claves vuelven como texto."""
+    df = table.select(list(columns)).to_pandas()
+    for col in KEY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+    return df
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+from backend.core import master_shared, master_store, simulation_core
+
+
+class MasterWatcher:
+    """
+    Hilo en segundo plano que vigila el Excel maestro y publica la nueva versión
+    (simulation_core.reload_master) cuando cambia, fuera del camino de las peticiones.
+
+    Se compara tamaño y fecha de modificación en cada vuelta; la recarga solo se lanza
+    cuando el fichero lleva una vuelta entera sin cambiar, para no leer un Excel a medio
+    guardar. Si la carga falla (fichero bloqueado, corrupto...) se reintenta en la siguiente.
+    """
+
+    def __init__(self, interval_seconds=5.0):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._seen = None        # firma (mtime, tamaño) de la última vuelta
+        self._loaded = None      # firma de la versión publicada
+        self._generation_seen = None  # última generación publicada por otro worker que se ha visto
+        self.checks = 0
+        self.reloads = 0
+        self.last_error = None
+        self.last_reload_at = None
+
+    @staticmethod
+    def _signature():
+        try:
+            st = os.stat(simulation_core.EXCEL_PATH)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._seen = self._loaded = self._signature()
+        self._thread = threading.Thread(target=self._run, name="rpk-master-watcher", daemon=True)
+        self._thread.start()
+        print(f"👀 Vigilando el Excel maestro cada {self.interval_seconds}s: {simulation_core.EXCEL_PATH}", flush=True)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.check()
+
+    def _published_elsewhere(self):
+        """True si otro worker ha publicado una generación del maestro distinta de la cargada aquí."""
+        master = simulation_core.current_master()
+        if master is None or not master_store.is_available():
+            return False
+        record = master_shared.read_generation(master_store.store_path_for(simulation_core.EXCEL_PATH))
+        if record is None or record.get('generation') in (master.generation, self._generation_seen):
+            return False
+        self._generation_seen = record.get('generation')
+        return record.get('version') != master.version
+
+    def check(self):
+        """Una vuelta de vigilancia. Retorna True si se ha publicado una versión nueva."""
+        self.checks += 1
+        signature = self._signature()
+        stable = signature == self._seen
+        self._seen = signature
+        # Con varios workers, el primero que ve el cambio carga y publica; el resto adjunta
+        # su almacén sin esperar a que el Excel lleve una vuelta estable
+        if self._published_elsewhere():
+            return self._reload(signature)
+        if signature is None or not stable or signature == self._loaded:
+            return False
+        # Todavía no se ha cargado nunca: la primera petición cargará ya la versión nueva
+        if simulation_core.current_master() is None:
+            self._loaded = signature
+            return False
+        return self._reload(signature)
+
+    def _reload(self, signature):
+        try:
+            changed = simulation_core.reload_master()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ No se pudo recargar el maestro (se reintentará): {self.last_error}", flush=True)
+            return False
+        self._loaded = signature
+        self.last_error = None
+        if changed:
+            self.reloads += 1
+            self.last_reload_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        return changed
+
+    def stats(self):
+        return {
+            "running": self._thread is not None,
+            "interval_seconds": self.interval_seconds,
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "last_reload_at": self.last_reload_at,
+            "last_error": self.last_error,
+        }
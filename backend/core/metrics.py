@@ -0,0 +1,227 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+
+# RPK_METRICS=0 desactiva el registro: stage/timed/inc no hacen nada y /metrics responde 404
+ENABLED = os.environ.get("RPK_METRICS", "1") != "0"
+
+# Límites de los buckets de los histogramas de tiempos (segundos)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_HELP = {
+    'rpk_stage_seconds': "Duración de cada etapa del cálculo (segundos)",
+    'rpk_http_request_seconds': "Duración de las peticiones HTTP por ruta (segundos)",
+    'rpk_rows_processed_total': "Filas del maestro calculadas por el motor",
+    'rpk_overrides_applied_total': "Overrides aplicados en simulaciones calculadas",
+    'rpk_http_requests_total': "Peticiones HTTP por ruta y código de respuesta",
+}
+
+_NULL_STAGE = contextlib.nullcontext()
+
+# Tiempos por etapa de la petición en curso (Server-Timing); None fuera de una petición
+_request_timings = contextvars.ContextVar('rpk_request_timings', default=None)
+
+
+class Histogram:
+    """Histograma acumulado al estilo Prometheus (buckets fijos, suma y cuenta)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Histogramas y contadores con etiquetas, en memoria del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (nombre, etiquetas) -> Histogram
+        self._counters = {}    # (nombre, etiquetas) -> valor
+        self._collectors = []
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_collector(self, collector):
+        """
+        `collector()` retorna [(nombre, tipo, ayuda, [(etiquetas, valor), ...]), ...] con
+        métricas que ya cuenta otro componente (caché, pool de cálculo...) y se leen al exportar.
+        """
+        self._collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        """Exportación en formato de texto de Prometheus."""
+        with self._lock:
+            histograms = sorted((k, (list(h.counts), h.sum, h.count)) for k, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        seen = set()
+
+        def header(name, kind, help_text=None):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {help_text or _HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), (counts, total, count) in histograms:
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                header(name, kind, help_text)
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class _Stage:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if ENABLED:
+            registry.observe('rpk_stage_seconds', elapsed, stage=self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[self.stage] = timings.get(self.stage, 0.0) + elapsed
+        return False
+
+
+def _measuring():
+    return ENABLED or _request_timings.get() is not None
+
+
+def stage(name):
+    """Context manager que mide una etapa del cálculo (`with metrics.stage('overrides'): ...`)."""
+    return _Stage(name) if _measuring() else _NULL_STAGE
+
+
+def timed(name):
+    """Decorador equivalente a `stage` para una función entera."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _measuring():
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inc(name, value=1, **labels):
+    if ENABLED:
+        registry.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    if ENABLED:
+        registry.observe(name, value, **labels)
+
+
+def start_request():
+    """Empieza a acumular los tiempos por etapa de la petición actual. Retorna el dict {etapa: segundos}."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def request_timings():
+    return _request_timings.get()
+
+
+@contextlib.contextmanager
+def collect(timings):
+    """
+    Acumula en `timings` las etapas medidas dentro del bloque. Los hilos del pool de cálculo
+    no heredan el contexto de la petición: el trabajo se envuelve con esto dentro del hilo.
+    """
+    if timings is None:
+        yield
+        return
+    token = _request_timings.set(timings)
+    try:
+        yield
+    finally:
+        _request_timings.reset(token)
+
+
+# Etapas del Server-Timing y las etapas medidas que suma cada una
+SERVER_TIMING_STAGES = (
+    ('load', ('master_load', 'master_reload')),
+    ('overrides', ('overrides', 'overlay')),
+    ('calc', ('calculate',)),
+    ('aggregate', ('aggregate',)),
+    ('serialize', ('serialize',)),
+)
+
+
+def server_timing(timings, total=None):
+    """Cabecera Server-Timing (milisegundos) a partir de los tiempos de una petición."""
+    parts = [
+        f"{name};dur={sum(timings.get(s, 0.0) for s in stages) * 1000:.2f}"
+        for name, stages in SERVER_TIMING_STAGES
+    ]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
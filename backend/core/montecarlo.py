@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+
+from backend.core import batch, projection, simulation_core
+
+# Máximo de muestras por petición
+MAX_SAMPLES = int(os.environ.get("RPK_MC_MAX_SAMPLES", 20000))
+
+# Parámetros por defecto de cada distribución (factores multiplicativos alrededor de 1)
+DISTRIBUTIONS = {
+    'none': {},
+    'normal': {'sd': 0.05},
+    'lognormal': {'sigma': 0.05},
+    'uniform': {'low': 0.95, 'high': 1.05},
+    'triangular': {'low': 0.9, 'mode': 1.0, 'high': 1.05},
+}
+
+# Factor mínimo de la normal: con un sd grande la cola izquierda daría factores <= 0
+# (demanda negativa, OEE nulo que el motor trata como 0 horas); se acotan a este valor.
+# Se acota en lugar de volver a sortear para que el resultado no dependa del tamaño de bloque.
+MIN_NORMAL_FACTOR = 0.01
+
+
+def _check_distribution(spec, name):
+    if not spec:
+        return None
+    dist = spec.get('dist') or 'normal'
+    if dist not in DISTRIBUTIONS:
+        raise projection.InvalidQuery(f"Distribución desconocida para {name}: '{dist}'. Usa: {', '.join(DISTRIBUTIONS)}")
+    if dist == 'none':
+        return None
+    params = {k: float(spec[k]) if spec.get(k) is not None else v for k, v in DISTRIBUTIONS[dist].items()}
+    if any(params.get(k, 0) < 0 for k in ('sd', 'sigma')) or params.get('low', 1) <= 0:
+        raise projection.InvalidQuery(f"Parámetros negativos (o low nulo) en la distribución de {name}")
+    if dist in ('uniform', 'triangular') and not params['low'] <= params.get('mode', params['low']) <= params['high']:
+        raise projection.InvalidQuery(f"Se necesita low <= mode <= high en la distribución de {name}")
+    return {'dist': dist, 'shared': bool(spec.get('shared')), **params}
+
+
+def _draw(rng, spec, k, n):
+    """
+    Factores multiplicativos (k muestras × n filas). Con `shared` se sortea un único factor
+    por muestra para todas las filas (incertidumbre totalmente correlada).
+    """
+    shape = (k, 1) if spec['shared'] else (k, n)
+    dist = spec['dist']
+    if dist == 'normal':
+        return np.maximum(rng.normal(1.0, spec['sd'], shape), MIN_NORMAL_FACTOR)
+    if dist == 'lognormal':
+        sigma = spec['sigma']
+        return rng.lognormal(-sigma * sigma / 2, sigma, shape)  # media 1
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], shape)
+    if spec['low'] == spec['high']:
+        return np.full(shape, spec['low'])
+    return rng.triangular(spec['low'], spec['mode'], spec['high'], shape)
+
+
+def simulate_monte_carlo(spec, samples=1000, seed=None, oee=None, demanda=None, percentiles=(50, 90), threshold=1.0):
+    """
+    Saturación por centro bajo incertidumbre de %OEE y demanda (Volumen anual).
+
+    Parte de los arrays canónicos por fila del motor (maestro + overrides de `spec`) y
+    sortea `samples` factores multiplicativos por fila con la distribución pedida para cada
+    variable (`oee`, `demanda`: dicts {dist, parámetros, shared}). Todo el cálculo es con
+    arrays (muestras × filas) por bloques; la semilla hace el resultado reproducible.
+
+    Retorna por centro los percentiles pedidos, la media, la probabilidad de superar
+    `threshold` (1.0 = 100%) y la saturación determinista de referencia.
+    """
+    samples = int(samples)
+    if not 1 <= samples <= MAX_SAMPLES:
+        raise projection.InvalidQuery(f"samples debe estar entre 1 y {MAX_SAMPLES}")
+    percentiles = [float(p) for p in percentiles]
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise projection.InvalidQuery("Los percentiles deben estar entre 0 y 100")
+    oee, demanda = _check_distribution(oee, '%OEE'), _check_distribution(demanda, 'demanda')
+
+    master = simulation_core.get_master()
+    sc = batch.ResolvedScenario(master, spec, 0)
+    centros, code_of = batch.centro_categories(master, [sc.overlay])
+    n_centros, n = len(centros), master.n_rows
+    codes, capacidad = batch.scenario_capacity(master, sc, code_of)
+
+    overlay = sc.overlay
+    volumen = overlay.patched(master, 'Volumen anual')
+    piezas_hora = overlay.patched(master, 'Piezas por hora')
+    oee_base = overlay.patched(master, 'OEE_calc')
+    # El OEE sorteado no pasa del 100% (ni del propio valor base si ya lo supera)
+    oee_cap = np.maximum(oee_base, 1.0)
+    setup = overlay.patched(master, 'Setup (h)') if 'Setup (h)' in master.base else 0.0
+
+    def saturation(f_dem, f_oee):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            oee_s = oee_base if f_oee is None else np.minimum(oee_base * f_oee, oee_cap)
+            produccion = (volumen if f_dem is None else volumen * f_dem) / (piezas_hora * oee_s)
+            produccion[~np.isfinite(produccion)] = 0
+            sat = (produccion + setup) / capacidad
+        sat[~np.isfinite(sat)] = 0
+        return sat
+
+    # Un generador por variable: el resultado no depende del tamaño de bloque
+    rng_dem, rng_oee = (np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2))
+    by_sample = np.empty((samples, n_centros))
+    block_size = max(1, batch.MAX_BLOCK_CELLS // max(n, 1))
+    for start in range(0, samples, block_size):
+        k = min(block_size, samples - start)
+        f_dem = _draw(rng_dem, demanda, k, n) if demanda else None
+        f_oee = _draw(rng_oee, oee, k, n) if oee else None
+        sat = np.broadcast_to(saturation(f_dem, f_oee), (k, n))
+        flat = (np.arange(k)[:, None] * n_centros + codes).ravel()
+        by_sample[start:start + k] = np.bincount(flat, weights=sat.ravel(), minlength=k * n_centros).reshape(k, n_centros)
+
+    deterministic = np.bincount(codes, weights=saturation(None, None), minlength=n_centros)
+    return {
+        "centros": centros,
+        "percentiles": {f"P{p:g}": np.percentile(by_sample, p, axis=0) for p in percentiles},
+        "mean": by_sample.mean(axis=0),
+        "std": by_sample.std(axis=0),
+        "p_over_threshold": (by_sample > threshold).mean(axis=0),
+        "deterministic": deterministic,
+        "meta": {
+            "master_version": master.version,
+            "samples": samples,
+            "seed": seed,
+            "threshold": threshold,
+            "oee": oee,
+            "demanda": demanda,
+            "dias_laborales": sc.d_lab if sc.d_lab is not None else 238,
+            "horas_turno_global": sc.h_turno,
+            "num_overrides": len(sc.overrides),
+        },
+    }
@@ -0,0 +1,154 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.core import batch, projection, simulation_core
+
+# Máximo de traslados que puede proponer una petición
+MAX_MOVES = int(os.environ.get("RPK_OPTIMIZER_MAX_MOVES", 200))
+
+
+def _candidates(units: pd.DataFrame, code_of, allowed_targets, compatibility):
+    """
+    Parejas (unidad, centro destino) permitidas. `allowed_targets` es {articulo: [centros]};
+    `compatibility` es {centro: [centros]} y vale para todos los artículos de ese centro.
+    Si un artículo aparece en `allowed_targets`, la tabla de compatibilidad no se le aplica.
+    """
+    cand_unit, cand_target = [], []
+    articulos = units['articulo'].to_numpy()
+    explicit = [str(a) for a in (allowed_targets or {})]
+
+    groups = [(units.groupby('articulo', sort=False).indices, allowed_targets or {}, False),
+              (units.groupby('centro', sort=False).indices, compatibility or {}, True)]
+    for index, table, skip_explicit in groups:
+        for key, targets in table.items():
+            idx = index.get(str(key))
+            if idx is None:
+                continue
+            if skip_explicit and explicit:
+                idx = idx[~np.isin(articulos[idx], explicit)]
+            for t in targets:
+                cand_unit.append(idx)
+                cand_target.append(np.full(len(idx), code_of[str(t)]))
+
+    if not cand_unit:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    cand_unit = np.concatenate(cand_unit).astype(np.int64)
+    cand_target = np.concatenate(cand_target).astype(np.int64)
+    # Fuera los "traslados" al propio centro
+    keep = cand_target != units['code'].to_numpy()[cand_unit]
+    return cand_unit[keep], cand_target[keep]
+
+
+class _Move:
+    """Traslado propuesto, con los atributos de un override."""
+
+    def __init__(self, articulo, centro, new_centro):
+        self.articulo = articulo
+        self.centro = centro
+        self.new_centro = new_centro
+
+
+def optimize_moves(spec, allowed_targets=None, compatibility=None, max_moves=20, target=None):
+    """
+    Busca traslados `new_centro` que bajen la saturación máxima entre centros.
+
+    Búsqueda voraz: en cada paso toma el centro más saturado y evalúa de una vez (con arrays)
+    todos los traslados permitidos de sus artículos, quedándose con el que deja el máximo más
+    bajo. Las cargas por centro se actualizan de forma incremental (la saturación de un
+    artículo no cambia al moverlo: su turno sigue siendo el de su centro original).
+    Para cuando no hay mejora estricta, se alcanza `target` o se llega a `max_moves`.
+    Cada artículo (Articulo, Centro) se mueve como mucho una vez.
+
+    Retorna los traslados en forma de OverrideBase (`moves`), la lista completa lista para
+    guardar como escenario (`overrides`: los del escenario de partida + los traslados) y la
+    saturación por centro antes y después.
+    """
+    if not allowed_targets and not compatibility:
+        raise projection.InvalidQuery("Indica los centros destino permitidos (allowed_targets o compatibility)")
+    max_moves = int(max_moves)
+    if not 1 <= max_moves <= MAX_MOVES:
+        raise projection.InvalidQuery(f"max_moves debe estar entre 1 y {MAX_MOVES}")
+
+    master = simulation_core.get_master()
+    sc = batch.ResolvedScenario(master, spec, 0)
+    centros, code_of = batch.centro_categories(master, [sc.overlay])
+    for targets in list((allowed_targets or {}).values()) + list((compatibility or {}).values()):
+        for t in targets:
+            if str(t) not in code_of:
+                code_of[str(t)] = len(centros)
+                centros.append(str(t))
+    n_centros = len(centros)
+
+    codes, capacidad = batch.scenario_capacity(master, sc, code_of)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saturacion = sc.overlay.patched(master, 'Horas_Totales') / capacidad
+    saturacion[~np.isfinite(saturacion)] = 0
+    load = np.bincount(codes, weights=saturacion, minlength=n_centros)
+    before = load.copy()
+
+    # Unidad de traslado: filas con el mismo (Articulo, Centro actual), que un override mueve juntas
+    rows = pd.DataFrame({'articulo': master.articulo, 'code': codes, 'sat': saturacion})
+    units = rows.groupby(['articulo', 'code'], sort=False).agg(sat=('sat', 'sum'), filas=('sat', 'size')).reset_index()
+    units['centro'] = np.array(centros, dtype=object)[units['code'].to_numpy()]
+    cand_unit, cand_target = _candidates(units, code_of, allowed_targets, compatibility)
+
+    unit_code = units['code'].to_numpy().copy()
+    unit_sat = units['sat'].to_numpy()
+    moved = np.zeros(len(units), dtype=bool)
+    moves = []
+
+    while len(moves) < max_moves:
+        top = int(np.argmax(load))
+        peak = load[top]
+        if target is not None and peak <= target:
+            break
+        sel = (unit_code[cand_unit] == top) & ~moved[cand_unit]
+        if not sel.any():
+            break
+        u, t = cand_unit[sel], cand_target[sel]
+        s = unit_sat[u]
+
+        # Máximo del resto de centros (sin el origen ni el destino) con los tres mayores
+        order = np.argsort(load)[::-1]
+        second = load[order[1]] if n_centros > 1 else 0.0
+        third = load[order[2]] if n_centros > 2 else 0.0
+        others = np.where(t == order[1], third, second)
+        new_peak = np.maximum(np.maximum(peak - s, load[t] + s), others)
+
+        # Mejor máximo resultante; a igualdad, el traslado que mueve menos carga
+        best = np.lexsort((s, new_peak))[0]
+        if new_peak[best] >= peak - 1e-12:
+            break
+        unit, dest = u[best], t[best]
+        load[top] -= unit_sat[unit]
+        load[dest] += unit_sat[unit]
+        unit_code[unit] = dest
+        moved[unit] = True
+        moves.append((unit, top, dest))
+
+    move_overrides = [
+        simulation_core.override_fields(
+            _Move(str(units.at[unit, 'articulo']), centros[src], centros[dest])
+        ) for unit, src, dest in moves
+    ]
+    return {
+        "moves": move_overrides,
+        "overrides": [simulation_core.override_fields(ov) for ov in sc.overrides] + move_overrides,
+        "centros": centros,
+        "saturacion_antes": before,
+        "saturacion_despues": load,
+        "max_antes": {"centro": centros[int(np.argmax(before))], "saturacion": float(before.max())},
+        "max_despues": {"centro": centros[int(np.argmax(load))], "saturacion": float(load.max())},
+        "meta": {
+            "master_version": master.version,
+            "num_candidates": int(len(cand_unit)),
+            "num_moves": len(moves),
+            "target": target,
+            "dias_laborales": sc.d_lab if sc.d_lab is not None else 238,
+            "horas_turno_global": sc.h_turno,
+            "center_configs": sc.center_configs,
+        },
+    }
+
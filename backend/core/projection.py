@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+
+class InvalidQuery(ValueError):
+    """Parámetros de filtrado/ordenación/paginación no válidos (columna de orden inexistente...)."""
+
+
+def split_param(value):
+    """'a, b,c' -> ['a', 'b', 'c'] (lista vacía si no viene)."""
+    if not value:
+        return []
+    return [part.strip() for part in str(value).split(',') if part.strip()]
+
+
+def _check_columns(df: pd.DataFrame, columns, param):
+    unknown = [c for c in columns if c not in df.columns]
+    if unknown:
+        raise InvalidQuery(f"Columnas desconocidas en '{param}': {', '.join(unknown)}")
+
+
+def project_frames(detail: pd.DataFrame, summary: pd.DataFrame, centros=None, columns=None, sort=None,
+                   limit=None, offset=0, summary_only=False, optional_columns=()):
+    """
+    Aplica en el servidor lo que antes hacía el navegador con el detalle completo:
+    filtro por centros, ordenación, paginación (limit/offset) y proyección de columnas.
+    El índice del detalle (posición de fila en el maestro) se conserva.
+
+    `sort` admite varias columnas separadas por comas; un '-' delante indica descendente.
+    Una columna desconocida en `sort` o `columns` es un error, salvo las de `optional_columns`
+    (columnas del Excel que algunos maestros no traen), que en `columns` se omiten.
+    Retorna (detail, summary, page) donde `page` describe la página devuelta.
+    """
+    centros = split_param(centros)
+    columns = split_param(columns)
+    sort_keys = split_param(sort)
+
+    if centros:
+        wanted = set(centros)
+        detail = detail[detail['Centro'].astype(str).isin(wanted).to_numpy()]
+        summary = summary[summary['Centro'].astype(str).isin(wanted).to_numpy()]
+
+    if sort_keys:
+        by = [key.lstrip('-') for key in sort_keys]
+        _check_columns(detail, by, 'sort')
+        ascending = [not key.startswith('-') for key in sort_keys]
+        detail = detail.sort_values(by=by, ascending=ascending, kind='mergesort')
+
+    total = len(detail)
+    if summary_only:
+        detail = detail.iloc[0:0]
+    else:
+        stop = None if limit is None else offset + limit
+        detail = detail.iloc[offset:stop]
+
+    if columns:
+        _check_columns(detail, [c for c in columns if c not in optional_columns], 'columns')
+        detail = detail[[c for c in columns if c in detail.columns]]
+
+    returned = len(detail)
+    next_offset = offset + returned if not summary_only and offset + returned < total else None
+    page = {
+        "total_rows": total,
+        "offset": offset,
+        "limit": limit,
+        "returned": returned,
+        "next_offset": next_offset,
+    }
+    return detail, summary, page
+
+
+def row_positions(detail: pd.DataFrame):
+    """Posiciones de fila en el maestro de un detalle (posiblemente filtrado)."""
+    return np.asarray(detail.index, dtype=np.int64).tolist()
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def fingerprint(master_version, dias_laborales, horas_turno, center_configs, overrides) -> str:
+    """
+    Hash canónico de una simulación. `overrides` debe venir ya normalizado y ordenado
+    (ver simulation_core._canonical_overrides) para que dos peticiones equivalentes
+    compartan entrada aunque envíen los cambios en distinto orden.
+    """
+    payload = {
+        'master': master_version,
+        'dias_laborales': dias_laborales,
+        'horas_turno': horas_turno,
+        'center_configs': {str(k): v for k, v in (center_configs or {}).items()},
+        'overrides': overrides,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Caché LRU con caducidad (TTL) para resultados de simulación. Las claves son huellas del
+    contenido (ver fingerprint): editar o borrar un escenario no deja entradas incorrectas,
+    solo entradas que ya nadie pide y que salen por LRU o por TTL.
+    """
+
+    def __init__(self, max_entries=64, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def values(self):
+        """Valores cacheados (copia de la lista, sin tocar el orden LRU ni los contadores)."""
+        with self._lock:
+            return [value for _, value in self._entries.values()]
+
+    def rebase(self, fn):
+        """
+        Sustituye cada entrada por `fn(valor)` -> (clave nueva, valor nuevo), conservando su
+        caducidad; si `fn` retorna None la entrada se descarta.
+        Retorna cuántas entradas se han conservado.
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+        kept = 0
+        for _, (expires_at, value) in entries:
+            try:
+                rebased = fn(value)
+            except Exception as e:
+                print(f"⚠️ No se pudo rebasar una entrada de caché: {e}", flush=True)
+                rebased = None
+            with self._lock:
+                if rebased is None:
+                    self.invalidations += 1
+                    continue
+                new_key, new_value = rebased
+                self._entries[new_key] = (expires_at, new_value)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+                kept += 1
+        return kept
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,136 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el json estándar
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+from backend.core import metrics
+
+# Formatos de respuesta soportados por los endpoints de simulación
+FORMAT_RECORDS = "json"          # lista de filas (formato histórico)
+FORMAT_COLUMNAR = "columnar"     # un array por columna
+FORMAT_ARROW = "arrow"           # Arrow IPC stream
+
+MEDIA_TYPES = {
+    FORMAT_RECORDS: "application/json",
+    FORMAT_COLUMNAR: "application/vnd.rpk.columnar+json",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+}
+
+
+class UnsupportedFormat(Exception):
+    """El formato pedido no existe o no está disponible en este servidor."""
+
+
+def negotiate_format(format_param=None, accept_header=None):
+    """Elige el formato: primero `?format=`, luego la cabecera Accept, si no JSON por filas."""
+    if format_param:
+        fmt = format_param.lower()
+        if fmt not in MEDIA_TYPES:
+            raise UnsupportedFormat(f"Formato desconocido '{format_param}'. Usa: {', '.join(MEDIA_TYPES)}")
+    else:
+        fmt = FORMAT_RECORDS
+        for fmt_name, media_type in MEDIA_TYPES.items():
+            if accept_header and media_type in accept_header and fmt_name != FORMAT_RECORDS:
+                fmt = fmt_name
+                break
+    if fmt == FORMAT_ARROW and pa is None:
+        raise UnsupportedFormat("El formato Arrow requiere pyarrow en el servidor")
+    return fmt
+
+
+@metrics.timed('sanitize')
+def sanitize_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sustituye NaN/inf por 0 solo en las columnas numéricas que los tengan.
+    Las columnas de texto no se tocan (sus nulos salen como null).
+    """
+    dirty = {}
+    for col in df.select_dtypes(include='number').columns:
+        values = df[col].to_numpy()
+        if values.dtype.kind == 'f' and not np.isfinite(values).all():
+            dirty[col] = np.where(np.isfinite(values), values, 0)
+    if not dirty:
+        return df
+    return df.assign(**dirty)
+
+
+def to_records(df: pd.DataFrame):
+    """Filas como lista de dicts (objetos Python), para quien llame al core directamente."""
+    return _records(sanitize_numeric(df))
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default, separators=(',', ':')).encode('utf-8')
+
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    return str(obj)
+
+
+def _column_values(series: pd.Series, as_list=False):
+    values = series.to_numpy()
+    # orjson serializa arrays numéricos sin pasar por objetos Python; el resto va como lista
+    if not as_list and orjson is not None and values.dtype.kind in 'fiub' and values.flags.c_contiguous:
+        return values
+    return [None if isinstance(v, float) and v != v else v for v in values.tolist()]
+
+
+def _records(df: pd.DataFrame):
+    """Filas como dicts con los nulos de las columnas de texto como None (no NaN, que no es JSON)."""
+    columns = list(df.columns)
+    values = [_column_values(df[col], as_list=True) for col in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+@metrics.timed('serialize')
+def encode_frame(df: pd.DataFrame, fmt) -> bytes:
+    """Codifica un DataFrame (ya calculado) como JSON por filas o columnar."""
+    df = sanitize_numeric(df)
+    if fmt == FORMAT_COLUMNAR:
+        return dumps({str(col): _column_values(df[col]) for col in df.columns})
+    return dumps(_records(df))
+
+
+def json_body(detail: bytes, summary: bytes, meta) -> bytes:
+    """Ensambla la respuesta a partir de partes ya codificadas (reutilizables desde caché)."""
+    return b'{"detail":' + detail + b',"summary":' + summary + b',"meta":' + dumps(meta) + b'}'
+
+
+@metrics.timed('serialize')
+def arrow_table(df: pd.DataFrame):
+    return pa.Table.from_pandas(sanitize_numeric(df), preserve_index=False)
+
+
+@metrics.timed('serialize')
+def arrow_stream(detail_table, summary: pd.DataFrame, meta) -> bytes:
+    """
+    Arrow IPC stream con el detalle. El resumen por centro y el meta van como JSON en
+    los metadatos del esquema (claves `summary` y `meta`).
+    """
+    table = detail_table.replace_schema_metadata({
+        b'summary': dumps(to_records(summary)),
+        b'meta': dumps(meta),
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
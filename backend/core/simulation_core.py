@@ -1,184 +1,823 @@
+import numpy as np
 import pandas as pd
 import os
 import time
-import functools
+import threading
+import types
+import uuid
 from sqlalchemy.orm import Session
 from typing import List
 from backend.db import database
+from backend.core import master_ingest, master_shared, master_store, metrics, projection, result_cache, serialization
 
 # Usamos ruta absoluta basada en la ubicación de este archivo para evitar errores según el CWD
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-EXCEL_PATH = os.path.join(BASE_DIR, "MAESTRO FLEJE_v1.xlsx")
-
-# Variable global para cachear el DataFrame
-_df_cache = None
-
-def time_it(func):
-    """Decorador para medir el tiempo de ejecución de las funciones."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        end_time = time.perf_counter()
-        print(f"⏱️ [PERF] {func.__name__} tardó {end_time - start_time:.4f} segundos")
-        return result
-    return wrapper
-
-def get_base_dataframe():
-    """Retorna una copia del DataFrame maestro, usando una caché binaria en disco para velocidad extra."""
-    global _df_cache
-    CACHE_PATH = EXCEL_PATH + ".cache.pkl"
-    
-    if _df_cache is not None:
-        return _df_cache.copy()
+# RPK_MASTER_PATH apunta a otro maestro (benchmarks con maestros sintéticos, otra planta...)
+EXCEL_PATH = os.environ.get("RPK_MASTER_PATH") or os.path.join(BASE_DIR, "MAESTRO FLEJE_v1.xlsx")
 
-    # Verificar si existe caché y si es más reciente que el Excel
-    use_cache = False
-    if os.path.exists(CACHE_PATH) and os.path.exists(EXCEL_PATH):
-        if os.path.getmtime(CACHE_PATH) > os.path.getmtime(EXCEL_PATH):
-            use_cache = True
+# Versión inmutable del maestro publicada (MasterData). Solo se sustituye entera (reload_master).
+# Las cargas y recargas se hacen de una en una bajo `_reload_lock`: si llegan varias peticiones
+# a la vez antes de la primera carga, una carga y el resto esperan su resultado.
+_master = None
+_reload_lock = threading.Lock()
 
-    try:
-        if use_cache:
-            print(f"🚀 Cargando desde caché binaria (Modo Ultra Rápido)...", flush=True)
+# Tras un fallo de carga, durante este tiempo se devuelve el mismo error sin volver a intentarlo
+LOAD_RETRY_SECONDS = float(os.environ.get("RPK_MASTER_RETRY_SECONDS", 5))
+_load_failure = None  # (instante monotónico, MasterLoadError)
+
+
+class MasterLoadError(Exception):
+    """No se ha podido cargar el maestro (Excel ausente o ilegible, almacén que no se puede escribir...)."""
+
+
+# Tipo de los arrays numéricos del motor. RPK_FLOAT32=1 los guarda en float32 (mitad de
+# memoria); frente a float64 la saturación difiere en menos de 1e-6 relativo
+# (ver docs/DOCUMENTACION_SISTEMA.md). Por defecto float64, idéntico al cálculo histórico.
+ENGINE_DTYPE = np.float32 if os.environ.get("RPK_FLOAT32", "0") == "1" else np.float64
+
+# Columnas del Excel que alimentan el motor (el resto se sirve tal cual en el detalle)
+ENGINE_SOURCE_COLUMNS = [
+    'Volumen anual', 'Piezas por minuto', '%OEE', 'dias laborales 2026', 'Setup (h)',
+] + master_store.RATIO_MOD_ALIASES
+# Columnas del Excel que pueden faltar en un maestro (el motor las toma como 0): ?columns= las omite sin error
+OPTIONAL_DETAIL_COLUMNS = ['Setup (h)']
+# Atributo del override -> columna del motor que sustituye
+OVERRIDE_COLUMNS = {
+    'oee_override': '%OEE',
+    'ppm_override': 'Piezas por minuto',
+    'demanda_override': 'Volumen anual',
+    'horas_turno_override': 'horas_turno',
+    'personnel_ratio_override': 'Ratio_MOD',
+}
+
+def _read_excel_master():
+    """Lee el Excel maestro y aplica la limpieza básica de claves."""
+    print(f"🚀 Cargando Excel Maestro desde: {EXCEL_PATH}...", flush=True)
+    if not os.path.exists(EXCEL_PATH):
+        raise FileNotFoundError(f"No se encuentra el archivo maestro en: {EXCEL_PATH}")
+
+    start_load = time.perf_counter()
+    with metrics.stage('excel_read'):
+        df = pd.read_excel(EXCEL_PATH)
+
+    # Limpieza básica inicial
+    df['Articulo'] = df['Articulo'].astype(str).str.replace(r'\.0$', '', regex=True)
+    df['Centro'] = df['Centro'].astype(str).str.replace(r'\.0$', '', regex=True)
+    df = df[~df['Centro'].isin(['nan', 'NaN', 'None', '', 'nan.0'])].reset_index(drop=True)
+    df['centro_original'] = df['Centro']
+
+    end_load = time.perf_counter()
+    print(f"✅ Excel cargado en {end_load - start_load:.4f} segundos.", flush=True)
+    return df
+
+def _load_master_table():
+    """
+    Abre el almacén columnar del maestro (el publicado por otro worker o el de siempre).
+    Si no existe, tiene otro esquema o su checksum no coincide con el Excel actual, lo
+    regenera desde el Excel. Retorna (tabla, metadatos, ruta del almacén).
+    """
+    store_path = master_store.store_path_for(EXCEL_PATH)
+    excel_exists = os.path.exists(EXCEL_PATH)
+    checksum = master_store.file_checksum(EXCEL_PATH) if excel_exists else None
+
+    candidates = [store_path]
+    published = master_shared.read_generation(store_path)
+    if published and published.get('store') and published['store'] != store_path:
+        candidates.insert(0, published['store'])
+
+    error, stale = None, False
+    for path in candidates:
+        try:
             start_load = time.perf_counter()
-            _df_cache = pd.read_pickle(CACHE_PATH)
+            table, meta = master_store.open_store(path)
+        except master_store.MasterStoreError as e:
+            error = error or e
+            continue
+        if checksum is None or meta['source_checksum'] == checksum:
             end_load = time.perf_counter()
-            print(f"✅ Caché cargada en {end_load - start_load:.4f} segundos.", flush=True)
+            print(f"🚀 Almacén columnar mapeado en {end_load - start_load:.4f} segundos ({table.num_rows} filas).", flush=True)
+            return table, meta, path
+        stale = True
+
+    if not excel_exists:
+        raise FileNotFoundError(f"No se encuentra el archivo maestro en: {EXCEL_PATH} ({error})")
+    if stale:
+        print("🔄 El Excel maestro ha cambiado, regenerando almacén columnar...", flush=True)
+    else:
+        print(f"🔄 {error}. Generando almacén columnar...", flush=True)
+    path = master_store.write_store(_read_excel_master(), store_path, checksum)
+    table, meta = master_store.open_store(path)
+    return table, meta, path
+
+class MasterData:
+    """
+    Versión inmutable del maestro. Las columnas del Excel se materializan bajo demanda
+    desde la tabla Arrow y nunca se modifican; los cálculos por fila que no dependen de
+    la petición (horas de producción, horas hombre...) se hacen una sola vez al cargar
+    y se guardan como arrays de solo lectura.
+    """
+
+    def __init__(self, table=None, frame=None, meta=None, base=None):
+        self._table = table
+        self.meta = meta or {}
+        # Versión del maestro: checksum del Excel del que procede
+        self.version = (self.meta.get('source_checksum') or 'unknown')[:12]
+        if table is not None:
+            self.column_names = list(table.column_names)
+            self.n_rows = table.num_rows
+            self._frame = pd.DataFrame(index=pd.RangeIndex(self.n_rows))
         else:
-            print(f"🚀 Cargando Excel Maestro por primera vez desde: {EXCEL_PATH}...", flush=True)
-            if not os.path.exists(EXCEL_PATH):
-                raise FileNotFoundError(f"No se encuentra el archivo maestro en: {EXCEL_PATH}")
-            
-            start_load = time.perf_counter()
-            _df_cache = pd.read_excel(EXCEL_PATH)
-            
-            # Limpieza básica inicial
-            _df_cache['Articulo'] = _df_cache['Articulo'].astype(str).str.replace(r'\.0$', '', regex=True)
-            _df_cache['Centro'] = _df_cache['Centro'].astype(str).str.replace(r'\.0$', '', regex=True)
-            _df_cache = _df_cache[~_df_cache['Centro'].isin(['nan', 'NaN', 'None', '', 'nan.0'])].copy()
-            _df_cache['centro_original'] = _df_cache['Centro']
-            
-            end_load = time.perf_counter()
-            print(f"✅ Excel cargado en {end_load - start_load:.4f} segundos.", flush=True)
-            
-            # Guardar caché para la próxima vez
-            print(f"🔄 Generando caché binaria para acelerar futuros arranques...", flush=True)
-            _df_cache.to_pickle(CACHE_PATH)
-            
+            self.column_names = list(frame.columns)
+            self.n_rows = len(frame)
+            self._frame = frame.reset_index(drop=True)
+
+        # Claves como códigos enteros sobre sus valores únicos ordenados (centros para las
+        # agregaciones con bincount). Los arrays de texto apuntan a esos únicos: no hay un
+        # objeto str por fila. Las columnas clave no se quedan materializadas en el frame.
+        keys = self._key_frame()
+        self.articulos, self.articulo_codes = _encode_keys(keys['Articulo'])
+        self.centros, self.centro_codes = _encode_keys(keys['Centro'])
+        self.articulo = self._readonly(self.articulos[self.articulo_codes])
+        self.centro = self._readonly(self.centros[self.centro_codes])
+        # Índice (Articulo, Centro) -> posiciones de fila: claves combinadas ordenadas y su
+        # permutación (16 bytes por fila, en lugar de un dict con un array por clave)
+        combined = self.articulo_codes.astype(np.int64) * len(self.centros) + self.centro_codes
+        self._key_order = self._readonly(np.argsort(combined, kind='stable'))
+        self._key_sorted = self._readonly(combined[self._key_order])
+        self._articulo_index = pd.Index(self.articulos)
+        self._centro_index = pd.Index(self.centros)
+        # Columnas de texto del detalle ya en formato pandas, compartidas por todos los resultados
+        self._text_arrays = {}
+        # `base` ya calculado llega de una ingesta incremental o del fichero compartido entre workers
+        self.base = {col: self._readonly(v) for col, v in base.items()} if base is not None else self._precompute_rows()
+        # Generación publicada entre workers (master_shared); None sin almacén columnar
+        self.generation = None
+
+    @staticmethod
+    def _readonly(arr):
+        arr = np.asarray(arr)
+        arr.flags.writeable = False
+        return arr
+
+    def _key_frame(self):
+        if self._table is not None:
+            return master_store.materialize_columns(self._table, ['Articulo', 'Centro'])
+        return self._frame[['Articulo', 'Centro']]
+
+    def key_ranges(self, articulos, centros):
+        """
+        Resuelve de una vez muchas claves (Articulo, Centro): un get_indexer por columna y una
+        búsqueda binaria por clave. Retorna (lo, hi) tales que las filas de la clave i son
+        `key_order[lo[i]:hi[i]]` (vacío si la clave no existe).
+        """
+        a = self._articulo_index.get_indexer([str(v) for v in articulos])
+        c = self._centro_index.get_indexer([str(v) for v in centros])
+        keys = a.astype(np.int64) * len(self.centros) + c
+        lo = np.searchsorted(self._key_sorted, keys, side='left')
+        hi = np.searchsorted(self._key_sorted, keys + 1, side='left')
+        hi[(a < 0) | (c < 0)] = lo[(a < 0) | (c < 0)]
+        return lo, hi
+
+    @property
+    def key_order(self):
+        """Posiciones de fila ordenadas por clave (Articulo, Centro) (ver key_ranges)."""
+        return self._key_order
+
+    def rows_for(self, articulo, centro):
+        """Posiciones (ordenadas) de las filas con esa clave (Articulo, Centro)."""
+        lo, hi = self.key_ranges([articulo], [centro])
+        return self._key_order[lo[0]:hi[0]]
+
+    def text_array(self, col):
+        """
+        Columna de texto del maestro como array de pandas, creada una sola vez: los detalles
+        la reutilizan sin copiarla (si se pasa como ndarray de objetos pandas la convierte
+        de nuevo en cada petición).
+        """
+        arr = self._text_arrays.get(col)
+        if arr is None:
+            if col == 'Articulo':
+                values = self.articulo
+            elif col == 'Centro':
+                values = self.centro
+            else:
+                source = master_store.materialize_columns(self._table, [col]) if self._table is not None else self._frame
+                values = source[col].to_numpy(dtype=object)
+            arr = self._text_arrays[col] = pd.array(values, dtype='str')
+        return arr
+
+    def shared_arrays(self):
+        """
+        Arrays del maestro que los detalles pueden reutilizar sin copiarlos.
+        Retorna (arrays numéricos: motor y columnas materializadas, arrays de texto).
+        """
+        numeric = list(self.base.values()) + [self._frame[c].to_numpy() for c in self._frame.columns]
+        return numeric, list(self._text_arrays.values())
+
+    def memory_usage(self):
+        """Bytes que ocupa esta versión del maestro, por partes (los arrays mapeados no ocupan heap)."""
+        engine = sum(v.nbytes for v in self.base.values())
+        mapped = all(_is_mapped(v) for v in self.base.values())
+        keys = sum(a.nbytes for a in (
+            self.articulo_codes, self.centro_codes, self.articulo, self.centro, self._key_order, self._key_sorted,
+        )) + int(self._articulo_index.memory_usage(deep=True)) + int(self._centro_index.memory_usage(deep=True))
+        columns = int(self._frame.memory_usage(deep=True, index=False).sum())
+        text = sum(int(a.nbytes) for a in self._text_arrays.values())
+        return {
+            "rows": self.n_rows,
+            "engine_dtype": str(np.dtype(ENGINE_DTYPE)),
+            "engine_arrays_bytes": engine,
+            "engine_arrays_mapped": mapped,
+            "keys_bytes": keys,
+            "materialized_columns": [c for c in self._frame.columns],
+            "materialized_columns_bytes": columns,
+            "text_columns_bytes": text,
+            "heap_bytes": keys + columns + text + (0 if mapped else engine),
+        }
+
+    def shifts_by_centro(self, h_turno, center_configs=None):
+        """Horas de turno por código de centro: las de `center_configs` o la global."""
+        turnos = np.full(len(self.centros), h_turno, dtype=np.int64)
+        shifts = center_shifts(center_configs)
+        if shifts:
+            idx = pd.Index(self.centros).get_indexer(list(shifts))
+            found = idx >= 0
+            turnos[idx[found]] = np.fromiter(shifts.values(), dtype=np.int64, count=len(shifts))[found]
+        return turnos
+
+    def get_columns(self, columns=None) -> pd.DataFrame:
+        """Columnas del maestro (compartidas: no modificar, usar .copy() si hace falta)."""
+        wanted = self.column_names if columns is None else [c for c in columns if c in self.column_names]
+        if self._table is not None:
+            missing = [c for c in wanted if c not in self._frame.columns]
+            if missing:
+                self._frame = pd.concat([self._frame, master_store.materialize_columns(self._table, missing)], axis=1)
+        return self._frame[wanted]
+
+    def _precompute_rows(self):
+        # Esquema canónico (tipos, alias, OEE normalizado) y horas por fila, una sola vez.
+        # Las columnas fuente se leen del almacén sin quedarse materializadas en el frame.
+        if self._table is not None:
+            present = [c for c in ENGINE_SOURCE_COLUMNS if c in self.column_names]
+            source = master_store.materialize_columns(self._table, present)
+        else:
+            source = self.get_columns(ENGINE_SOURCE_COLUMNS)
+        arrays = master_store.engine_arrays(source)
+        arrays.update(_row_hours(arrays))
+        return {col: self._readonly(values.astype(ENGINE_DTYPE, copy=False)) for col, values in arrays.items()}
+
+
+def _is_mapped(arr):
+    """True si el array apunta a memoria ajena a numpy (las páginas mapeadas de un fichero Arrow)."""
+    while isinstance(arr.base, np.ndarray):
+        arr = arr.base
+    return arr.base is not None
+
+def _encode_keys(values):
+    """(únicos ordenados como array de objetos, códigos int32) de una columna clave."""
+    codes, uniques = pd.factorize(pd.Series(values).astype(str), sort=True)
+    return MasterData._readonly(np.asarray(uniques, dtype=object)), MasterData._readonly(codes.astype(np.int32))
+
+
+def _publish_master(table, meta, store_file, compute_base=None):
+    """
+    Crea la versión del maestro con los arrays del motor mapeados desde `<almacén>.engine.*`,
+    compartidos por todos los workers. Si aún no existen para esta versión se calculan
+    (`compute_base()` si se da, p. ej. la ingesta incremental) y se escriben. Se llama con
+    master_shared.publish_lock tomado.
+    Retorna (MasterData, True si esta versión la ha publicado este proceso).
+    """
+    store_path = master_store.store_path_for(EXCEL_PATH)
+    version = (meta.get('source_checksum') or 'unknown')[:12]
+    engine_file = master_shared.engine_path_for(store_path, version, ENGINE_DTYPE)
+    shared = master_shared.open_engine(engine_file, table.num_rows)
+    if shared is None:
+        master = MasterData(table=table, meta=meta, base=compute_base() if compute_base else None)
+        master_shared.write_engine(engine_file, master.base, master.n_rows)
+        shared = master_shared.open_engine(engine_file, master.n_rows)
+        master.base = {col: master._readonly(v) for col, v in shared.items()}
+        master_shared.remove_old_engines(store_path, keep=engine_file)
+    else:
+        master = MasterData(table=table, meta=meta, base=shared)
+    master.generation, published = master_shared.publish_generation(store_path, master.version, store_file, engine_file)
+    return master, published
+
+def _build_master() -> MasterData:
+    """
+    Construye una versión del maestro a partir del almacén columnar (o del Excel si no hay
+    pyarrow). Cualquier fallo se propaga como MasterLoadError: no se reintenta por otra vía.
+    Con varios workers, el primero que llega lee el Excel y el resto adjunta lo publicado.
+    """
+    try:
+        if master_store.is_available():
+            with master_shared.publish_lock(master_store.store_path_for(EXCEL_PATH)):
+                table, meta, store_file = _load_master_table()
+                return _publish_master(table, meta, store_file)[0]
+        print("⚠️ pyarrow no disponible: se trabaja directamente con el Excel.", flush=True)
+        return MasterData(frame=_read_excel_master(), meta={'source_checksum': master_store.file_checksum(EXCEL_PATH)})
+    except MasterLoadError:
+        raise
     except Exception as e:
-        print(f"⚠️ Error cargando datos (reintentando normal): {e}", flush=True)
-        _df_cache = pd.read_excel(EXCEL_PATH)
+        raise MasterLoadError(f"No se pudo cargar el maestro ({EXCEL_PATH}): {type(e).__name__}: {e}") from e
 
-    return _df_cache.copy()
+def current_master():
+    """Versión publicada del maestro, o None si todavía no se ha cargado (no la carga)."""
+    return _master
 
-@time_it
-def calculate_saturation(df: pd.DataFrame, dias_laborales_override: int = None, horas_turno_default: int = 16):
+def get_master() -> MasterData:
     """
-    Calcula la saturación basada en las columnas del Excel.
+    Retorna la versión cargada del maestro, cargándola la primera vez.
+    Quien la obtiene trabaja con ella hasta el final aunque entretanto se publique otra.
+    Si la carga falla se lanza MasterLoadError, y durante LOAD_RETRY_SECONDS las siguientes
+    peticiones reciben el mismo error sin volver a leer el Excel.
     """
-    
-    # Aseguramos tipos de datos
-    df['Volumen anual'] = pd.to_numeric(df['Volumen anual'], errors='coerce').fillna(0)
-    df['Piezas por minuto'] = pd.to_numeric(df['Piezas por minuto'], errors='coerce').fillna(0)
-    df['%OEE'] = pd.to_numeric(df['%OEE'], errors='coerce').fillna(0)
-    
-    # Aseguramos que existe la columna horas_turno (puede venir pre-configurada con overrides)
-    if 'horas_turno' not in df.columns:
-        df['horas_turno'] = horas_turno_default
-    
-    # Usar override si existe, sino columna del excel, sino default 238
-    if dias_laborales_override is not None:
-        df['dias laborales 2026'] = dias_laborales_override
+    global _master, _load_failure
+    master = _master
+    if master is not None:
+        return master
+    with _reload_lock:
+        if _master is None:
+            if _load_failure is not None and time.monotonic() - _load_failure[0] < LOAD_RETRY_SECONDS:
+                raise MasterLoadError(str(_load_failure[1])) from _load_failure[1]
+            try:
+                with metrics.stage('master_load'):
+                    _master = _build_master()
+            except MasterLoadError as e:
+                _load_failure = (time.monotonic(), e)
+                print(f"❌ {e}", flush=True)
+                raise
+            _load_failure = None
+        return _master
+
+def reset_master():
+    """
+    Descarta la versión cargada, el error de carga guardado, los resultados cacheados y las
+    sesiones de preview: la siguiente petición vuelve a leer el maestro (pruebas, benchmarks).
+    """
+    global _master, _load_failure
+    with _reload_lock:
+        _master = None
+        _load_failure = None
+        _result_cache.clear()
+        _preview_sessions.clear()
+
+def set_master(excel_path):
+    """Cambia el Excel del que se carga el maestro y descarta todo lo calculado con el anterior."""
+    global EXCEL_PATH
+    with _reload_lock:
+        EXCEL_PATH = excel_path
+    reset_master()
+
+def _incremental_base(previous: MasterData, frame: pd.DataFrame, reuse):
+    """
+    Arrays del motor de la versión nueva: los de las filas sin cambios se copian de la
+    anterior (`reuse[p]` = posición anterior, -1 si cambia) y solo se calculan los de las
+    filas nuevas o modificadas. None si el esquema del motor ha cambiado.
+    """
+    changed = reuse < 0
+    fresh = master_store.engine_arrays(frame.loc[changed, [c for c in ENGINE_SOURCE_COLUMNS if c in frame.columns]])
+    fresh.update(_row_hours(fresh))
+    if set(fresh) != set(previous.base):
+        return None
+    base = {}
+    for col, old in previous.base.items():
+        out = np.empty(len(reuse), dtype=ENGINE_DTYPE)
+        out[~changed] = old[reuse[~changed]]
+        out[changed] = fresh[col]
+        base[col] = out
+    return base
+
+def _ingest_master(previous: MasterData):
+    """
+    Carga la versión actual del Excel comparándola fila a fila con `previous`.
+    Retorna (MasterData, informe de cambios o None, reuse o None). El informe solo se da
+    en el proceso que publica la versión (el resto de workers la adjunta).
+    """
+    if previous is None or not master_store.is_available():
+        return _build_master(), None, None
+    with master_shared.publish_lock(master_store.store_path_for(EXCEL_PATH)):
+        table, meta, store_file = _load_master_table()
+        frame = master_store.materialize_columns(table, table.column_names)
+        report, reuse = master_ingest.diff_frames(
+            previous.get_columns(), frame, previous.version, (meta.get('source_checksum') or 'unknown')[:12]
+        )
+        same_columns = not report['columns_added'] and not report['columns_removed']
+        compute_base = (lambda: _incremental_base(previous, frame, reuse)) if same_columns else None
+        master, published = _publish_master(table, meta, store_file, compute_base)
+    return master, report if published else None, reuse if same_columns else None
+
+def _rebase_result(result, master: MasterData, reuse):
+    """
+    Lleva un resultado cacheado a una versión nueva del maestro recalculando solo las filas
+    nuevas o modificadas y las que tocan sus overrides; el resto se copia del resultado anterior.
+    Retorna (clave nueva, resultado) o None si no se puede rebasar.
+    """
+    if result.params is None:
+        return None
+    d_lab, h_turno, center_configs, overrides = result.params
+    positions, values, moved = _resolve_overrides(master, overrides)
+    overlay = OverrideOverlay(master, positions, values, moved)
+
+    rows = np.union1d(np.flatnonzero(reuse < 0), positions)
+    keep = np.setdiff1d(np.arange(master.n_rows), rows, assume_unique=True)
+    kept = result.detail.iloc[reuse[keep]].set_axis(keep)
+    if len(rows):
+        detail = pd.concat([kept, run_engine(master, overlay, d_lab, h_turno, center_configs, rows=rows)]).sort_index()
     else:
-        df['dias laborales 2026'] = pd.to_numeric(df['dias laborales 2026'], errors='coerce').fillna(238)
-
-    # --- NUEVA LÓGICA MOD (PERSONAL) ---
-    if 'Ratio_MOD' not in df.columns:
-        for col in ['Ratio MOD', 'Ratio Persona Maquina', 'Ratio Persona Articulo', 'MOD']:
-            if col in df.columns:
-                df['Ratio_MOD'] = pd.to_numeric(df[col], errors='coerce').fillna(1.0)
-                break
+        detail = kept
+    detail.index = pd.RangeIndex(master.n_rows)
+
+    rebased = SimulationResult(detail, _summarize(detail), master.version)
+    rebased.nbytes = _result_nbytes(master, detail)
+    rebased.params = result.params
+    key = result_cache.fingerprint(
+        master.version, d_lab, h_turno, center_configs,
+        _canonical_overrides(master, positions, values, moved),
+    )
+    return key, rebased
+
+def reload_master(force=False):
+    """
+    Carga el Excel actual si su checksum difiere de la versión publicada y la sustituye con
+    un único cambio de referencia: las peticiones en curso terminan con la versión con la que
+    empezaron y las nuevas ven la nueva.
+
+    La carga es incremental: se compara con la versión anterior por (Articulo, Centro), solo
+    se recalculan las filas nuevas o modificadas y los resultados cacheados se rebasan
+    recalculando solo esas filas. El informe de cambios se guarda en `<excel>.changes.jsonl`.
+    Las sesiones de preview se vacían. Retorna True si ha publicado una versión nueva.
+    """
+    global _master, _load_failure
+    with _reload_lock:
+        current = _master
+        start = time.perf_counter()
+        try:
+            if not force and current is not None and current.meta.get('source_checksum') == master_store.file_checksum(EXCEL_PATH):
+                return False
+            with metrics.stage('master_reload'):
+                fresh, report, reuse = _ingest_master(current)
+        except Exception as e:
+            error = e if isinstance(e, MasterLoadError) else MasterLoadError(
+                f"No se pudo recargar el maestro ({EXCEL_PATH}): {type(e).__name__}: {e}")
+            # Sin versión publicada, las peticiones reciben el mismo error sin volver a leer el Excel
+            if current is None:
+                _load_failure = (time.monotonic(), error)
+            if error is e:
+                raise
+            raise error from e
+        _master = fresh
+        _load_failure = None
+        _preview_sessions.clear()
+        if reuse is not None:
+            rebased = _result_cache.rebase(lambda result: _rebase_result(result, fresh, reuse))
         else:
-            df['Ratio_MOD'] = 1.0
+            _result_cache.clear()
+            rebased = 0
+        if report is not None:
+            report['cached_results_rebased'] = rebased
+            master_ingest.record_report(report, EXCEL_PATH)
+            print(f"📝 Cambios en el maestro: {report['inserted']} altas, {report['deleted']} bajas, "
+                  f"{report['updated']} modificaciones en {len(report['changed_centros'])} centros.", flush=True)
+        old_version = current.version if current is not None else None
+        print(f"🔁 Maestro recargado ({old_version} -> {fresh.version}) en {time.perf_counter() - start:.4f} segundos.", flush=True)
+        return True
+
+def get_base_dataframe(columns=None):
+    """
+    Retorna una copia del DataFrame maestro (solo las columnas pedidas si se indican).
+    El motor de simulación no la usa: trabaja sobre MasterData sin copiarlo.
+    """
+    return get_master().get_columns(columns).copy()
+
+def _row_hours(arrays: dict) -> dict:
+    """
+    Horas por fila a partir de arrays canónicos (master_store.engine_arrays): solo aritmética.
+    Una división imposible (sin piezas por hora u OEE) deja 0 horas de producción.
+    """
+    piezas_hora = arrays['Piezas por minuto'] * 60
+    with np.errstate(divide='ignore', invalid='ignore'):
+        produccion = arrays['Volumen anual'] / (piezas_hora * arrays['OEE_calc'])
+    produccion[~np.isfinite(produccion)] = 0
+    setup = arrays.get('Setup (h)', 0)
+    return {
+        'Piezas por hora': piezas_hora,
+        'Horas_Produccion': produccion,
+        'Horas_Totales': produccion + setup,
+        # Las horas de preparación siempre tienen ratio 1.0; el Ratio_MOD solo afecta a producción
+        'Horas_Hombre': produccion * arrays['Ratio_MOD'] + setup,
+    }
+
+class OverrideOverlay:
+    """
+    Overlay disperso de una petición: solo contiene las filas que tocan sus overrides.
+    `positions` son posiciones de fila en el maestro; `rows` tiene las columnas del motor
+    de esas filas con los overrides aplicados y recalculadas; `centro` es su centro final
+    y `horas_turno` su turno forzado (NaN si no lo fuerzan).
+    """
+
+    def __init__(self, master: MasterData, positions, values: dict, moved: dict):
+        self.positions = positions
+        self.centro = master.centro[positions].copy()
+        self.horas_turno = np.full(len(positions), np.nan)
+        rows = {col: master.base[col][positions] for col in master.base}
+
+        for col, (pos, vals) in values.items():
+            idx = np.searchsorted(positions, pos)
+            if col == 'horas_turno':
+                self.horas_turno[idx] = vals
+            else:
+                rows[col][idx] = vals
+                if col == '%OEE':
+                    rows['OEE_calc'][idx] = master_store.normalize_oee(vals)
+        for pos, nc in moved.items():
+            self.centro[np.searchsorted(positions, pos)] = nc
+
+        if len(positions):
+            rows.update(_row_hours(rows))
+        self.rows = pd.DataFrame(rows, copy=False)
+
+    def patched(self, master: MasterData, col, rows=None):
+        """
+        Columna del maestro con las filas del overlay sustituidas. Solo se escriben las
+        posiciones cuyo valor cambia, y si el overlay no cambia la columna se devuelve la
+        del maestro sin copiar. Con `rows` (posiciones ordenadas) solo se devuelven esas filas.
+        """
+        base = master.base[col]
+        positions, values = self._changes(base, col)
+        if rows is not None:
+            out = base[rows]
+            inside = np.isin(positions, rows)
+            out[np.searchsorted(rows, positions[inside])] = values[inside]
+            return out
+        if not len(positions):
+            return base
+        # Los arrays del maestro son compartidos (y pueden estar mapeados de solo lectura):
+        # la columna de la petición necesita su propia copia
+        out = base.copy()
+        out[positions] = values
+        return out
+
+    def _changes(self, base, col):
+        """(posiciones, valores) del overlay en `col` que difieren de la columna del maestro."""
+        if not len(self.positions):
+            return self.positions, np.empty(0)
+        values = self.rows[col].to_numpy(dtype=float)
+        current = base[self.positions]
+        changed = (values != current) & ~(np.isnan(values) & np.isnan(current))
+        return self.positions[changed], values[changed]
+
+
+def _resolve_override_rows(master: MasterData, overrides):
+    """
+    Resuelve los overrides a sus posiciones de fila con el índice (Articulo, Centro): todas
+    las claves se buscan de una vez. Los overrides se interpretan en orden: el centro de un
+    override se compara con el centro actual de la fila, que es el nuevo si un override
+    anterior la ha movido con `new_centro`; solo los overrides desde el primer movimiento se
+    recorren uno a uno para seguir esa cadena.
+    Retorna (posiciones, override de cada posición, {posición: centro nuevo}).
+    """
+    # Pydantic models (de server.py) o SQLAlchemy objects tienen atributos similares
+    articulos = [str(getattr(ov, 'articulo', None)) for ov in overrides]
+    centros = [str(getattr(ov, 'centro', None)) for ov in overrides]
+    new_centros = [getattr(ov, 'new_centro', None) for ov in overrides]
+    lo, hi = master.key_ranges(articulos, centros)
+
+    # Hasta el primer movimiento ninguna fila ha cambiado de centro: reparto vectorizado
+    first_move = next((i for i, nc in enumerate(new_centros) if nc is not None), len(overrides))
+    counts = (hi - lo)[:first_move]
+    hit_ov = np.repeat(np.arange(first_move), counts)
+    starts = np.repeat(lo[:first_move] - (np.cumsum(counts) - counts), counts)
+    hit_pos = master.key_order[starts + np.arange(len(hit_ov))].astype(np.int64)
+    if first_move == len(overrides):
+        return hit_pos, hit_ov, {}
+
+    chain_pos, chain_ov = [], []
+    moved = {}        # posición -> centro nuevo
+    moved_index = {}  # (articulo, centro nuevo) -> posiciones movidas allí
+    for i in range(first_move, len(overrides)):
+        key = (articulos[i], centros[i])
+        positions = [p for p in master.key_order[lo[i]:hi[i]].tolist() if p not in moved]
+        positions += moved_index.get(key, [])
+
+        nc = new_centros[i]
+        if nc is not None:
+            for p in positions:
+                if p in moved:
+                    moved_index[(key[0], str(moved[p]))].remove(p)
+                moved[p] = nc
+                moved_index.setdefault((key[0], str(nc)), []).append(p)
+        chain_pos += positions
+        chain_ov += [i] * len(positions)
+
+    hit_pos = np.concatenate([hit_pos, np.asarray(chain_pos, dtype=np.int64)])
+    hit_ov = np.concatenate([hit_ov, np.asarray(chain_ov, dtype=np.int64)])
+    return hit_pos, hit_ov, moved
+
+
+@metrics.timed('overrides')
+def _resolve_overrides(master: MasterData, overrides):
+    """
+    Aplica toda la lista de overrides: las claves se resuelven de una vez y los valores se
+    reparten por columna sin recorrer las filas. Si varios overrides fijan el mismo campo
+    de la misma fila, gana el último de la lista.
+    Retorna (posiciones tocadas, {columna: (posiciones, valores)}, {posición: centro nuevo}).
+    """
+    hit_pos, hit_ov, moved = _resolve_override_rows(master, overrides)
+    if not len(hit_pos):
+        return np.empty(0, dtype=np.int64), {}, {}
+
+    values = {}
+    for attr, col in OVERRIDE_COLUMNS.items():
+        ov_values = np.array([np.nan if getattr(ov, attr, None) is None else float(getattr(ov, attr)) for ov in overrides])
+        row_values = ov_values[hit_ov]
+        valid = ~np.isnan(row_values)
+        if not valid.any():
+            continue
+        # Último gana: hit_ov va en orden de la lista, y np.unique sobre la lista invertida
+        # se queda con la última aparición
+        pos_rev = hit_pos[valid][::-1]
+        pos, first = np.unique(pos_rev, return_index=True)
+        values[col] = (pos, row_values[valid][::-1][first])
+
+    return np.unique(hit_pos), values, moved
+
+
+def build_overlay(master: MasterData, overrides) -> OverrideOverlay:
+    """Overlay de una lista de overrides sobre `master` (para run_engine)."""
+    return OverrideOverlay(master, *_resolve_overrides(master, overrides))
+
+
+def _row_effects(master: MasterData, positions, values, moved):
+    """Efecto neto de los overrides por fila: {posición: ((columna, valor), ...)}."""
+    by_pos = {int(p): {} for p in positions}
+    for col, (pos, vals) in values.items():
+        for p, v in zip(pos.tolist(), vals.tolist()):
+            by_pos[p][col] = v
+    for p, nc in moved.items():
+        by_pos[int(p)]['Centro'] = str(nc)
+    return {p: tuple(sorted(v.items())) for p, v in by_pos.items()}
+
+
+def _canonical_overrides(master: MasterData, positions, values, moved):
+    """
+    Efecto neto de los overrides, fila a fila y ordenado por (Articulo, Centro original).
+    Es independiente del orden en que llegaron los overrides salvo cuando ese orden
+    cambia el resultado, así que sirve como parte de la clave de caché.
+    """
+    effects = _row_effects(master, positions, values, moved)
+    return sorted([master.articulo[p], master.centro[p], list(v)] for p, v in effects.items())
+
+
+@metrics.timed('calculate')
+def run_engine(master: MasterData, overlay: OverrideOverlay, d_lab, h_turno, center_configs, rows=None):
+    """
+    Construye el detalle de la simulación combinando el maestro (solo lectura) con el
+    overlay. Solo se crean arrays nuevos para las columnas que cambian en la petición.
+    Con `rows` (posiciones ordenadas del maestro) solo se calculan esas filas y el
+    DataFrame resultante queda indexado por esas posiciones.
+    """
+    n = master.n_rows if rows is None else len(rows)
+    metrics.inc('rpk_rows_processed_total', n)
+    centro_original = master.centro if rows is None else master.centro[rows]
+
+    # Turno por centro original (configuración del centro o global) y reparto a las filas
+    horas_turno = master.shifts_by_centro(h_turno, center_configs)[
+        master.centro_codes if rows is None else master.centro_codes[rows]
+    ]
+
+    # Posiciones del overlay dentro del bloque calculado
+    if rows is None:
+        ov_idx, ov_sel = overlay.positions, slice(None)
     else:
-        df['Ratio_MOD'] = pd.to_numeric(df['Ratio_MOD'], errors='coerce').fillna(1.0)
+        ov_sel = np.isin(overlay.positions, rows)
+        ov_idx = np.searchsorted(rows, overlay.positions[ov_sel])
+    if len(ov_idx):
+        forced_ht = overlay.horas_turno[ov_sel]
+        forced = ~np.isnan(forced_ht)
+        horas_turno[ov_idx[forced]] = forced_ht[forced].astype(np.int64)
 
-    # Cálculos dinámicos
-    df['Piezas por hora'] = df['Piezas por minuto'] * 60
-    
-    # Manejo de OEE
-    oee_mask = df['%OEE'] > 1.1
-    df_oee_calc = df['%OEE'].copy()
-    if oee_mask.any():
-        df_oee_calc = df_oee_calc.apply(lambda x: x/100.0 if x > 1.1 else x)
-
-    # Horas Totales
-    df['Horas_Produccion'] = (df['Volumen anual'] / (df['Piezas por hora'] * df_oee_calc)).replace([float('inf'), -float('inf')], 0).fillna(0)
-    df['Horas_Totales'] = df['Horas_Produccion'] + df.get('Setup (h)', 0) # Por si no existe
-    
-    # --- CÁLCULO HORAS HOMBRE ---
-    # Las horas de preparación siempre tienen ratio 1.0 por definición.
-    # El Ratio_MOD se aplica exclusivamente a las horas de producción.
-    df['Horas_Hombre'] = (df['Horas_Produccion'] * df['Ratio_MOD'].fillna(1.0)) + df.get('Setup (h)', 0)
-    
-    # Capacidad Anual en Horas
-    df['Capacidad_Anual_H'] = df['dias laborales 2026'] * df['horas_turno']
-    
-    # % Saturación
-    df['Saturacion'] = (df['Horas_Totales'] / df['Capacidad_Anual_H']).replace([float('inf'), -float('inf')], 0).fillna(0)
-    
-    return df
+    moved_rows = len(ov_idx) and (overlay.centro[ov_sel] != centro_original[ov_idx]).any()
+    if moved_rows:
+        centro = centro_original.copy()
+        centro[ov_idx] = overlay.centro[ov_sel]
+    else:
+        # Sin traslados el Centro es el del maestro: se comparte su array de texto
+        centro = master.text_array('Centro') if rows is None else master.text_array('Centro')[rows]
 
-@time_it
-def get_simulation_data(db: Session, scenario_id: int = None, dias_laborales: int = None, overrides_list: List = None, horas_turno: int = None, center_configs: dict = None):
-    # En lugar de pd.read_excel, usamos la caché
-    df = get_base_dataframe()
-    
-    # Asegurar que horas_turno es entero
-    h_turno = int(horas_turno) if horas_turno is not None else 16
-    df['horas_turno'] = h_turno
-    
-    # Aplicar configuraciones por centro si existen
-    if center_configs:
-        for centro, config in center_configs.items():
-            if isinstance(config, dict) and 'shifts' in config:
-                df.loc[df['Centro'].astype(str) == str(centro), 'horas_turno'] = int(config['shifts'])
-    
-    selected_overrides = []
-    if scenario_id:
-        selected_overrides = db.query(database.ScenarioDetail).filter(database.ScenarioDetail.scenario_id == scenario_id).all()
-    elif overrides_list:
-        selected_overrides = overrides_list
+    # Usar override si existe, sino columna del excel (ya con default 238)
+    if d_lab is not None:
+        dias = np.full(n, d_lab, dtype=np.int64)
+    else:
+        dias = master.base['dias laborales 2026'] if rows is None else master.base['dias laborales 2026'][rows]
+    horas_totales = overlay.patched(master, 'Horas_Totales', rows)
 
-    for ov in selected_overrides:
-        # Pydantic models (de server.py) o SQLAlchemy objects tienen atributos similares
-        # Si es un dict (de un payload POST), usamos get, si es objeto usamos getattr
-        art = getattr(ov, 'articulo', None) or (ov.articulo if hasattr(ov, 'articulo') else None)
-        cen = getattr(ov, 'centro', None) or (ov.centro if hasattr(ov, 'centro') else None)
-        
-        mask = (df['Articulo'].astype(str) == str(art)) & (df['Centro'].astype(str) == str(cen))
-        
-        oee = getattr(ov, 'oee_override', None)
-        ppm = getattr(ov, 'ppm_override', None)
-        dem = getattr(ov, 'demanda_override', None)
-        nc = getattr(ov, 'new_centro', None)
-        ht = getattr(ov, 'horas_turno_override', None)
-
-        if oee is not None: df.loc[mask, '%OEE'] = oee
-        if ppm is not None: df.loc[mask, 'Piezas por minuto'] = ppm
-        if dem is not None: df.loc[mask, 'Volumen anual'] = dem
-        if nc is not None: df.loc[mask, 'Centro'] = nc
-        if ht is not None: df.loc[mask, 'horas_turno'] = ht
-        
-        # Override del Ratio MOD (Personnel Ratio)
-        mod_ov = getattr(ov, 'personnel_ratio_override', None)
-        if mod_ov is not None:
-            df.loc[mask, 'Ratio_MOD'] = mod_ov
+    capacidad = dias * horas_turno
+    if ENGINE_DTYPE is not np.float64:
+        capacidad = capacidad.astype(ENGINE_DTYPE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saturacion = horas_totales / capacidad
+    saturacion[~np.isfinite(saturacion)] = 0
 
-    d_lab = int(dias_laborales) if dias_laborales is not None else None
-    df = calculate_saturation(df, d_lab, h_turno)
-    
+    computed = {
+        'Centro': centro,
+        'Volumen anual': overlay.patched(master, 'Volumen anual', rows),
+        'Piezas por minuto': overlay.patched(master, 'Piezas por minuto', rows),
+        '%OEE': overlay.patched(master, '%OEE', rows),
+        'dias laborales 2026': dias,
+        'Piezas por hora': overlay.patched(master, 'Piezas por hora', rows),
+        'horas_turno': horas_turno,
+        'Ratio_MOD': overlay.patched(master, 'Ratio_MOD', rows),
+        'Horas_Produccion': overlay.patched(master, 'Horas_Produccion', rows),
+        'Horas_Totales': horas_totales,
+        'Horas_Hombre': overlay.patched(master, 'Horas_Hombre', rows),
+        'Capacidad_Anual_H': capacidad,
+        'Saturacion': saturacion,
+    }
+
+    # Columnas del Excel en su orden original; las calculadas nuevas van al final. Solo se
+    # materializan las que se sirven tal cual; las de texto se comparten con el maestro.
+    passthrough = [col for col in master.column_names if col not in computed]
+    frame = master.get_columns([col for col in passthrough if col not in master_store.KEY_COLUMNS])
+    data = {}
+    for col in master.column_names:
+        if col in computed:
+            data[col] = computed.pop(col)
+            continue
+        values = master.text_array(col) if col in master_store.KEY_COLUMNS else frame[col].array
+        data[col] = values if rows is None else values[rows]
+    data.update(computed)
+    return pd.DataFrame(data, index=rows, copy=False)
+
+
+class SimulationResult:
+    """Detalle y resumen por centro de una simulación. Es lo que guarda la caché de resultados."""
+
+    def __init__(self, detail: pd.DataFrame, summary: pd.DataFrame, master_version: str):
+        self.detail = detail
+        self.summary = summary
+        self.master_version = master_version
+        # (d_lab, h_turno, center_configs, overrides) con que se calculó, para rebasarlo a otra versión del maestro
+        self.params = None
+        # Memoria propia del detalle (sin contar las columnas compartidas con el maestro)
+        self.nbytes = None
+        # Partes ya codificadas por formato, para no re-serializar en cada acierto de caché
+        self._encoded = {}
+        self._arrow = None
+
+    def project(self, centros=None, columns=None, sort=None, limit=None, offset=0, summary_only=False):
+        """Vista filtrada/ordenada/paginada del resultado (ver projection.project_frames). Retorna (resultado, page)."""
+        detail, summary, page = projection.project_frames(
+            self.detail, self.summary, centros=centros, columns=columns, sort=sort,
+            limit=limit, offset=offset, summary_only=summary_only, optional_columns=OPTIONAL_DETAIL_COLUMNS,
+        )
+        return SimulationResult(detail, summary, self.master_version), page
+
+    def records(self):
+        """detail/summary como listas de dicts (objetos Python)."""
+        return serialization.to_records(self.detail), serialization.to_records(self.summary)
+
+    def _encoded_part(self, part, fmt):
+        key = (part, fmt)
+        if key not in self._encoded:
+            self._encoded[key] = serialization.encode_frame(getattr(self, part), fmt)
+        return self._encoded[key]
+
+    def render(self, meta: dict, fmt=serialization.FORMAT_RECORDS) -> bytes:
+        """Cuerpo de la respuesta HTTP en el formato negociado (ver serialization.py)."""
+        if fmt == serialization.FORMAT_ARROW:
+            if self._arrow is None:
+                self._arrow = serialization.arrow_table(self.detail)
+            return serialization.arrow_stream(self._arrow, self.summary, meta)
+        return serialization.json_body(self._encoded_part('detail', fmt), self._encoded_part('summary', fmt), meta)
+
+
+_result_cache = result_cache.ResultCache(
+    max_entries=int(os.environ.get("RPK_RESULT_CACHE_SIZE", 64)),
+    ttl_seconds=int(os.environ.get("RPK_RESULT_CACHE_TTL", 600)),
+)
+
+def cache_stats():
+    stats = _result_cache.stats()
+    stats['result_bytes'] = sum(r.nbytes or 0 for r in _result_cache.values())
+    return stats
+
+def _result_nbytes(master: MasterData, detail: pd.DataFrame):
+    """Bytes de las columnas del detalle que son propias de la petición (no compartidas con el maestro)."""
+    shared, text = master.shared_arrays()
+    total = 0
+    for col in detail.columns:
+        values = detail[col].array
+        if any(values is t for t in text):
+            continue
+        if isinstance(values, pd.arrays.NumpyExtensionArray):
+            arr = values.to_numpy()
+            if any(np.may_share_memory(arr, s) for s in shared):
+                continue
+        total += int(values.nbytes)
+    return total
+
+@metrics.timed('aggregate')
+def _summarize(df: pd.DataFrame) -> pd.DataFrame:
     # Agrupación por Centro para el resumen de saturación
     centro_summary = df.groupby('Centro').agg({
         'Saturacion': 'sum',
@@ -187,29 +826,189 @@ def get_simulation_data(db: Session, scenario_id: int = None, dias_laborales: in
     }).reset_index()
     
     centro_summary.rename(columns={'Articulo': 'Num_Articulos'}, inplace=True)
-    
-    # Asegurar que no hay NaNs ni Valores Infinitos que rompan el JSON
-    df = df.fillna(0).replace([float('inf'), -float('inf')], 0)
-    centro_summary = centro_summary.fillna(0).replace([float('inf'), -float('inf')], 0)
+    return centro_summary
+
+@metrics.timed('simulate')
+def simulate(db: Session, scenario_id: int = None, dias_laborales: int = None, overrides_list: List = None, horas_turno: int = None, center_configs: dict = None):
+    """Ejecuta (o recupera de caché) una simulación. Retorna (SimulationResult, meta)."""
+    # El maestro es compartido y de solo lectura: la petición solo aporta su overlay
+    master = get_master()
+
+    # Asegurar que horas_turno es entero
+    h_turno = int(horas_turno) if horas_turno is not None else 16
+
+    selected_overrides = []
+    if scenario_id:
+        selected_overrides = db.query(database.ScenarioDetail).filter(database.ScenarioDetail.scenario_id == scenario_id).all()
+    elif overrides_list:
+        selected_overrides = overrides_list
 
+    d_lab = int(dias_laborales) if dias_laborales is not None else None
+    positions, values, moved = _resolve_overrides(master, selected_overrides)
+    key = result_cache.fingerprint(
+        master.version, d_lab, h_turno, center_configs,
+        _canonical_overrides(master, positions, values, moved),
+    )
+
+    result = _result_cache.get(key)
+    if result is None:
+        with metrics.stage('overlay'):
+            overlay = OverrideOverlay(master, positions, values, moved)
+        metrics.inc('rpk_overrides_applied_total', len(selected_overrides))
+        df = run_engine(master, overlay, d_lab, h_turno, center_configs)
+        result = SimulationResult(df, _summarize(df), master.version)
+        result.nbytes = _result_nbytes(master, df)
+        result.params = (d_lab, h_turno, center_configs, [types.SimpleNamespace(**override_fields(ov)) for ov in selected_overrides])
+        _result_cache.put(key, result)
+
+    meta = _build_meta(d_lab, h_turno, center_configs, selected_overrides, result.master_version)
+    meta["result_bytes"] = result.nbytes
+    return result, meta
+
+def get_simulation_data(db: Session, scenario_id: int = None, dias_laborales: int = None, overrides_list: List = None, horas_turno: int = None, center_configs: dict = None):
+    """Simulación como dict de listas de filas (formato histórico, para scripts y pruebas)."""
+    result, meta = simulate(db, scenario_id, dias_laborales, overrides_list, horas_turno, center_configs)
+    detail, summary = result.records()
     return {
-        "detail": df.to_dict(orient="records"),
-        "summary": centro_summary.to_dict(orient="records"),
-        "meta": {
-            "dias_laborales": d_lab if d_lab is not None else 238,
-            "horas_turno_global": h_turno,
-            "center_configs": center_configs or {},
-            "applied_overrides": [
-                {
-                    "articulo": getattr(ov, 'articulo', None) or (ov.articulo if hasattr(ov, 'articulo') else None),
-                    "centro": getattr(ov, 'centro', None) or (ov.centro if hasattr(ov, 'centro') else None),
-                    "oee_override": getattr(ov, 'oee_override', None),
-                    "ppm_override": getattr(ov, 'ppm_override', None),
-                    "demanda_override": getattr(ov, 'demanda_override', None),
-                    "new_centro": getattr(ov, 'new_centro', None),
-                    "horas_turno_override": getattr(ov, 'horas_turno_override', None),
-                    "personnel_ratio_override": getattr(ov, 'personnel_ratio_override', None)
-                } for ov in selected_overrides
-            ] if selected_overrides else []
-        }
+        "detail": detail,
+        "summary": summary,
+        "meta": meta,
+    }
+
+def override_fields(ov):
+    """Campos de un override (Pydantic o SQLAlchemy) como dict con la forma de OverrideBase."""
+    return {
+        "articulo": getattr(ov, 'articulo', None),
+        "centro": getattr(ov, 'centro', None),
+        "oee_override": getattr(ov, 'oee_override', None),
+        "ppm_override": getattr(ov, 'ppm_override', None),
+        "demanda_override": getattr(ov, 'demanda_override', None),
+        "new_centro": getattr(ov, 'new_centro', None),
+        "horas_turno_override": getattr(ov, 'horas_turno_override', None),
+        "personnel_ratio_override": getattr(ov, 'personnel_ratio_override', None)
+    }
+
+def _build_meta(d_lab, h_turno, center_configs, selected_overrides, master_version=None):
+    return {
+        "master_version": master_version,
+        "dias_laborales": d_lab if d_lab is not None else 238,
+        "horas_turno_global": h_turno,
+        "center_configs": center_configs or {},
+        "applied_overrides": [override_fields(ov) for ov in selected_overrides] if selected_overrides else []
     }
+
+
+class PreviewSession:
+    """
+    Último resultado enviado a una sesión de preview, para poder responder solo con el delta.
+    `token` identifica ese resultado: el cliente lo devuelve y solo se le responde con un
+    delta si es el mismo que tiene guardado la sesión.
+    """
+
+    def __init__(self, master_version, d_lab, h_turno, shifts, effects, detail, summary):
+        self.token = uuid.uuid4().hex
+        self.master_version = master_version
+        self.d_lab = d_lab
+        self.h_turno = h_turno
+        self.shifts = shifts
+        self.effects = effects
+        self.detail = detail
+        self.summary = summary
+
+
+_preview_sessions = result_cache.ResultCache(
+    max_entries=int(os.environ.get("RPK_PREVIEW_SESSIONS", 32)),
+    ttl_seconds=int(os.environ.get("RPK_PREVIEW_SESSION_TTL", 1800)),
+)
+# Cerrojos por sesión (repartidos por hash): dos previews de la misma sesión no se solapan
+_preview_locks = [threading.Lock() for _ in range(64)]
+
+def center_shifts(center_configs):
+    """Horas de turno propias de cada centro en `center_configs`: {centro: horas}."""
+    return {
+        str(centro): int(config['shifts'])
+        for centro, config in (center_configs or {}).items()
+        if isinstance(config, dict) and 'shifts' in config
+    }
+
+@metrics.timed('preview')
+def simulate_preview_incremental(session_id: str, overrides_list: List = None, dias_laborales: int = None, horas_turno: int = None, center_configs: dict = None, base_token: str = None):
+    """
+    Preview incremental: recuerda el último resultado de la sesión y solo recalcula las
+    filas cuyo efecto ha cambiado (overrides o turnos de su centro) y el resumen de los
+    centros afectados, incluidos origen y destino de los traslados con `new_centro`.
+
+    Retorna (SimulationResult, meta). `meta.preview_token` identifica el resultado que el
+    cliente tendrá tras aplicar la respuesta y debe enviarse como `base_token` en la
+    siguiente. Si `meta.incremental` es True, el detalle solo contiene las filas cambiadas
+    (con su posición en `detail_positions`), el resumen solo los centros afectados y
+    `removed_centros` los centros que se han quedado sin artículos.
+    Un `base_token` distinto del de la sesión (respuestas cruzadas, otro worker, sesión
+    caducada), días laborales, turno global o una nueva versión del maestro fuerzan un
+    cálculo completo.
+    """
+    with _preview_locks[hash(session_id) % len(_preview_locks)]:
+        return _preview(session_id, overrides_list, dias_laborales, horas_turno, center_configs, base_token)
+
+def _preview(session_id, overrides_list, dias_laborales, horas_turno, center_configs, base_token):
+    master = get_master()
+    h_turno = int(horas_turno) if horas_turno is not None else 16
+    d_lab = int(dias_laborales) if dias_laborales is not None else None
+    overrides = overrides_list or []
+
+    positions, values, moved = _resolve_overrides(master, overrides)
+    overlay = OverrideOverlay(master, positions, values, moved)
+    effects = _row_effects(master, positions, values, moved)
+    shifts = center_shifts(center_configs)
+    meta = _build_meta(d_lab, h_turno, center_configs, overrides, master.version)
+    meta["session_id"] = session_id
+
+    prev = _preview_sessions.get(session_id)
+    if (prev is None or base_token is None or base_token != prev.token
+            or (prev.master_version, prev.d_lab, prev.h_turno) != (master.version, d_lab, h_turno)):
+        detail = run_engine(master, overlay, d_lab, h_turno, center_configs)
+        summary = _summarize(detail)
+        session = PreviewSession(master.version, d_lab, h_turno, shifts, effects, detail, summary)
+        _preview_sessions.put(session_id, session)
+        meta["incremental"] = False
+        meta["preview_token"] = session.token
+        return SimulationResult(detail, summary, master.version), meta
+
+    # Filas cuyo resultado cambia: efecto de overrides distinto o turno de su centro distinto
+    changed = {p for p in prev.effects.keys() | effects.keys() if prev.effects.get(p) != effects.get(p)}
+    changed_shift_centros = [c for c in prev.shifts.keys() | shifts.keys() if prev.shifts.get(c) != shifts.get(c)]
+    if changed_shift_centros:
+        changed.update(np.flatnonzero(np.isin(master.centro, changed_shift_centros)).tolist())
+    rows = np.array(sorted(changed), dtype=np.int64)
+
+    detail = prev.detail
+    summary = prev.summary
+    removed = []
+    if len(rows):
+        new_rows = run_engine(master, overlay, d_lab, h_turno, center_configs, rows=rows)
+        # Centros afectados: origen (antes) y destino (ahora) de cada fila cambiada
+        affected = set(prev.detail['Centro'].to_numpy()[rows]) | set(new_rows['Centro'])
+
+        detail = prev.detail.copy()
+        for col in new_rows.columns:
+            column = detail[col].to_numpy(copy=True)
+            column[rows] = new_rows[col].to_numpy()
+            detail[col] = column
+
+        in_affected = detail['Centro'].isin(affected).to_numpy()
+        affected_summary = _summarize(detail[in_affected])
+        removed = sorted(affected - set(affected_summary['Centro']), key=str)
+        summary = pd.concat([summary[~summary['Centro'].isin(affected)], affected_summary])
+        summary = summary.sort_values('Centro').reset_index(drop=True)
+        changed_summary = affected_summary
+    else:
+        new_rows = detail.iloc[0:0]
+        changed_summary = summary.iloc[0:0]
+
+    session = PreviewSession(master.version, d_lab, h_turno, shifts, effects, detail, summary)
+    _preview_sessions.put(session_id, session)
+    meta["incremental"] = True
+    meta["preview_token"] = session.token
+    meta["detail_positions"] = rows.tolist()
+    meta["removed_centros"] = removed
+    return SimulationResult(new_rows, changed_summary, master.version), meta
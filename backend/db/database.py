@@ -4,7 +4,8 @@ from sqlalchemy.orm import sessionmaker, relationship
 import datetime
 import os
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "simulador.db")
+# RPK_DB_PATH usa otra base de datos (benchmarks y pruebas de carga no tocan la de escenarios)
+DB_PATH = os.environ.get("RPK_DB_PATH") or os.path.join(os.path.dirname(__file__), "simulador.db")
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
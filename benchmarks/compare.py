@@ -0,0 +1,89 @@
+"""
+Compara dos ejecuciones del histórico de benchmarks (por defecto, las dos últimas).
+Cada ejecución se elige por posición (-1 la última), por commit o por etiqueta.
+
+    python -m benchmarks.compare
+    python -m benchmarks.compare --base a1b2c3d --head -1 --threshold 0.15 --fail
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.run import DEFAULT_HISTORY
+
+
+def load_history(path=DEFAULT_HISTORY):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def select(history, ref):
+    """Ejecución por posición ("-1"), commit (prefijo) o etiqueta; la más reciente si hay varias."""
+    try:
+        return history[int(ref)]
+    except (ValueError, IndexError):
+        pass
+    for entry in reversed(history):
+        if entry.get('label') == ref or (entry.get('commit') and entry['commit'].startswith(ref)):
+            return entry
+    raise KeyError(f"No hay ninguna ejecución '{ref}' en el histórico")
+
+
+def compare(base, head, threshold=0.10):
+    """
+    Filas (configuración, caso, mediana base, mediana nueva, cociente, estado) de los casos
+    presentes en las dos ejecuciones. Estado: 'peor' / 'mejor' si el cociente se sale de
+    1 ± threshold.
+    """
+    base_cases = {(r['key'], name): stats for r in base['results'] for name, stats in r['cases'].items()}
+    rows = []
+    for result in head['results']:
+        for name, stats in result['cases'].items():
+            before = base_cases.get((result['key'], name))
+            if before is None:
+                continue
+            ratio = stats['median'] / before['median'] if before['median'] else float('inf')
+            status = 'peor' if ratio > 1 + threshold else 'mejor' if ratio < 1 - threshold else ''
+            rows.append((result['key'], name, before['median'], stats['median'], ratio, status))
+    return rows
+
+
+def _describe(entry):
+    return f"{entry.get('commit') or '?'}{'+' if entry.get('dirty') else ''} {entry.get('label') or ''} ({entry['timestamp']})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dos ejecuciones del histórico de benchmarks")
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--base', default="-2")
+    parser.add_argument('--head', default="-1")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Variación relativa que se marca (0.10 = 10%%)")
+    parser.add_argument('--fail', action='store_true', help="Salir con código 1 si algún caso empeora")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    base, head = select(history, args.base), select(history, args.head)
+    print(f"Base:  {_describe(base)}")
+    print(f"Nuevo: {_describe(head)}")
+
+    rows = compare(base, head, args.threshold)
+    current = None
+    for key, name, before, after, ratio, status in rows:
+        if key != current:
+            print(f"\n{key}")
+            current = key
+        print(f"   {name:<24} {before * 1000:10.2f} ms -> {after * 1000:10.2f} ms  x{ratio:5.2f}  {status}")
+
+    worse = [r for r in rows if r[5] == 'peor']
+    if not rows:
+        print("\nNo hay casos comunes entre las dos ejecuciones.")
+    elif worse:
+        print(f"\n⚠️ {len(worse)} casos más lentos que la base (umbral {args.threshold:.0%}).")
+    else:
+        print("\n✅ Ningún caso empeora por encima del umbral.")
+    if args.fail and worse:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Entorno aislado para benchmarks y pruebas de carga: base de datos propia, sin calentamiento
+ni vigilante del Excel, y maestros sintéticos en un directorio de trabajo (RPK_BENCH_DIR,
+por defecto <temp>/rpk_bench). Se importa antes que cualquier módulo de `backend`, porque
+las rutas de la base de datos y del maestro se leen al importar.
+"""
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+WORK_DIR = os.environ.get("RPK_BENCH_DIR") or os.path.join(tempfile.gettempdir(), "rpk_bench")
+os.makedirs(WORK_DIR, exist_ok=True)
+os.environ.setdefault("RPK_DB_PATH", os.path.join(WORK_DIR, "bench.db"))
+os.environ.setdefault("RPK_WARMUP", "0")
+os.environ.setdefault("RPK_MASTER_WATCH", "0")
+
+from backend.core import master_store, simulation_core  # noqa: E402
+from benchmarks import synthetic_master  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ensure_master(rows, centros=40, shared_articles=0.0, seed=0):
+    """Ruta del maestro sintético de esa configuración (se genera la primera vez y se reutiliza)."""
+    name = f"m{rows}_c{centros}_s{shared_articles:g}_seed{seed}"
+    excel_path = os.path.join(WORK_DIR, name, "MAESTRO FLEJE_v1.xlsx")
+    if not os.path.exists(master_store.store_path_for(excel_path)):
+        df = synthetic_master.generate_master(rows, centros, shared_articles, seed)
+        synthetic_master.write_master(df, excel_path)
+    return excel_path
+
+
+def use_master(excel_path):
+    """Apunta el simulador a otro maestro y descarta el cargado, la caché y las sesiones."""
+    simulation_core.set_master(excel_path)
+    return simulation_core.get_master()
+
+
+def master_frame(excel_path):
+    """Columnas clave del maestro sintético (para generar overrides sobre filas que existen)."""
+    table, _ = master_store.open_store(master_store.store_path_for(excel_path))
+    return master_store.materialize_columns(table, ['Articulo', 'Centro', 'Piezas por minuto', 'Volumen anual'])
+
+
+def machine_info():
+    """Commit, versiones y máquina, para comparar resultados entre ejecuciones."""
+    import numpy as np
+    import pandas as pd
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                    capture_output=True, text=True, timeout=30).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "engine_dtype": str(simulation_core.ENGINE_DTYPE.__name__),
+    }
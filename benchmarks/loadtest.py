@@ -0,0 +1,284 @@
+"""
+Prueba de carga de la app FastAPI en el mismo proceso (ASGI, sin red) con sesiones de
+planificador que imitan a frontend/ui/app.js:
+
+  1. Arranque: GET /api/scenarios y GET /api/simulate/base con las columnas del dashboard.
+  2. Ráfagas del campo de días laborables: varios cambios seguidos y, tras el debounce de
+     500 ms, un POST /api/simulate/preview con la sesión incremental. Algunas ráfagas
+     editan antes un artículo (override nuevo), como el formulario de edición.
+  3. Guardar escenario: POST /api/scenarios, recargar la lista y abrir el escenario.
+  4. Comparar A/B: GET /api/compare, como runCompare.
+
+Para cada nivel de concurrencia (planificadores simultáneos) informa del rendimiento,
+los percentiles de latencia por paso, los rechazos por servidor ocupado (503) y el
+crecimiento de memoria del proceso.
+
+    python -m benchmarks.loadtest --rows 20000 --users 1,4,8,16 --duration 30
+    python -m benchmarks.loadtest --users 8 --time-scale 0   # sin pausas: máximo rendimiento
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import time
+import urllib.parse
+
+from benchmarks import environment
+from benchmarks.environment import simulation_core as sc
+from benchmarks.synthetic_master import generate_overrides
+
+import httpx
+
+from backend.api import server
+from backend.db import database
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "loadtest.jsonl")
+
+# Las mismas columnas que pide app.js (DETAIL_COLUMNS)
+DETAIL_COLUMNS = ['Articulo', 'Centro', 'Volumen anual', 'Piezas por minuto', '%OEE', 'Saturacion', 'Ratio_MOD', 'horas_turno', 'Setup (h)']
+DETAIL_QUERY = "columns=" + urllib.parse.quote(",".join(DETAIL_COLUMNS))
+
+# Tiempos del usuario (segundos, se multiplican por --time-scale)
+DEBOUNCE_SECONDS = 0.5
+KEYSTROKE_SECONDS = (0.08, 0.3)
+THINK_SECONDS = (1.0, 4.0)
+BURSTS_PER_SESSION = (3, 8)
+EDIT_PROBABILITY = 0.4
+
+
+class Recorder:
+    """Latencias y códigos de respuesta de un nivel de concurrencia, por paso de la sesión."""
+
+    def __init__(self):
+        self.samples = {}   # paso -> [segundos]
+        self.statuses = {}  # código -> peticiones
+        self.errors = 0
+        self.sessions = 0
+
+    def add(self, step, seconds, status):
+        self.samples.setdefault(step, []).append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, elapsed):
+        all_samples = sorted(s for values in self.samples.values() for s in values)
+        return {
+            "requests": len(all_samples),
+            "sessions": self.sessions,
+            "throughput_rps": round(len(all_samples) / elapsed, 2) if elapsed else None,
+            "sessions_per_min": round(self.sessions * 60 / elapsed, 2) if elapsed else None,
+            "rejected_503": self.statuses.get(503, 0),
+            "errors": self.errors,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "latency_ms": percentiles(all_samples),
+            "steps": {step: percentiles(sorted(values)) for step, values in sorted(self.samples.items())},
+        }
+
+
+def percentiles(values):
+    if not values:
+        return {}
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+    return {"count": len(values), "p50": pick(0.50), "p90": pick(0.90), "p95": pick(0.95),
+            "p99": pick(0.99), "max": round(values[-1] * 1000, 2)}
+
+
+def rss_mb():
+    """Memoria residente actual del proceso (Linux); None si no se puede leer."""
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class PlannerSession:
+    """Un planificador repitiendo sesiones de app.js hasta `deadline`."""
+
+    def __init__(self, client, user, recorder, overrides, scenario_ids, time_scale, seed):
+        self.client = client
+        self.user = user
+        self.recorder = recorder
+        self.overrides = overrides
+        self.scenario_ids = scenario_ids
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.saved = 0
+
+    async def pause(self, bounds):
+        if self.time_scale > 0:
+            await asyncio.sleep(self.rng.uniform(*bounds) * self.time_scale)
+
+    async def request(self, step, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            await response.aread()
+        except Exception:
+            self.recorder.errors += 1
+            return None
+        self.recorder.add(step, time.perf_counter() - start, response.status_code)
+        if response.status_code >= 400 and response.status_code != 503:
+            self.recorder.errors += 1
+        return response
+
+    async def run(self, deadline):
+        while time.perf_counter() < deadline:
+            await self.session(deadline)
+            self.recorder.sessions += 1
+
+    async def session(self, deadline):
+        days, shifts = 238, 16
+        local_overrides = []
+        session_id = f"lt-{self.user}-{self.rng.getrandbits(40):x}"
+        preview_token = None
+
+        await self.request('scenarios', 'GET', '/api/scenarios')
+        await self.request('base', 'GET', f'/api/simulate/base?dias_laborales={days}&horas_turno={shifts}&{DETAIL_QUERY}')
+
+        for _ in range(self.rng.randint(*BURSTS_PER_SESSION)):
+            if time.perf_counter() >= deadline:
+                return
+            await self.pause(THINK_SECONDS)
+            if self.rng.random() < EDIT_PROBABILITY:
+                local_overrides.append(self.rng.choice(self.overrides))
+            else:
+                for _ in range(self.rng.randint(1, 6)):
+                    days = max(180, min(260, days + self.rng.choice((-1, 1))))
+                    await self.pause(KEYSTROKE_SECONDS)
+                if self.time_scale > 0:
+                    await asyncio.sleep(DEBOUNCE_SECONDS * self.time_scale)
+            response = await self.request('preview', 'POST', f'/api/simulate/preview?{DETAIL_QUERY}', json={
+                "overrides": local_overrides, "dias_laborales": days, "horas_turno": shifts,
+                "center_configs": {}, "session_id": session_id, "base_token": preview_token,
+            })
+            if response is not None and response.status_code == 200:
+                preview_token = response.json()["meta"].get("preview_token")
+
+        await self.pause(THINK_SECONDS)
+        self.saved += 1
+        response = await self.request('save', 'POST', '/api/scenarios', json={
+            "name": f"Carga {self.user}-{self.saved}-{session_id}", "dias_laborales": days,
+            "horas_turno_global": shifts, "center_configs": {}, "overrides": local_overrides,
+        })
+        await self.request('scenarios', 'GET', '/api/scenarios')
+        if response is not None and response.status_code == 200:
+            scenario_id = response.json()["id"]
+            await self.request('scenario', 'GET', f'/api/simulate/{scenario_id}?dias_laborales={days}&horas_turno={shifts}&{DETAIL_QUERY}')
+
+        await self.pause(THINK_SECONDS)
+        other = self.rng.choice(self.scenario_ids)
+        await self.request('compare', 'GET', f'/api/compare?a=base&b={other}')
+
+
+async def seed_scenarios(client, overrides, count=3):
+    """Escenarios guardados para las comparaciones A/B."""
+    ids = []
+    for i in range(count):
+        response = await client.post('/api/scenarios', json={
+            "name": f"Carga base {i} {time.time_ns()}", "dias_laborales": 238, "horas_turno_global": 16,
+            "center_configs": {}, "overrides": overrides[i * 10:(i + 1) * 10],
+        })
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def run_level(client, users, duration, overrides, scenario_ids, time_scale, seed):
+    gc.collect()
+    rss_before = rss_mb()
+    recorder = Recorder()
+    sessions = [PlannerSession(client, f"{users}.{u}", recorder, overrides, scenario_ids, time_scale, seed * 1000 + u)
+                for u in range(users)]
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(s.run(deadline) for s in sessions))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    rss_after = rss_mb()
+    return {
+        "users": users,
+        "elapsed_seconds": round(elapsed, 2),
+        **recorder.summary(elapsed),
+        "rss_before_mb": rss_before,
+        "rss_after_mb": rss_after,
+        "rss_growth_mb": round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+        "result_cache": sc.cache_stats()["entries"],
+        "compute": server.compute_pool.stats(),
+    }
+
+
+async def run(levels, duration, rows, centros, n_overrides, time_scale, seed):
+    excel_path = environment.ensure_master(rows, centros, seed=seed)
+    overrides = generate_overrides(environment.master_frame(excel_path), n_overrides, seed=seed)
+    environment.use_master(excel_path)
+    # Base de datos de escenarios limpia en cada ejecución
+    database.Base.metadata.drop_all(bind=database.engine)
+
+    results = []
+    async with server.lifespan(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            scenario_ids = await seed_scenarios(client, overrides)
+            for users in levels:
+                print(f"🏋️ {users} planificadores durante {duration} s...", flush=True)
+                result = await run_level(client, users, duration, overrides, scenario_ids, time_scale, seed)
+                results.append(result)
+                lat = result["latency_ms"]
+                print(f"   {result['throughput_rps']} pet/s, p50 {lat.get('p50')} ms, p95 {lat.get('p95')} ms, "
+                      f"p99 {lat.get('p99')} ms, 503: {result['rejected_503']}, errores: {result['errors']}, "
+                      f"memoria {result['rss_before_mb']} -> {result['rss_after_mb']} MB", flush=True)
+    return results
+
+
+def print_table(results):
+    print(f"\n{'usuarios':>8} {'pet/s':>8} {'ses/min':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'503':>5} {'err':>5} {'ΔRSS MB':>8}")
+    for r in results:
+        lat = r["latency_ms"]
+        print(f"{r['users']:>8} {r['throughput_rps']:>8} {r['sessions_per_min']:>8} {lat.get('p50', '-'):>9} "
+              f"{lat.get('p95', '-'):>9} {lat.get('p99', '-'):>9} {r['rejected_503']:>5} {r['errors']:>5} "
+              f"{r['rss_growth_mb'] if r['rss_growth_mb'] is not None else '-':>8}")
+    for r in results:
+        print(f"\nPasos con {r['users']} usuarios (ms):")
+        for step, p in r["steps"].items():
+            print(f"   {step:<10} n={p['count']:<6} p50 {p['p50']:>9}  p95 {p['p95']:>9}  p99 {p['p99']:>9}  máx {p['max']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga en proceso con sesiones de planificador")
+    parser.add_argument('--users', default="1,2,4,8", help="Niveles de concurrencia separados por comas")
+    parser.add_argument('--duration', type=float, default=30, help="Segundos por nivel")
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--centros', type=int, default=40)
+    parser.add_argument('--overrides', type=int, default=200, help="Overrides disponibles para las ediciones")
+    parser.add_argument('--time-scale', type=float, default=1.0, help="Escala de las pausas del usuario (0 = sin pausas)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    levels = [int(u) for u in args.users.split(',') if u.strip()]
+    results = asyncio.run(run(levels, args.duration, args.rows, args.centros, args.overrides, args.time_scale, args.seed))
+    print_table(results)
+
+    entry = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        **environment.machine_info(),
+        "config": {"rows": args.rows, "centros": args.centros, "duration": args.duration,
+                   "time_scale": args.time_scale, "seed": args.seed,
+                   "compute_workers": server.compute_pool.max_workers, "compute_queue": server.compute_pool.max_queue},
+        "levels": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    print(f"\n📊 Resultados añadidos a {args.output}.", flush=True)
+
+
+if __name__ == '__main__':
+    main()
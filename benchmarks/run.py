@@ -0,0 +1,188 @@
+"""
+Benchmarks del simulador sobre maestros sintéticos: etapas del motor (carga, overrides,
+saturación, agregación, serialización) y endpoints HTTP en el mismo proceso (sin red).
+Cada ejecución se añade como una línea a un histórico JSON para compararla con otras
+(ver benchmarks/compare.py).
+
+    python -m benchmarks.run --rows 1000,10000,100000 --overrides 50
+    python -m benchmarks.run --rows 1000000 --centros 300 --shared-articles 0.1 --no-http
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import time
+import types
+
+from benchmarks import environment
+from benchmarks.environment import simulation_core as sc
+from benchmarks.synthetic_master import generate_overrides, parse_mix
+from backend.core import serialization
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "history.jsonl")
+
+
+def measure(func, repeat, setup=None):
+    """
+    Tiempos de `repeat` llamadas a `func` (tras una de calentamiento). `setup` se ejecuta
+    antes de cada llamada, fuera de la medida. Retorna estadísticas en segundos.
+    """
+    if setup:
+        setup()
+    func()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "min": round(times[0], 6),
+        "median": round(statistics.median(times), 6),
+        "mean": round(statistics.fmean(times), 6),
+        "p95": round(times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))], 6),
+        "max": round(times[-1], 6),
+        "repeat": repeat,
+    }
+
+
+def bench_core(excel_path, overrides, repeat):
+    """Etapas del motor, una a una, sobre el maestro de `excel_path`."""
+    master = environment.use_master(excel_path)
+    ovs = [types.SimpleNamespace(**{**dict.fromkeys(sc.OVERRIDE_COLUMNS), 'new_centro': None, **ov}) for ov in overrides]
+    results = {}
+
+    def load():
+        sc.reset_master()
+        sc.get_master()
+    results['master_load'] = measure(load, repeat)
+    master = sc.get_master()
+
+    results['get_base_dataframe'] = measure(sc.get_base_dataframe, repeat)
+
+    results['overrides'] = measure(lambda: sc.build_overlay(master, ovs), repeat)
+    overlay = sc.build_overlay(master, ovs)
+    results['calculate'] = measure(lambda: sc.run_engine(master, overlay, None, 16, {}), repeat)
+    detail = sc.run_engine(master, overlay, None, 16, {})
+    results['aggregate'] = measure(lambda: sc._summarize(detail), repeat)
+    summary = sc._summarize(detail)
+
+    meta = sc._build_meta(None, 16, {}, ovs, master.version)
+    for fmt in (serialization.FORMAT_RECORDS, serialization.FORMAT_COLUMNAR, serialization.FORMAT_ARROW):
+        # Resultado nuevo en cada llamada: sin las partes ya codificadas que guarda la caché
+        results[f'serialize_{fmt}'] = measure(
+            lambda: sc.SimulationResult(detail, summary, master.version).render(meta, fmt), repeat)
+
+    results['simulate_cold'] = measure(lambda: sc.simulate(None, overrides_list=ovs), repeat,
+                                       setup=sc._result_cache.clear)
+    results['simulate_cached'] = measure(lambda: sc.simulate(None, overrides_list=ovs), repeat)
+    return results
+
+
+def bench_http(client, excel_path, overrides, repeat):
+    """Endpoints de simulación a través de la app ASGI completa (middleware, pool, serialización)."""
+    environment.use_master(excel_path)
+    results = {}
+
+    def get(url, **kwargs):
+        response = client.get(url, **kwargs)
+        response.raise_for_status()
+
+    def post(url, body):
+        response = client.post(url, json=body)
+        response.raise_for_status()
+
+    results['http_base_cold'] = measure(lambda: get("/api/simulate/base"), repeat, setup=sc._result_cache.clear)
+    results['http_base_cached'] = measure(lambda: get("/api/simulate/base"), repeat)
+    results['http_base_arrow_cached'] = measure(lambda: get("/api/simulate/base?format=arrow"), repeat)
+    results['http_base_page'] = measure(lambda: get("/api/simulate/base?sort=-Saturacion&limit=100"), repeat)
+    preview = {"overrides": overrides}
+    results['http_preview_cold'] = measure(lambda: post("/api/simulate/preview", preview), repeat,
+                                           setup=sc._result_cache.clear)
+    results['http_preview_cached'] = measure(lambda: post("/api/simulate/preview", preview), repeat)
+    return results
+
+
+def run(sizes, centros, shared_articles, n_overrides, mix, repeat, seed, http=True, label=None):
+    entry = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "label": label,
+        **environment.machine_info(),
+        "results": [],
+    }
+    client = None
+    if http:
+        from fastapi.testclient import TestClient
+        from backend.api import server
+        client = TestClient(server.app)
+        client.__enter__()
+    try:
+        for rows in sizes:
+            excel_path = environment.ensure_master(rows, centros, shared_articles, seed)
+            overrides = generate_overrides(environment.master_frame(excel_path), n_overrides, mix, seed)
+            config = {"rows": rows, "centros": centros, "shared_articles": shared_articles,
+                      "overrides": n_overrides, "mix": mix, "seed": seed}
+            print(f"⏱️ Benchmark con {rows} filas, {centros} centros y {n_overrides} overrides...", flush=True)
+            cases = bench_core(excel_path, overrides, repeat)
+            if client is not None:
+                cases.update(bench_http(client, excel_path, overrides, repeat))
+            entry["results"].append({"key": config_key(config), "config": config, "cases": cases})
+            for name, stats in cases.items():
+                print(f"   {name:<24} mediana {stats['median'] * 1000:10.2f} ms  (mín {stats['min'] * 1000:.2f} ms)", flush=True)
+    finally:
+        if client is not None:
+            client.__exit__(None, None, None)
+    entry["peak_rss_mb"] = peak_rss_mb()
+    return entry
+
+
+def config_key(config):
+    mix = ",".join(f"{k}={v:g}" for k, v in sorted(config["mix"].items())) if config.get("mix") else "default"
+    return (f"rows={config['rows']} centros={config['centros']} shared={config['shared_articles']:g} "
+            f"overrides={config['overrides']} mix={mix} seed={config['seed']}")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux da kB; macOS, bytes
+    return round(peak / (1 << 20) if os.uname().sysname == 'Darwin' else peak / 1024, 1)
+
+
+def append_history(entry, path=DEFAULT_HISTORY):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del simulador con maestros sintéticos")
+    parser.add_argument('--rows', default="1000,10000,100000", help="Tamaños del maestro separados por comas")
+    parser.add_argument('--centros', type=int, default=40)
+    parser.add_argument('--shared-articles', type=float, default=0.0, help="Fracción de artículos repetidos en otro centro")
+    parser.add_argument('--overrides', type=int, default=50)
+    parser.add_argument('--mix', default=None, help="Mezcla de overrides, p. ej. oee=0.5,move=0.5")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-http', action='store_true', help="Solo las etapas del motor")
+    parser.add_argument('--label', default=None, help="Etiqueta de la ejecución en el histórico")
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.rows.split(',') if s.strip()]
+    entry = run(sizes, args.centros, args.shared_articles, args.overrides, parse_mix(args.mix),
+                args.repeat, args.seed, http=not args.no_http, label=args.label)
+    append_history(entry, args.history)
+    print(f"📊 Resultados añadidos a {args.history} (commit {entry['commit']}"
+          f"{', con cambios sin confirmar' if entry['dirty'] else ''}).", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Generador de maestros sintéticos con la forma de `MAESTRO FLEJE_v1.xlsx` (mismas columnas,
+tipos y distribuciones parecidas) para medir el simulador a escala de planta (miles de
+filas) y multiplanta (hasta 1M), sin depender del Excel real.
+
+    python -m benchmarks.synthetic_master --rows 100000 --centros 120 --out /tmp/bench/MAESTRO.xlsx
+
+Por defecto solo se escribe el almacén columnar (`<ruta>.arrow`), que es lo que carga el
+servidor; con --excel se escribe además el .xlsx (lento a partir de ~100k filas).
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.core import master_store
+
+# Columnas del Excel real, en su orden
+COLUMNS = [
+    'dias laborales 2026', 'Preparacion', 'Articulo', 'Centro', 'Volumen anual',
+    'Piezas por minuto', 'Piezas por hora', 'piezas por dia(16h)', 'piezas por dia(24h)',
+    'Piezas por dia con OEE-24H', 'Piezas por dia con OEE-16H',
+    'piezas por semana (5dias)-24H', 'piezas por semana (5dias)-16H', '%OEE',
+]
+
+# Tipos de override y su peso por defecto en la mezcla
+OVERRIDE_MIX = {
+    'oee': 0.3,
+    'ppm': 0.2,
+    'demanda': 0.3,
+    'move': 0.1,
+    'horas_turno': 0.05,
+    'ratio': 0.05,
+}
+
+_SUFFIXES = np.array(['', '', '', 'A', 'B', 'C', 'D', 'E', 'F'])
+
+
+def generate_master(rows, centros=40, shared_articles=0.0, seed=0) -> pd.DataFrame:
+    """
+    Maestro sintético de `rows` filas repartidas entre `centros` centros (tamaños desiguales,
+    como en planta: unos pocos centros concentran muchas referencias). Con `shared_articles`
+    > 0 esa fracción de filas repite un artículo de otra fila en otro centro (multiplanta).
+    Las distribuciones siguen al maestro real: ~1/4 de artículos sin demanda, cadencias de
+    0,05 a 400 piezas/minuto y OEE entre 0,17 y 0,92.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.sort(rng.choice(np.arange(100, 100 + max(centros * 8, 1000)), size=centros, replace=False))
+    weights = 1.0 / np.arange(1, centros + 1) ** 0.8
+    centro = rng.choice(codes, size=rows, p=weights / weights.sum())
+
+    numbers = (400000 + np.arange(rows)).astype(str)
+    articulo = np.char.add(numbers, rng.choice(_SUFFIXES, size=rows))
+    shared = rng.random(rows) < shared_articles
+    shared[0] = False
+    if shared.any():
+        # El artículo repetido va a otro centro distinto del de su fila de origen
+        source = rng.integers(0, rows, size=shared.sum())
+        articulo[shared] = articulo[source]
+        centro[shared] = codes[(np.searchsorted(codes, centro[source]) + rng.integers(1, max(centros, 2), size=shared.sum())) % centros]
+        keys = pd.Series(articulo).str.cat(pd.Series(centro).astype(str), sep='|')
+        dup = keys.duplicated().to_numpy()
+        articulo[dup] = np.char.add(articulo[dup], 'X')
+
+    volumen = np.round(rng.lognormal(np.log(100000), 1.6, rows), -2)
+    volumen[rng.random(rows) < 0.23] = 0
+    ppm = np.clip(rng.lognormal(np.log(45), 1.0, rows), 0.05, 400).round(3)
+    oee = np.clip(rng.beta(5, 2, rows), 0.17, 0.92).round(4)
+    por_hora = np.round(ppm * 60)
+    por_dia_24 = por_hora * 24
+    por_dia_16 = por_hora * 16
+
+    return pd.DataFrame({
+        'dias laborales 2026': np.full(rows, 238),
+        'Preparacion': np.zeros(rows, dtype=np.int64),
+        'Articulo': articulo,
+        'Centro': centro,
+        'Volumen anual': volumen.astype(np.int64),
+        'Piezas por minuto': ppm,
+        'Piezas por hora': por_hora.astype(np.int64),
+        'piezas por dia(16h)': por_dia_16.astype(np.int64),
+        'piezas por dia(24h)': por_dia_24.astype(np.int64),
+        'Piezas por dia con OEE-24H': por_dia_24 * oee,
+        'Piezas por dia con OEE-16H': por_dia_16 * oee,
+        'piezas por semana (5dias)-24H': (por_dia_24 * 5).astype(np.int64),
+        'piezas por semana (5dias)-16H': (por_dia_16 * 5).astype(np.int64),
+        '%OEE': oee,
+    }, columns=COLUMNS)
+
+
+def generate_overrides(master: pd.DataFrame, count, mix=None, seed=0):
+    """
+    Lista de `count` overrides (dicts con la forma de OverrideBase) sobre filas al azar del
+    maestro. `mix` da el peso de cada tipo (ver OVERRIDE_MIX); 'move' cambia de centro.
+    """
+    mix = mix or OVERRIDE_MIX
+    rng = np.random.default_rng(seed)
+    kinds = list(mix)
+    weights = np.array([mix[k] for k in kinds], dtype=float)
+    picks = rng.choice(kinds, size=count, p=weights / weights.sum())
+    rows = rng.choice(len(master), size=count, replace=count > len(master))
+    centros = master['Centro'].astype(str).unique()
+
+    overrides = []
+    for kind, row in zip(picks, rows):
+        ov = {'articulo': str(master['Articulo'].iat[row]), 'centro': str(master['Centro'].iat[row])}
+        if kind == 'oee':
+            ov['oee_override'] = round(float(rng.uniform(0.4, 0.95)), 4)
+        elif kind == 'ppm':
+            ov['ppm_override'] = round(float(master['Piezas por minuto'].iat[row] * rng.uniform(0.7, 1.4)), 3)
+        elif kind == 'demanda':
+            ov['demanda_override'] = float(round(master['Volumen anual'].iat[row] * rng.uniform(0.5, 2.0) + 1000, -2))
+        elif kind == 'move':
+            ov['new_centro'] = str(rng.choice(centros))
+        elif kind == 'horas_turno':
+            ov['horas_turno_override'] = int(rng.choice([8, 16, 24]))
+        elif kind == 'ratio':
+            ov['personnel_ratio_override'] = round(float(rng.uniform(0.5, 2.0)), 2)
+        overrides.append(ov)
+    return overrides
+
+
+def parse_mix(text):
+    """'oee=0.5,move=0.5' -> {'oee': 0.5, 'move': 0.5}"""
+    if not text:
+        return None
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in OVERRIDE_MIX:
+            raise ValueError(f"Tipo de override desconocido: {name!r} (válidos: {', '.join(OVERRIDE_MIX)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def write_master(df: pd.DataFrame, excel_path, excel=False):
+    """
+    Escribe el almacén columnar del maestro sintético junto a `excel_path` (y el .xlsx si
+    `excel`). Sin Excel, el servidor usa el almacén tal cual: basta con apuntar
+    RPK_MASTER_PATH (o simulation_core.EXCEL_PATH) a `excel_path`.
+    Retorna la ruta del almacén.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(excel_path)), exist_ok=True)
+    store_path = master_store.store_path_for(excel_path)
+    if excel:
+        df.to_excel(excel_path, index=False)
+        checksum = master_store.file_checksum(excel_path)
+    else:
+        if os.path.exists(excel_path):
+            os.remove(excel_path)
+        # Sin Excel no hay checksum del fichero: la versión sale del contenido generado
+        checksum = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+    # Limpieza igual que al leer el Excel real
+    df = df.assign(Articulo=df['Articulo'].astype(str), Centro=df['Centro'].astype(str))
+    df['centro_original'] = df['Centro']
+    return master_store.write_store(df, store_path, checksum)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un maestro sintético con la forma de MAESTRO FLEJE")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--centros', type=int, default=40)
+    parser.add_argument('--shared-articles', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True, help="Ruta del .xlsx (el almacén queda en <ruta>.arrow)")
+    parser.add_argument('--excel', action='store_true', help="Escribir también el .xlsx")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = generate_master(args.rows, args.centros, args.shared_articles, args.seed)
+    path = write_master(df, args.out, excel=args.excel)
+    print(f"🧪 Maestro sintético de {len(df)} filas y {df['Centro'].nunique()} centros en {path} "
+          f"({time.perf_counter() - start:.2f} segundos).", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Configuración común de las pruebas (pytest): maestros sintéticos y base de datos en un
+directorio temporal, sin calentamiento ni vigilante del Excel (ver benchmarks/environment.py).
+
+    python -m pytest -q
+"""
+import os
+import tempfile
+import types
+
+# Antes de importar backend: las rutas del maestro y de la base de datos se leen al importar
+os.environ.setdefault("RPK_BENCH_DIR", os.path.join(tempfile.gettempdir(), "rpk_tests"))
+
+import pytest  # noqa: E402
+
+from benchmarks import environment  # noqa: E402
+from benchmarks.environment import simulation_core as sc  # noqa: E402
+
+# La V1 clásica tiene su propio backend y sus scripts de prueba manuales
+collect_ignore = ["v1_classic"]
+
+
+@pytest.fixture
+def master():
+    """Maestro sintético pequeño, con artículos repetidos en varios centros, recién cargado."""
+    return environment.use_master(environment.ensure_master(2000, centros=12, shared_articles=0.2, seed=7))
+
+
+@pytest.fixture
+def override():
+    """Crea overrides con los atributos de OverrideBase: override(articulo, centro, oee_override=0.5)."""
+    def make(articulo, centro, **fields):
+        return types.SimpleNamespace(**{**dict.fromkeys(sc.OVERRIDE_COLUMNS), 'new_centro': None,
+                                        'articulo': articulo, 'centro': centro, **fields})
+    return make
+
+
+@pytest.fixture
+def client(master):
+    """Cliente de la app completa (middleware, pool de cálculo) sobre el maestro sintético."""
+    from fastapi.testclient import TestClient
+    from backend.api import server
+    with TestClient(server.app) as test_client:
+        yield test_client
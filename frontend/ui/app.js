@@ -11,6 +11,23 @@ let updateTimeout;
 let isComparisonMode = false;
 let comparisonData = null;
 let comparisonViewMode = 'absolute'; // 'absolute' or 'delta'
+let previewSessionId = newPreviewSessionId();
+let previewToken = null;   // resultado de preview que tiene el cliente (meta.preview_token)
+let previewRequestSeq = 0; // solo se aplica la respuesta de la última petición
+
+// Columnas del detalle que usa el dashboard: el servidor solo envía estas.
+// El filtro por centros, la búsqueda y el top 100 de la tabla siguen en el navegador: la lista
+// de centros, el % de impacto, los valores originales de los overrides y la preview incremental
+// (que parchea filas por posición) necesitan el detalle completo. El servidor ya acepta
+// centros/sort/limit/offset para cuando la tabla pase a paginarse allí.
+const DETAIL_COLUMNS = ['Articulo', 'Centro', 'Volumen anual', 'Piezas por minuto', '%OEE', 'Saturacion', 'Ratio_MOD', 'horas_turno', 'Setup (h)'];
+const DETAIL_QUERY = `columns=${encodeURIComponent(DETAIL_COLUMNS.join(','))}`;
+
+// Sesión de preview incremental: el servidor recuerda el último resultado enviado
+// y responde solo con las filas y centros que cambian respecto al que indica base_token.
+function newPreviewSessionId() {
+    return `pv-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+}
 
 function debounce(func, wait) {
     return function (...args) {
@@ -68,11 +85,15 @@ async function loadSimulation(scenarioId) {
     }
 
     const url = scenarioId === 'base'
-        ? `${API_BASE}/simulate/base?dias_laborales=${days}&horas_turno=${shifts}`
-        : `${API_BASE}/simulate/${scenarioId}?dias_laborales=${days}&horas_turno=${shifts}`;
+        ? `${API_BASE}/simulate/base?dias_laborales=${days}&horas_turno=${shifts}&${DETAIL_QUERY}`
+        : `${API_BASE}/simulate/${scenarioId}?dias_laborales=${days}&horas_turno=${shifts}&${DETAIL_QUERY}`;
 
     document.getElementById('current-scenario-name').innerText = 'Cargando datos...';
     setLoading(true);
+    // El servidor ya no tiene el mismo resultado que el cliente: la próxima preview será completa
+    previewSessionId = newPreviewSessionId();
+    previewToken = null;
+    previewRequestSeq++;
 
     try {
         const response = await fetch(url);
@@ -461,27 +482,59 @@ function setupEventListeners() {
 async function updatePreviewSimulation() {
     const days = document.getElementById('work-days').value || 238;
     const shifts = document.getElementById('work-shifts').value || 16;
+    const seq = ++previewRequestSeq;
     setLoading(true);
     try {
-        const res = await fetch(`${API_BASE}/simulate/preview`, {
+        const res = await fetch(`${API_BASE}/simulate/preview?${DETAIL_QUERY}`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 overrides: localOverrides,
                 dias_laborales: parseInt(days),
                 horas_turno: parseInt(shifts),
-                center_configs: centerConfigs
+                center_configs: centerConfigs,
+                session_id: previewSessionId,
+                base_token: previewToken
             })
         });
-        currentData = await res.json();
+        if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+        const data = await res.json();
+        // Respuesta de una petición ya superada: se descarta (la sesión lo detecta por el token)
+        if (seq !== previewRequestSeq) return;
+        if (data.meta && data.meta.incremental && currentData) {
+            mergeIncrementalPreview(data);
+        } else {
+            currentData = data;
+        }
+        previewToken = data.meta ? data.meta.preview_token : null;
         renderLocalOverrides();
         updateUI();
-    } catch (e) { console.error(e); }
+    } catch (e) {
+        console.error(e);
+        if (seq === previewRequestSeq) {
+            previewSessionId = newPreviewSessionId();
+            previewToken = null;
+        }
+    }
     finally {
-        setLoading(false);
+        if (seq === previewRequestSeq) setLoading(false);
     }
 }
 
+function mergeIncrementalPreview(data) {
+    const detail = [...currentData.detail];
+    data.meta.detail_positions.forEach((pos, i) => { detail[pos] = data.detail[i]; });
+
+    const removed = new Set(data.meta.removed_centros.map(String));
+    const changed = new Map(data.summary.map(s => [String(s.Centro), s]));
+    const summary = currentData.summary
+        .filter(s => !removed.has(String(s.Centro)) && !changed.has(String(s.Centro)))
+        .concat(data.summary)
+        .sort((a, b) => String(a.Centro) < String(b.Centro) ? -1 : (String(a.Centro) > String(b.Centro) ? 1 : 0));
+
+    currentData = { detail, summary, meta: data.meta };
+}
+
 function openEditModal(articulo, centro) {
     const d = currentData.detail.find(item => item.Articulo == articulo && item.Centro == centro);
     if (!d) return;
@@ -540,13 +593,13 @@ async function runCompare() {
     const scA = document.getElementById('compare-a').value;
     const scB = document.getElementById('compare-b').value;
     try {
-        const resA = await fetch(`${API_BASE}/simulate/${scA === 'base' ? 'base' : scA}`);
-        const resB = await fetch(`${API_BASE}/simulate/${scB === 'base' ? 'base' : scB}`);
+        // Una sola petición: el servidor calcula ambos escenarios y devuelve solo las diferencias
+        const res = await fetch(`${API_BASE}/compare?a=${encodeURIComponent(scA)}&b=${encodeURIComponent(scB)}`);
+        if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
         comparisonData = {
             nameA: scA === 'base' ? 'Base' : scenarios.find(s => s.id == scA).name,
             nameB: scB === 'base' ? 'Base' : scenarios.find(s => s.id == scB).name,
-            dataA: await resA.json(),
-            dataB: await resB.json()
+            data: await res.json()
         };
         isComparisonMode = true;
         document.getElementById('compare-modal').style.display = 'none';
@@ -571,23 +624,27 @@ function renderComparisonDashboard() {
     const ctx = document.getElementById('saturationChart').getContext('2d');
     if (chartInstance) chartInstance.destroy();
 
-    const summaryA = comparisonData.dataA.summary;
-    const summaryB = comparisonData.dataB.summary;
-    const labels = summaryA.map(s => s.Centro);
+    // Totales por centro de A y diferencias de B respecto a A
+    const data = comparisonData.data;
+    const ref = data.reference;
+    const delta = data.deltas.b;
+    const visible = data.centros
+        .map((centro, i) => ({ centro, i }))
+        .filter(({ i }) => ref.num_articulos[i] > 0 || ref.num_articulos[i] + delta.num_articulos[i] > 0);
 
     chartInstance = new Chart(ctx, {
         type: 'bar',
         data: {
-            labels: labels,
+            labels: visible.map(c => c.centro),
             datasets: [
                 {
                     label: comparisonData.nameA,
-                    data: summaryA.map(s => (s.Saturacion * 100).toFixed(1)),
+                    data: visible.map(({ i }) => (ref.saturacion[i] * 100).toFixed(1)),
                     backgroundColor: '#666'
                 },
                 {
                     label: comparisonData.nameB,
-                    data: summaryB.map(s => (s.Saturacion * 100).toFixed(1)),
+                    data: visible.map(({ i }) => ((ref.saturacion[i] + delta.saturacion[i]) * 100).toFixed(1)),
                     backgroundColor: '#E30613'
                 }
             ]
@@ -607,25 +664,31 @@ function renderComparisonTable() {
     const body = document.getElementById('table-body');
     if (!body) return;
 
-    const detailA = comparisonData.dataA.detail;
-    const detailB = comparisonData.dataB.detail;
+    // Solo los artículos que cambian de centro o de horas entre A y B
+    const changed = comparisonData.data.articles.b;
+    if (!changed.length) {
+        body.innerHTML = '<tr><td colspan="9" class="text-center">Sin diferencias por artículo entre los escenarios</td></tr>';
+        return;
+    }
 
-    body.innerHTML = detailB.slice(0, 100).map(dB => {
-        const dA = detailA.find(item => item.Articulo == dB.Articulo && item.Centro == dB.Centro) || {};
-        const sat = (dB.Saturacion * 100).toFixed(1);
+    body.innerHTML = changed.slice(0, 100).map(a => {
+        const sat = (a.Saturacion_b * 100).toFixed(1);
         const satClass = sat > 85 ? 'pill-high' : (sat > 70 ? 'pill-mid' : 'pill-low');
+        const centro = a.Centro_a == a.Centro_b ? a.Centro_b : `${a.Centro_a} → ${a.Centro_b}`;
+        const deltaHoras = a.Delta_Horas || 0;
 
         return `
             <tr>
-                <td><strong>${dB.Articulo}</strong></td>
-                <td class="text-center">${dB.Centro}</td>
-                <td class="text-right">${dB['Volumen anual'].toLocaleString()}</td>
-                <td class="text-right">${Math.round(dB['Piezas por minuto'])}</td>
-                <td class="text-right">${((dB['%OEE'] || 0) * 100).toFixed(1)}%</td>
+                <td><strong>${a.Articulo}</strong></td>
+                <td class="text-center">${centro}</td>
+                <td class="text-right">${(a['Volumen anual'] || 0).toLocaleString()}</td>
+                <td class="text-right">${Math.round(a['Piezas por minuto'] || 0)}</td>
+                <td class="text-right">${((a['%OEE'] || 0) * 100).toFixed(1)}%</td>
                 <td class="text-center">
                     <span class="saturation-pill ${satClass}">${sat}%</span>
                 </td>
-                <td class="text-right">${(dB.Ratio_MOD || 1.0).toFixed(1)}</td>
+                <td class="text-right">${(a.Ratio_MOD || 1.0).toFixed(1)}</td>
+                <td class="text-right">${deltaHoras >= 0 ? '+' : ''}${deltaHoras.toFixed(1)} h</td>
                 <td class="text-center">--</td>
             </tr>
         `;
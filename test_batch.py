@@ -0,0 +1,126 @@
+"""
+Pruebas del lote de escenarios y de la rejilla de sensibilidad (batch.py): cada celda debe
+coincidir con el resumen de simulate() para ese escenario.
+
+    python -m pytest -q test_batch.py
+"""
+import types
+
+import numpy as np
+import pytest
+
+from backend.core import batch, projection
+from benchmarks.environment import simulation_core as sc
+
+
+def summary_of(**params):
+    result, _ = sc.simulate(None, **params)
+    return result.summary.set_index('Centro'), result.detail
+
+
+@pytest.fixture
+def overrides(master, override):
+    """Una edición con turno forzado, un traslado a otro centro, un traslado a un centro nuevo y una edición tras un traslado."""
+    rows = [0, 5, 9, 13]
+    a = [master.articulo[p] for p in rows]
+    c = [str(master.centro[p]) for p in rows]
+    target = next(x for x in master.centros if str(x) != c[1])
+    return [
+        override(a[0], c[0], ppm_override=3.0, horas_turno_override=8),
+        override(a[1], c[1], oee_override=0.5, new_centro=str(target)),
+        override(a[2], c[2], new_centro="NUEVO"),
+        override(a[3], c[3], new_centro=str(target)),
+        override(a[3], str(target), demanda_override=1000.0),
+    ]
+
+
+def test_batch_matches_simulate(master, overrides):
+    centro = str(master.centros[2])
+    specs = [
+        types.SimpleNamespace(name="base"),
+        types.SimpleNamespace(dias_laborales=200, horas_turno=24),
+        types.SimpleNamespace(overrides=overrides, center_configs={centro: {'shifts': 24}}),
+        types.SimpleNamespace(overrides=overrides[1:], horas_turno=8, dias_laborales=250),
+    ]
+    out = batch.simulate_batch(specs)
+    assert out['saturacion'].shape == (len(specs), len(out['centros']))
+    assert "NUEVO" in out['centros']
+    assert not np.allclose(out['saturacion'][0], out['saturacion'][2])
+    assert [s['name'] for s in out['scenarios']] == ["base", "escenario_2", "escenario_3", "escenario_4"]
+
+    for i, spec in enumerate(specs):
+        summary, detail = summary_of(
+            dias_laborales=getattr(spec, 'dias_laborales', None), overrides_list=getattr(spec, 'overrides', None),
+            horas_turno=getattr(spec, 'horas_turno', None), center_configs=getattr(spec, 'center_configs', None),
+        )
+        for j, c in enumerate(out['centros']):
+            if c not in summary.index:
+                assert out['num_articulos'][i, j] == 0
+                continue
+            assert out['saturacion'][i, j] == pytest.approx(summary.loc[c, 'Saturacion'], rel=1e-9, abs=1e-12)
+            assert out['num_articulos'][i, j] == summary.loc[c, 'Num_Articulos']
+            hours = detail.loc[detail['Centro'] == c, 'Horas_Totales'].sum()
+            assert out['horas_totales'][i, j] == pytest.approx(hours, rel=1e-9, abs=1e-9)
+
+
+def test_batch_blocks_do_not_change_the_result(master, overrides, monkeypatch):
+    specs = [types.SimpleNamespace(overrides=overrides[:k], dias_laborales=200 + k) for k in range(len(overrides) + 1)]
+    whole = batch.simulate_batch(specs)
+    monkeypatch.setattr(batch, 'MAX_BLOCK_CELLS', master.n_rows * 2)
+    blocked = batch.simulate_batch(specs)
+    assert np.allclose(whole['saturacion'], blocked['saturacion'])
+    assert (whole['num_articulos'] == blocked['num_articulos']).all()
+
+
+def test_batch_limit(master, monkeypatch):
+    monkeypatch.setattr(batch, 'MAX_SCENARIOS', 2)
+    with pytest.raises(batch.BatchTooLarge):
+        batch.simulate_batch([types.SimpleNamespace()] * 3)
+
+
+def test_sweep_matches_simulate(master, overrides):
+    configured = str(master.centros[1])
+    center_configs = {configured: {'shifts': 24}}
+    moved_to = str(overrides[1].new_centro)
+    options = {moved_to: [8, 24], str(master.centros[0]): [16], configured: [8]}
+    grid = batch.simulate_sweep(
+        dias_laborales={"start": 200, "stop": 240, "step": 20}, horas_turno=[8, 24],
+        center_shift_options=options, overrides_list=overrides, center_configs=center_configs,
+    )
+    assert grid['dias_laborales'] == [200, 220, 240] and grid['horas_turno'] == [8, 24]
+    assert grid['saturacion'].shape == (3, 2, len(grid['centros']))
+    assert set(grid['center_shifts']) == set(options)
+
+    for i, d in enumerate(grid['dias_laborales']):
+        for j, h in enumerate(grid['horas_turno']):
+            summary, _ = summary_of(dias_laborales=d, overrides_list=overrides, horas_turno=h,
+                                    center_configs=center_configs)
+            for c, value in summary['Saturacion'].items():
+                assert grid['saturacion'][i, j, grid['centros'].index(c)] == pytest.approx(value, rel=1e-9, abs=1e-12)
+
+            # Cada opción de turno de un centro equivale a configurar ese centro con ella
+            for centro, info in grid['center_shifts'].items():
+                for k, option in enumerate(info['options']):
+                    summary, _ = summary_of(dias_laborales=d, overrides_list=overrides, horas_turno=h,
+                                            center_configs={**center_configs, centro: {'shifts': option}})
+                    expected = summary.loc[centro, 'Saturacion']
+                    assert info['saturacion'][i, j, k] == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+def test_sweep_default_axes_use_the_excel_days(master, overrides):
+    grid = batch.simulate_sweep(overrides_list=overrides)
+    assert grid['dias_laborales'] == [None] and grid['horas_turno'] == [16]
+    summary, _ = summary_of(overrides_list=overrides)
+    for c, value in summary['Saturacion'].items():
+        assert grid['saturacion'][0, 0, grid['centros'].index(c)] == pytest.approx(value, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize("params, error", [
+    ({"horas_turno": [0]}, projection.InvalidQuery),
+    ({"dias_laborales": [-1]}, projection.InvalidQuery),
+    ({"center_shift_options": {"504": [0]}}, projection.InvalidQuery),
+    ({"dias_laborales": {"start": 1, "stop": 100000}, "horas_turno": {"start": 1, "stop": 100}}, batch.BatchTooLarge),
+])
+def test_sweep_rejects_invalid_grids(master, params, error):
+    with pytest.raises(error):
+        batch.simulate_sweep(**params)
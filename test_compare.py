@@ -0,0 +1,104 @@
+"""
+Pruebas de la comparativa de escenarios (compare.py): totales y diferencias por centro iguales
+a las de simular cada escenario entero.
+
+    python -m pytest -q test_compare.py
+"""
+import types
+import uuid
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.core import compare
+from benchmarks.environment import simulation_core as sc
+
+
+def centro_totals(spec, centros):
+    result, _ = sc.simulate(None, dias_laborales=spec.dias_laborales, overrides_list=spec.overrides,
+                            horas_turno=spec.horas_turno, center_configs=spec.center_configs)
+    detail = result.detail
+    totals = detail.groupby(detail['Centro'].astype(str)).agg(
+        saturacion=('Saturacion', 'sum'), horas_totales=('Horas_Totales', 'sum'),
+        horas_hombre=('Horas_Hombre', 'sum'), num_articulos=('Articulo', 'size'),
+    )
+    return totals.reindex(centros).fillna(0), detail
+
+
+@pytest.fixture
+def specs(master, override):
+    """Base, y escenarios con traslados (también a un centro nuevo), turnos propios y otros días y turno global."""
+    a = [master.articulo[p] for p in (0, 4, 8)]
+    c = [str(master.centro[p]) for p in (0, 4, 8)]
+    other = next(str(x) for x in master.centros if str(x) != c[0])
+
+    def spec(overrides=(), dias_laborales=None, horas_turno=16, center_configs=None):
+        return types.SimpleNamespace(overrides=list(overrides), dias_laborales=dias_laborales,
+                                     horas_turno=horas_turno, center_configs=center_configs or {})
+    return {
+        "base": spec(),
+        "moves": spec([
+            override(a[0], c[0], new_centro=other),
+            override(a[1], c[1], oee_override=0.9, demanda_override=1e5),
+            override(a[2], c[2], ppm_override=10.0, horas_turno_override=24, personnel_ratio_override=2.0),
+        ]),
+        "shifts": spec([override(a[0], c[0], demanda_override=5.0), override(a[1], c[1], new_centro="NUEVO")],
+                       center_configs={c[0]: {'shifts': 24}}),
+        "days": spec([override(a[2], c[2], oee_override=0.5)], dias_laborales=200, horas_turno=8),
+    }
+
+
+@pytest.mark.parametrize("names", [
+    ("base", "moves"),
+    ("moves", "shifts"),
+    ("shifts", "days"),
+    ("base", "moves", "shifts", "days"),
+    ("days", "base"),
+])
+def test_deltas_match_individual_simulations(specs, names):
+    out = compare.compare_scenarios([specs[n] for n in names], keys=list(names))
+    centros = out['centros']
+    reference, ref_detail = centro_totals(specs[names[0]], centros)
+
+    got = pd.DataFrame(out['reference'], index=centros)
+    np.testing.assert_allclose(got.to_numpy(float), reference[got.columns].to_numpy(float), rtol=1e-9, atol=1e-9)
+
+    for name in names[1:]:
+        totals, detail = centro_totals(specs[name], centros)
+        delta = pd.DataFrame(out['deltas'][name], index=centros)
+        expected = totals[delta.columns] - reference[delta.columns]
+        np.testing.assert_allclose(delta.to_numpy(float), expected.to_numpy(float), rtol=1e-9, atol=1e-9)
+
+        # Artículos con otro centro u otras horas entre la referencia y este escenario
+        merged = ref_detail.merge(detail, on=['Articulo', 'centro_original'], suffixes=('_a', '_b'))
+        changed = merged[(merged['Centro_a'].astype(str) != merged['Centro_b'].astype(str))
+                         | ~np.isclose(merged['Horas_Totales_a'], merged['Horas_Totales_b'])]
+        got_articles = {(row['Articulo'], row['centro_original']) for row in out['articles'][name]}
+        assert got_articles == set(zip(changed['Articulo'], changed['centro_original']))
+        assert out['meta']['changed_articles'][name] == len(changed)
+
+    assert out['meta']['base_passes'] == len({(specs[n].dias_laborales, specs[n].horas_turno) for n in names})
+
+
+def test_identical_scenarios_have_no_deltas(specs):
+    out = compare.compare_scenarios([specs["moves"], specs["moves"]], keys=["a", "b"])
+    for values in out['deltas']['b'].values():
+        assert not np.any(values)
+    assert out['articles']['b'] == []
+
+
+def test_compare_endpoint(client, master):
+    # Los nombres de escenario son únicos y la base de datos de pruebas se conserva entre ejecuciones
+    body = {"name": f"comparativa-{uuid.uuid4().hex[:8]}", "dias_laborales": 238, "horas_turno_global": 16, "center_configs": {},
+            "overrides": [{"articulo": str(master.articulo[0]), "centro": str(master.centro[0]), "oee_override": 0.5}]}
+    scenario_id = client.post("/api/scenarios", json=body).json()["id"]
+
+    response = client.get(f"/api/compare?a=base&b={scenario_id}")
+    assert response.status_code == 200
+    out = response.json()
+    assert out['meta']['reference'] == "a" and list(out['deltas']) == ["b"]
+    assert out['articles']['b'][0]['Articulo'] == str(master.articulo[0])
+
+    assert client.get("/api/compare?a=base").status_code == 400
+    assert client.get("/api/compare?a=base&b=999999").status_code == 404
@@ -0,0 +1,127 @@
+"""
+Pruebas del pool acotado de cálculo (compute_pool.py): límite de huecos, 503 y cancelaciones.
+
+    python -m pytest -q test_compute_pool.py
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.api.compute_pool import ComputePool, ComputePoolFull
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "la condición no se cumple a tiempo"
+        time.sleep(0.005)
+
+
+async def async_wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "la condición no se cumple a tiempo"
+        await asyncio.sleep(0.005)
+
+
+def test_rejects_above_workers_plus_queue():
+    pool = ComputePool(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        busy = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await async_wait_until(lambda: pool.stats()["running"] == 1)
+        with pytest.raises(ComputePoolFull):
+            await pool.run(lambda: None)
+        release.set()
+        await asyncio.gather(*busy)
+        return await pool.run(lambda: 42)
+
+    try:
+        assert asyncio.run(scenario()) == 42
+        stats = pool.stats()
+        assert (stats["rejected"], stats["completed"], stats["running"], stats["queued"]) == (1, 3, 0, 0)
+        assert pool.in_flight == 0
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_cancelled_request_keeps_its_slot_until_the_work_ends():
+    pool = ComputePool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait))
+        await async_wait_until(lambda: pool.stats()["running"] == 1)
+        queued = asyncio.ensure_future(pool.run(lambda: ran.append(True)))
+        await asyncio.sleep(0.01)
+
+        # El cliente que espera en cola se va: su cálculo se descarta y el hueco se libera
+        queued.cancel()
+        await asyncio.sleep(0.01)
+        assert pool.in_flight == 1
+
+        # El que ya calcula se va: el hilo sigue ocupado y el hueco también
+        running.cancel()
+        await asyncio.sleep(0.01)
+        assert pool.in_flight == 1 and pool.stats()["running"] == 1
+        # Queda un único hueco libre (el de la cola), no dos
+        waiting = asyncio.ensure_future(pool.run(lambda: 7))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ComputePoolFull):
+            await pool.run(lambda: None)
+
+        release.set()
+        assert await waiting == 7
+        await async_wait_until(lambda: pool.in_flight == 0)
+        return await pool.run(lambda: 42)
+
+    try:
+        assert asyncio.run(scenario()) == 42
+        assert ran == []
+        assert pool.in_flight == 0 and pool.stats()["queued"] == 0
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_failed_work_releases_its_slot():
+    pool = ComputePool(max_workers=1, max_queue=0)
+
+    def fail():
+        raise RuntimeError("fallo")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await pool.run(fail)
+        return await pool.run(lambda: 1)
+
+    try:
+        assert asyncio.run(scenario()) == 1
+        assert pool.stats()["failed"] == 1 and pool.in_flight == 0
+    finally:
+        pool.shutdown()
+
+
+def test_saturated_pool_returns_503(client, monkeypatch):
+    from backend.api import server
+    pool = ComputePool(max_workers=1, max_queue=0)
+    monkeypatch.setattr(server, "compute_pool", pool)
+    release = threading.Event()
+    holder = threading.Thread(target=lambda: asyncio.run(pool.run(release.wait)))
+    holder.start()
+    try:
+        wait_until(lambda: pool.stats()["running"] == 1)
+        response = client.get("/api/simulate/base")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert client.get("/api/compute/stats").json()["rejected"] == 1
+    finally:
+        release.set()
+        holder.join()
+    assert client.get("/api/simulate/base").status_code == 200
+    pool.shutdown()
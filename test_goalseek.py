@@ -0,0 +1,119 @@
+"""
+Pruebas de la búsqueda de turnos (goalseek.py): el plan reproduce simulate(), cada turno es
+el mínimo que cumple el objetivo y los objetivos imposibles se señalan.
+
+    python -m pytest -q test_goalseek.py
+"""
+import types
+
+import pytest
+
+from backend.core import goalseek, projection
+from benchmarks.environment import simulation_core as sc
+
+DIAS = 220
+
+
+@pytest.fixture
+def spec(master, override):
+    """Un traslado entre centros, un turno forzado por override y un centro configurado a 8 h."""
+    other = next(c for c in master.centros if c != master.centro[0])
+    overrides = [
+        override(master.articulo[0], str(master.centro[0]), new_centro=str(other)),
+        override(master.articulo[3], str(master.centro[3]), ppm_override=10.0, horas_turno_override=24),
+    ]
+    return types.SimpleNamespace(overrides=overrides, dias_laborales=DIAS,
+                                 center_configs={str(master.centros[4]): {'shifts': 8}})
+
+
+def saturation(spec, center_configs):
+    result, _ = sc.simulate(None, dias_laborales=DIAS, overrides_list=spec.overrides, horas_turno=16,
+                            center_configs=center_configs)
+    return result.summary.set_index('Centro')['Saturacion']
+
+
+def target_for(spec, fraction):
+    """Objetivo relativo a la carga del escenario (las saturaciones del maestro sintético son altas)."""
+    return float(saturation(spec, spec.center_configs).max() * fraction)
+
+
+def assert_plan_matches_simulate(spec, plan):
+    simulated = saturation(spec, plan['center_configs'])
+    rows = {row['Centro']: row for row in plan['summary']}
+    for centro, value in simulated.items():
+        assert rows[centro]['Saturacion'] == pytest.approx(value, rel=1e-9, abs=1e-12)
+    current = saturation(spec, spec.center_configs)
+    for centro, value in current.items():
+        assert rows[centro]['Saturacion_actual'] == pytest.approx(value, rel=1e-9, abs=1e-12)
+    return rows
+
+
+def test_shifts_mode_matches_simulate_and_is_minimal(spec):
+    target = target_for(spec, 0.5)
+    plan = goalseek.goal_seek_shifts(spec, target=target, mode='shifts')
+    rows = assert_plan_matches_simulate(spec, plan)
+    assert {row['horas_turno'] for row in rows.values() if row['horas_turno'] is not None} > {24}
+
+    for centro, row in rows.items():
+        if row['horas_turno'] is None or centro in plan['meta']['centros_sin_solucion']:
+            continue
+        assert row['cumple'] and row['Saturacion'] <= target * (1 + 1e-9)
+        lower = [h for h in goalseek.SHIFT_OPTIONS if h < row['horas_turno']]
+        if lower:
+            # Con la opción anterior este centro ya no llega
+            configs = {**plan['center_configs'], centro: {'shifts': lower[-1]}}
+            assert saturation(spec, configs)[centro] > target
+
+
+def test_hours_mode_matches_simulate_and_is_minimal(spec):
+    target = target_for(spec, 0.6)
+    plan = goalseek.goal_seek_shifts(spec, target=target, mode='hours', hours_step=2, max_hours=24)
+    rows = assert_plan_matches_simulate(spec, plan)
+
+    solved = 0
+    for centro, row in rows.items():
+        if row['horas_turno'] is None or centro in plan['meta']['centros_sin_solucion']:
+            continue
+        assert row['horas_turno'] % 2 == 0 and 2 <= row['horas_turno'] <= 24
+        assert row['cumple'] and row['Saturacion'] <= target * (1 + 1e-9)
+        if row['horas_turno'] > 2:
+            configs = {**plan['center_configs'], centro: {'shifts': row['horas_turno'] - 2}}
+            assert saturation(spec, configs)[centro] > target
+            solved += 1
+    assert solved
+
+
+def test_unreachable_target_is_reported(spec):
+    target = target_for(spec, 0.05)
+    plan = goalseek.goal_seek_shifts(spec, target=target, mode='shifts')
+    rows = assert_plan_matches_simulate(spec, plan)
+
+    unreachable = plan['meta']['centros_sin_solucion']
+    assert unreachable
+    for centro in unreachable:
+        # Se queda con la opción mayor y no cumple
+        assert rows[centro]['horas_turno'] == max(goalseek.SHIFT_OPTIONS)
+        assert not rows[centro]['cumple'] and rows[centro]['Saturacion'] > target
+    assert all(row['cumple'] for centro, row in rows.items() if centro not in unreachable)
+
+
+def test_only_the_requested_centros_change(master, spec):
+    centro = str(saturation(spec, spec.center_configs).idxmax())
+    plan = goalseek.goal_seek_shifts(spec, target=target_for(spec, 0.8), centros=[centro])
+    rows = assert_plan_matches_simulate(spec, plan)
+    for name, row in rows.items():
+        if name != centro and row['horas_turno'] is not None:
+            assert row['horas_turno'] == row['horas_turno_actual']
+    assert rows[centro]['horas_turno'] != rows[centro]['horas_turno_actual']
+
+
+@pytest.mark.parametrize("params", [
+    {"target": 0},
+    {"mode": "x"},
+    {"shift_options": [0, 8]},
+    {"mode": "hours", "hours_step": 0},
+    {"mode": "hours", "hours_step": 8, "max_hours": 4},
+])
+def test_invalid_parameters(spec, params):
+    with pytest.raises(projection.InvalidQuery):
+        goalseek.goal_seek_shifts(spec, **params)
@@ -0,0 +1,81 @@
+"""
+Pruebas de la simulación Monte Carlo (montecarlo.py): semilla, distribución 'none' frente a
+simulate() y factores de la normal.
+
+    python -m pytest -q test_montecarlo.py
+"""
+import types
+
+import numpy as np
+import pytest
+
+from backend.core import batch, montecarlo, projection
+from benchmarks.environment import simulation_core as sc
+
+
+@pytest.fixture
+def spec(master, override):
+    overrides = [
+        override(master.articulo[0], str(master.centro[0]), oee_override=0.55, new_centro="NUEVO"),
+        override(master.articulo[7], str(master.centro[7]), demanda_override=2e5, horas_turno_override=24),
+    ]
+    return types.SimpleNamespace(overrides=overrides, dias_laborales=220, horas_turno=16,
+                                 center_configs={str(master.centros[3]): {'shifts': 8}})
+
+
+UNCERTAINTY = dict(oee={'dist': 'normal', 'sd': 0.1}, demanda={'dist': 'lognormal', 'sigma': 0.2, 'shared': True})
+
+
+def test_same_seed_same_result(spec):
+    a = montecarlo.simulate_monte_carlo(spec, samples=300, seed=42, **UNCERTAINTY)
+    b = montecarlo.simulate_monte_carlo(spec, samples=300, seed=42, **UNCERTAINTY)
+    c = montecarlo.simulate_monte_carlo(spec, samples=300, seed=43, **UNCERTAINTY)
+    for key in ('mean', 'std', 'p_over_threshold'):
+        np.testing.assert_array_equal(a[key], b[key])
+    np.testing.assert_array_equal(a['percentiles']['P90'], b['percentiles']['P90'])
+    assert not np.array_equal(a['mean'], c['mean'])
+
+
+def test_result_does_not_depend_on_the_block_size(master, spec, monkeypatch):
+    whole = montecarlo.simulate_monte_carlo(spec, samples=50, seed=5, **UNCERTAINTY)
+    monkeypatch.setattr(batch, 'MAX_BLOCK_CELLS', master.n_rows * 7)
+    blocked = montecarlo.simulate_monte_carlo(spec, samples=50, seed=5, **UNCERTAINTY)
+    np.testing.assert_allclose(whole['percentiles']['P50'], blocked['percentiles']['P50'], rtol=1e-12)
+    np.testing.assert_allclose(whole['mean'], blocked['mean'], rtol=1e-12)
+
+
+@pytest.mark.parametrize("uncertainty", [
+    {},
+    {'oee': {'dist': 'none'}, 'demanda': {'dist': 'none'}},
+    {'oee': {'dist': 'uniform', 'low': 1.0, 'high': 1.0}, 'demanda': {'dist': 'normal', 'sd': 0.0}},
+])
+def test_without_uncertainty_matches_simulate(spec, uncertainty):
+    result = montecarlo.simulate_monte_carlo(spec, samples=20, seed=1, percentiles=(5, 50, 95), **uncertainty)
+    expected, _ = sc.simulate(None, dias_laborales=spec.dias_laborales, overrides_list=spec.overrides,
+                              horas_turno=spec.horas_turno, center_configs=spec.center_configs)
+    for centro, value in expected.summary.set_index('Centro')['Saturacion'].items():
+        j = result['centros'].index(centro)
+        assert result['mean'][j] == pytest.approx(value, rel=1e-9, abs=1e-12)
+        assert result['deterministic'][j] == pytest.approx(value, rel=1e-9, abs=1e-12)
+        assert result['percentiles']['P5'][j] == result['percentiles']['P95'][j] == pytest.approx(value, rel=1e-9, abs=1e-12)
+    assert np.allclose(result['std'], 0)
+
+
+def test_normal_factors_stay_positive():
+    rng = np.random.default_rng(0)
+    factors = montecarlo._draw(rng, {'dist': 'normal', 'sd': 2.0, 'shared': False}, 200, 500)
+    assert factors.min() == montecarlo.MIN_NORMAL_FACTOR
+    assert (factors > 0).all()
+
+
+@pytest.mark.parametrize("params", [
+    {'oee': {'dist': 'beta'}},
+    {'demanda': {'dist': 'normal', 'sd': -0.1}},
+    {'demanda': {'dist': 'uniform', 'low': 0.0, 'high': 1.1}},
+    {'oee': {'dist': 'triangular', 'low': 0.9, 'mode': 1.2, 'high': 1.1}},
+    {'samples': 0},
+    {'percentiles': (50, 101)},
+])
+def test_invalid_parameters(spec, params):
+    with pytest.raises(projection.InvalidQuery):
+        montecarlo.simulate_monte_carlo(spec, **{'samples': 10, **params})
@@ -0,0 +1,109 @@
+"""
+Pruebas del optimizador de traslados (optimizer.py): traslados permitidos, máximo que nunca
+sube y resultado reproducible con simulate().
+
+    python -m pytest -q test_optimizer.py
+"""
+import types
+
+import pytest
+
+from backend.core import optimizer, projection
+from benchmarks.environment import simulation_core as sc
+
+PARAMS = dict(dias_laborales=230, horas_turno=16)
+
+
+def saturation_by_centro(overrides, center_configs):
+    result, _ = sc.simulate(None, overrides_list=overrides, center_configs=center_configs, **PARAMS)
+    return result.summary.set_index('Centro')['Saturacion'], result.detail
+
+
+@pytest.fixture(params=['spread', 'pair'])
+def problem(request, master, override):
+    """
+    Escenario de partida (un override y un centro a 24 h) y tabla de compatibilidad: los seis
+    centros más cargados hacia los dos menos cargados, o el más cargado solo hacia el segundo
+    (el destino se llena enseguida y la búsqueda tiene que tenerlo en cuenta).
+    """
+    center_configs = {str(master.centros[-1]): {'shifts': 24}}
+    base = [override(master.articulo[10], str(master.centro[10]), oee_override=0.4)]
+    sat, _ = saturation_by_centro(base, center_configs)
+    ranked = sat.sort_values(ascending=False).index.tolist()
+    if request.param == 'spread':
+        compatibility = {c: ranked[-2:] for c in ranked[:6]}
+    else:
+        compatibility = {ranked[0]: [ranked[1]]}
+    spec = types.SimpleNamespace(overrides=base, center_configs=center_configs, **PARAMS)
+    return spec, compatibility
+
+
+def plan_overrides(plan, count=None):
+    overrides = plan['overrides']
+    keep = len(overrides) - len(plan['moves']) + (len(plan['moves']) if count is None else count)
+    return [types.SimpleNamespace(**ov) for ov in overrides[:keep]]
+
+
+def test_moves_are_feasible(problem):
+    spec, compatibility = problem
+    plan = optimizer.optimize_moves(spec, compatibility=compatibility, max_moves=40)
+    assert plan['moves']
+
+    seen = set()
+    for i, move in enumerate(plan['moves']):
+        # El artículo está en ese centro justo antes del traslado, y el destino está permitido
+        _, detail = saturation_by_centro(plan_overrides(plan, i), spec.center_configs)
+        rows = detail[(detail['Articulo'] == move['articulo']) & (detail['Centro'] == move['centro'])]
+        assert len(rows)
+        assert move['new_centro'] in compatibility[move['centro']]
+        assert move['new_centro'] != move['centro']
+        assert (move['articulo'], move['centro']) not in seen
+        seen.add((move['articulo'], move['centro']))
+
+
+def test_max_saturation_never_increases(problem):
+    spec, compatibility = problem
+    plan = optimizer.optimize_moves(spec, compatibility=compatibility, max_moves=40)
+    peaks = [saturation_by_centro(plan_overrides(plan, i), spec.center_configs)[0].max()
+             for i in range(len(plan['moves']) + 1)]
+    assert all(b < a for a, b in zip(peaks, peaks[1:]))
+    assert plan['max_antes']['saturacion'] == pytest.approx(peaks[0], rel=1e-9)
+    assert plan['max_despues']['saturacion'] == pytest.approx(peaks[-1], rel=1e-9)
+
+
+def test_applying_the_moves_reproduces_the_result(problem):
+    spec, compatibility = problem
+    plan = optimizer.optimize_moves(spec, compatibility=compatibility, max_moves=40)
+    for overrides, key in ((spec.overrides, 'saturacion_antes'), (plan_overrides(plan), 'saturacion_despues')):
+        sat, _ = saturation_by_centro(overrides, spec.center_configs)
+        for centro, value in sat.items():
+            assert plan[key][plan['centros'].index(centro)] == pytest.approx(value, rel=1e-9, abs=1e-12)
+
+
+def test_target_and_max_moves_stop_the_search(problem):
+    spec, compatibility = problem
+    full = optimizer.optimize_moves(spec, compatibility=compatibility, max_moves=40)
+    assert len(full['moves']) > 1
+
+    capped = optimizer.optimize_moves(spec, compatibility=compatibility, max_moves=1)
+    assert capped['moves'] == full['moves'][:1]
+
+    reached = optimizer.optimize_moves(spec, compatibility=compatibility, max_moves=40,
+                                       target=full['max_antes']['saturacion'])
+    assert reached['moves'] == []
+
+
+def test_allowed_targets_per_article_to_a_new_centro(master, problem):
+    spec, _ = problem
+    sat, detail = saturation_by_centro(spec.overrides, spec.center_configs)
+    top = sat.idxmax()
+    articulo = detail.loc[detail['Centro'] == top].sort_values('Saturacion').iloc[-1]['Articulo']
+    plan = optimizer.optimize_moves(spec, allowed_targets={articulo: ["NUEVA"]}, max_moves=3)
+    assert plan['moves'] == [{**plan['moves'][0], 'articulo': articulo, 'centro': top, 'new_centro': "NUEVA"}]
+    assert "NUEVA" in plan['centros']
+
+
+@pytest.mark.parametrize("params", [{}, {"compatibility": {"504": ["506"]}, "max_moves": 0}])
+def test_invalid_parameters(master, params):
+    with pytest.raises(projection.InvalidQuery):
+        optimizer.optimize_moves(types.SimpleNamespace(), **params)
@@ -0,0 +1,117 @@
+"""
+Pruebas del filtrado, ordenación, paginación y proyección del detalle en el servidor
+(projection.py y los parámetros de consulta de /api/simulate/*).
+
+    python -m pytest -q test_projection.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.core import projection
+from benchmarks.environment import simulation_core as sc
+
+
+@pytest.fixture
+def result(master):
+    result, _ = sc.simulate(None)
+    return result
+
+
+def test_centros_filter(result):
+    centros = [str(c) for c in result.summary['Centro'][:2]]
+    projected, page = result.project(centros=f"{centros[0]}, {centros[1]},")
+
+    expected = result.detail[result.detail['Centro'].astype(str).isin(centros)]
+    pd.testing.assert_frame_equal(projected.detail, expected)
+    assert sorted(projected.summary['Centro'].astype(str)) == sorted(centros)
+    assert page['total_rows'] == len(expected) and page['next_offset'] is None
+    # Las posiciones de fila del maestro se conservan (las usa la preview incremental)
+    assert projection.row_positions(projected.detail) == expected.index.tolist()
+
+
+def test_columns_selection_keeps_order(result):
+    projected, _ = result.project(columns="Saturacion,Articulo,Centro")
+    assert list(projected.detail.columns) == ['Saturacion', 'Articulo', 'Centro']
+    assert len(projected.detail) == len(result.detail)
+    pd.testing.assert_frame_equal(projected.summary, result.summary)
+
+
+def test_optional_column_missing_from_master_is_omitted(result):
+    assert 'Setup (h)' not in result.detail.columns
+    projected, _ = result.project(columns="Articulo,Setup (h)")
+    assert list(projected.detail.columns) == ['Articulo']
+
+
+@pytest.mark.parametrize("sort, ascending", [("Saturacion", True), ("-Saturacion", False)])
+def test_sort(result, sort, ascending):
+    projected, _ = result.project(sort=sort)
+    values = projected.detail['Saturacion'].to_numpy()
+    assert len(values) == len(result.detail)
+    assert np.all(np.diff(values) >= 0) if ascending else np.all(np.diff(values) <= 0)
+
+
+def test_sort_by_several_keys_is_stable(result):
+    projected, _ = result.project(sort="Centro,-Horas_Totales")
+    expected = result.detail.sort_values(['Centro', 'Horas_Totales'], ascending=[True, False], kind='mergesort')
+    assert projected.detail.index.tolist() == expected.index.tolist()
+
+
+@pytest.mark.parametrize("limit, offset, returned, next_offset", [
+    (10, 0, 10, 10),
+    (10, 1990, 10, None),      # última página exacta
+    (10, 1995, 5, None),       # última página incompleta
+    (10, 2000, 0, None),       # justo al final
+    (10, 5000, 0, None),       # más allá del final
+    (None, 1999, 1, None),     # sin límite: hasta el final
+])
+def test_limit_offset_boundaries(result, limit, offset, returned, next_offset):
+    projected, page = result.project(sort="-Saturacion", limit=limit, offset=offset)
+    expected = result.detail.sort_values('Saturacion', ascending=False, kind='mergesort').iloc[offset:][:returned]
+    assert projected.detail.index.tolist() == expected.index.tolist()
+    assert page == {"total_rows": 2000, "offset": offset, "limit": limit,
+                    "returned": returned, "next_offset": next_offset}
+
+
+def test_pages_cover_the_detail_once(result):
+    seen, offset = [], 0
+    while offset is not None:
+        projected, page = result.project(limit=700, offset=offset)
+        seen += projected.detail.index.tolist()
+        offset = page['next_offset']
+    assert seen == result.detail.index.tolist()
+
+
+def test_summary_only(result):
+    projected, page = result.project(summary_only=True, limit=10)
+    assert projected.detail.empty and list(projected.detail.columns) == list(result.detail.columns)
+    pd.testing.assert_frame_equal(projected.summary, result.summary)
+    assert page['total_rows'] == len(result.detail) and page['returned'] == 0 and page['next_offset'] is None
+
+
+@pytest.mark.parametrize("params", [
+    {"columns": "Articulo,NoExiste"},
+    {"sort": "NoExiste"},
+    {"sort": "-NoExiste"},
+    {"columns": "NoExiste", "summary_only": "true"},
+])
+def test_unknown_column_or_sort_key_is_400(client, params):
+    response = client.get("/api/simulate/base", params=params)
+    assert response.status_code == 400
+    assert "NoExiste" in response.json()["detail"]
+
+
+def test_query_through_the_api(client, master):
+    expected, _ = sc.simulate(None)
+    response = client.get("/api/simulate/base", params={
+        "columns": "Articulo,Centro,Saturacion", "sort": "-Saturacion", "limit": 5, "offset": 3,
+    })
+    assert response.status_code == 200
+    body = response.json()
+    top = expected.detail.sort_values('Saturacion', ascending=False, kind='mergesort').iloc[3:8]
+    assert [row['Articulo'] for row in body['detail']] == top['Articulo'].tolist()
+    assert list(body['detail'][0]) == ['Articulo', 'Centro', 'Saturacion']
+    assert body['meta']['page'] == {"total_rows": 2000, "offset": 3, "limit": 5, "returned": 5, "next_offset": 8}
+
+    assert client.get("/api/simulate/base", params={"limit": 0}).status_code == 422
+    assert client.get("/api/simulate/base", params={"offset": -1}).status_code == 422
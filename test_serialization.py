@@ -0,0 +1,126 @@
+"""
+Pruebas de los formatos de respuesta (JSON por filas, columnar, Arrow IPC) y de la negociación.
+
+    python -m pytest -q test_serialization.py
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.core import serialization
+from benchmarks.environment import simulation_core as sc
+
+pa = serialization.pa
+# pyarrow es opcional en el servidor (sin él el formato Arrow se rechaza)
+needs_arrow = pytest.mark.skipif(pa is None, reason="pyarrow no está instalado")
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'Articulo': pd.array(['A1', None, 'A3'], dtype='str'),
+        'Centro': ['504', '506', None],
+        'Saturacion': [0.5, np.nan, np.inf],
+        'Horas_Totales': np.array([1.25, 2.5, -np.inf], dtype=np.float32),
+        'Cantidad': np.array([1, 2, 3], dtype=np.int64),
+    })
+
+
+# Lo que debe ver el cliente: nulos de texto como null y NaN/inf numéricos como 0
+EXPECTED = {
+    'Articulo': ['A1', None, 'A3'],
+    'Centro': ['504', '506', None],
+    'Saturacion': [0.5, 0.0, 0.0],
+    'Horas_Totales': [1.25, 2.5, 0.0],
+    'Cantidad': [1, 2, 3],
+}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """Cada prueba se repite con orjson y con el json estándar (orjson es opcional)."""
+    if request.param == 'json':
+        monkeypatch.setattr(serialization, 'orjson', None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson no está instalado")
+    return request.param
+
+
+def test_records_round_trip(frame, encoder):
+    rows = json.loads(serialization.encode_frame(frame, serialization.FORMAT_RECORDS))
+    assert rows == [dict(zip(EXPECTED, values)) for values in zip(*EXPECTED.values())]
+
+
+def test_columnar_round_trip(frame, encoder):
+    columns = json.loads(serialization.encode_frame(frame, serialization.FORMAT_COLUMNAR))
+    assert columns == EXPECTED
+
+
+def test_json_body_keeps_parts_and_meta(frame, encoder):
+    detail = serialization.encode_frame(frame, serialization.FORMAT_COLUMNAR)
+    summary = serialization.encode_frame(frame.iloc[:1], serialization.FORMAT_RECORDS)
+    body = json.loads(serialization.json_body(detail, summary, {"version": np.int64(3), "nan": float('nan')}))
+    assert body['detail'] == EXPECTED
+    assert body['summary'][0]['Articulo'] == 'A1'
+    assert body['meta']['version'] == 3
+
+
+@needs_arrow
+def test_arrow_round_trip(frame):
+    summary = frame.iloc[:2]
+    data = serialization.arrow_stream(serialization.arrow_table(frame), summary, {"version": 3})
+    table = pa.ipc.open_stream(data).read_all()
+
+    assert table.to_pydict() == EXPECTED
+    metadata = table.schema.metadata
+    assert json.loads(metadata[b'meta']) == {"version": 3}
+    assert [row['Centro'] for row in json.loads(metadata[b'summary'])] == ['504', '506']
+
+
+def test_sanitize_only_copies_dirty_columns(frame):
+    clean = frame[['Articulo', 'Cantidad']]
+    assert serialization.sanitize_numeric(clean) is clean
+    assert serialization.sanitize_numeric(frame)['Saturacion'].tolist() == [0.5, 0.0, 0.0]
+
+
+@pytest.mark.parametrize("format_param, accept, expected", [
+    (None, None, serialization.FORMAT_RECORDS),
+    (None, "application/vnd.rpk.columnar+json", serialization.FORMAT_COLUMNAR),
+    (None, "application/vnd.apache.arrow.stream, */*", serialization.FORMAT_ARROW),
+    ("ARROW", "application/json", serialization.FORMAT_ARROW),
+    ("json", "application/vnd.apache.arrow.stream", serialization.FORMAT_RECORDS),
+])
+@needs_arrow
+def test_negotiate_format(format_param, accept, expected):
+    assert serialization.negotiate_format(format_param, accept) == expected
+
+
+def test_unknown_format_is_rejected(client):
+    with pytest.raises(serialization.UnsupportedFormat):
+        serialization.negotiate_format("xml")
+    response = client.get("/api/simulate/base", params={"format": "xml"})
+    assert response.status_code == 406
+
+
+@needs_arrow
+def test_api_formats_return_the_same_result(client):
+    """Los tres formatos de /api/simulate/base devuelven el resultado de simulate()."""
+    expected, _ = sc.simulate(None)
+    expected_detail = serialization.sanitize_numeric(expected.detail)
+
+    records = client.get("/api/simulate/base").json()
+    columnar = client.get("/api/simulate/base", params={"format": "columnar"})
+    arrow = client.get("/api/simulate/base", headers={"Accept": serialization.MEDIA_TYPES["arrow"]})
+    assert columnar.headers["content-type"] == serialization.MEDIA_TYPES["columnar"]
+    assert arrow.headers["content-type"] == serialization.MEDIA_TYPES["arrow"]
+
+    from_records = pd.DataFrame(records['detail'])
+    from_columnar = pd.DataFrame(columnar.json()['detail'])
+    from_arrow = pa.ipc.open_stream(arrow.content).read_all().to_pandas()
+    for detail in (from_records, from_columnar, from_arrow):
+        pd.testing.assert_frame_equal(detail, expected_detail.reset_index(drop=True),
+                                      check_dtype=False, rtol=1e-9)
+    assert records['summary'] == serialization.to_records(expected.summary)
+    assert pd.DataFrame(columnar.json()['summary']).to_dict('records') == records['summary']
@@ -0,0 +1,70 @@
+"""
+Pruebas de la API (app completa con TestClient) sobre un maestro sintético.
+
+    python -m pytest -q test_server.py
+"""
+import pytest
+
+from benchmarks import environment
+from benchmarks.environment import simulation_core as sc
+from backend.api.warmup import WarmUp
+
+
+def test_ready_recovers_after_failed_warmup(master, tmp_path):
+    excel_path = sc.EXCEL_PATH
+    with pytest.raises(sc.MasterLoadError):
+        environment.use_master(str(tmp_path / "no_existe.xlsx"))
+
+    warmup = WarmUp()
+    warmup.start()
+    warmup.wait(30)
+    status = warmup.status()
+    assert status["status"] == "failed" and not status["ready"]
+
+    # Una petición posterior carga el maestro: /ready deja de responder 503
+    environment.use_master(excel_path)
+    status = warmup.status()
+    assert status["ready"] and status["error"] is None and status["last_error"]
+
+
+def test_ready_endpoint(client):
+    response = client.get("/ready")
+    assert response.status_code == 200 and response.json()["ready"]
+
+
+def test_profile_header_only_when_a_report_exists(client, monkeypatch):
+    from backend.api import profiling
+    monkeypatch.setattr(profiling, "ALLOWED_CLIENTS", {"*"})
+
+    assert "X-RPK-Profile" not in client.get("/health", params={"profile": "1"}).headers
+    assert "X-RPK-Profile" not in client.get("/api/master", params={"profile": "1"}).headers
+
+    response = client.get("/api/simulate/base", params={"profile": "1"})
+    report_id = response.headers["X-RPK-Profile"]
+    report = client.get(f"/api/profiles/{report_id}")
+    assert report.status_code == 200 and report.json()["status"] == "done"
+
+
+def server_timing(response):
+    """{etapa: milisegundos} de la cabecera Server-Timing."""
+    parts = (part.split(";dur=") for part in response.headers["Server-Timing"].split(", "))
+    return {name: float(ms) for name, ms in parts}
+
+
+@pytest.mark.parametrize("fmt", ["json", "arrow"])
+def test_server_timing_has_compute_and_serialize(client, fmt):
+    response = client.get("/api/simulate/base", params={"format": fmt, "dias_laborales": 231})
+    assert response.status_code == 200
+    timing = server_timing(response)
+    assert list(timing) == ["load", "overrides", "calc", "aggregate", "serialize", "total"]
+    assert timing["calc"] > 0 and timing["serialize"] > 0
+    assert timing["calc"] + timing["aggregate"] + timing["serialize"] <= timing["total"]
+    assert response.headers["Timing-Allow-Origin"] == "*"
+
+    # En caché ya no se calcula
+    cached = server_timing(client.get("/api/simulate/base", params={"format": fmt, "dias_laborales": 231}))
+    assert cached["calc"] == 0
+
+
+def test_no_server_timing_without_compute(client):
+    assert "Server-Timing" not in client.get("/health").headers
@@ -0,0 +1,240 @@
+"""
+Pruebas del motor de simulación sobre un maestro sintético (no necesitan el Excel real).
+
+    python -m pytest -q test_simulation_core.py
+"""
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import environment
+from benchmarks.environment import simulation_core as sc
+from benchmarks.synthetic_master import generate_master, generate_overrides, write_master
+
+
+def single_row(master):
+    """Una fila cuya clave (Articulo, Centro) es única y un centro donde ese artículo no está."""
+    for p in range(master.n_rows):
+        articulo, centro = master.articulo[p], master.centro[p]
+        if len(master.rows_for(articulo, centro)) == 1:
+            other = next(c for c in master.centros if c != centro and not len(master.rows_for(articulo, c)))
+            return p, articulo, centro, other
+    raise AssertionError("El maestro sintético no tiene claves únicas")
+
+
+def test_duplicate_field_last_wins(master, override):
+    p, articulo, centro, _ = single_row(master)
+    overrides = [
+        override(articulo, centro, oee_override=0.5),
+        override(articulo, centro, oee_override=0.7, ppm_override=90.0),
+        override(articulo, centro, ppm_override=120.0),
+    ]
+    positions, values, moved = sc._resolve_overrides(master, overrides)
+
+    assert positions.tolist() == [p]
+    assert values['%OEE'][0].tolist() == [p] and values['%OEE'][1].tolist() == [0.7]
+    assert values['Piezas por minuto'][1].tolist() == [120.0]
+    assert moved == {}
+
+    result, _ = sc.simulate(None, overrides_list=overrides)
+    row = result.detail.iloc[p]
+    assert row['%OEE'] == pytest.approx(0.7)
+    assert row['Piezas por minuto'] == pytest.approx(120.0)
+
+
+def test_move_then_edit_chain(master, override):
+    p, articulo, centro, other = single_row(master)
+    overrides = [
+        override(articulo, centro, new_centro=other),
+        # La fila ya está en el centro nuevo: este override la alcanza...
+        override(articulo, other, oee_override=0.6),
+        # ...y este, con el centro original, ya no
+        override(articulo, centro, oee_override=0.1),
+    ]
+    positions, values, moved = sc._resolve_overrides(master, overrides)
+
+    assert positions.tolist() == [p]
+    assert {int(k): v for k, v in moved.items()} == {p: other}
+    assert values['%OEE'][1].tolist() == [0.6]
+
+    result, _ = sc.simulate(None, overrides_list=overrides)
+    row = result.detail.iloc[p]
+    assert row['Centro'] == other
+    assert row['%OEE'] == pytest.approx(0.6)
+    # El resto de filas no cambia
+    base, _ = sc.simulate(None)
+    others = np.arange(master.n_rows) != p
+    assert np.allclose(result.detail['Horas_Totales'].to_numpy()[others],
+                       base.detail['Horas_Totales'].to_numpy()[others], equal_nan=True)
+
+
+def apply_preview(detail, summary, result, meta):
+    """Aplica una respuesta de preview como lo hace el navegador. Retorna (detail, summary)."""
+    if not meta['incremental']:
+        return result.detail.copy(), result.summary.copy()
+    detail = detail.copy()
+    rows = np.asarray(meta['detail_positions'], dtype=np.int64)
+    for col in result.detail.columns:
+        column = detail[col].to_numpy(copy=True)
+        column[rows] = result.detail[col].to_numpy()
+        detail[col] = column
+    gone = set(meta['removed_centros']) | set(result.summary['Centro'])
+    summary = pd.concat([summary[~summary['Centro'].isin(gone)], result.summary])
+    return detail, summary
+
+
+def assert_same_result(detail, summary, expected):
+    pd.testing.assert_frame_equal(detail.reset_index(drop=True), expected.detail.reset_index(drop=True),
+                                  check_dtype=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(summary.sort_values('Centro').reset_index(drop=True),
+                                  expected.summary.sort_values('Centro').reset_index(drop=True),
+                                  check_dtype=False, rtol=1e-9)
+
+
+def test_incremental_preview_matches_full_simulation(master, override):
+    p, articulo, centro, other = single_row(master)
+    ovs = [override(**ov) for ov in generate_overrides(environment.master_frame(sc.EXCEL_PATH), 15, seed=3)]
+    # Cada paso cambia algo respecto al anterior: altas, ediciones, traslados, turnos por centro y bajas
+    steps = [
+        ([], {}),
+        (ovs[:5], {}),
+        (ovs[:10], {}),
+        (ovs[:10] + [override(articulo, centro, new_centro=other)], {}),
+        (ovs[:10] + [override(articulo, centro, new_centro=other), override(articulo, other, oee_override=0.3)], {}),
+        (ovs, {str(other): {'shifts': 24}}),
+        (ovs[3:], {str(centro): {'shifts': 8}}),
+        (ovs[3:], {}),
+        ([], {}),
+    ]
+    detail = summary = token = None
+    for overrides, center_configs in steps:
+        result, meta = sc.simulate_preview_incremental("test", overrides, dias_laborales=230, horas_turno=16,
+                                                       center_configs=center_configs, base_token=token)
+        detail, summary = apply_preview(detail, summary, result, meta)
+        token = meta['preview_token']
+        expected, _ = sc.simulate(None, dias_laborales=230, overrides_list=overrides,
+                                  horas_turno=16, center_configs=center_configs)
+        assert_same_result(detail, summary, expected)
+    assert meta['incremental']
+
+
+def test_rebase_after_reload_matches_cold_recompute(tmp_path, override):
+    excel_path = str(tmp_path / "MAESTRO FLEJE_v1.xlsx")
+    df = generate_master(300, centros=8, shared_articles=0.1, seed=11)
+    write_master(df, excel_path, excel=True)
+    master = environment.use_master(excel_path)
+
+    ovs = [override(**ov) for ov in generate_overrides(environment.master_frame(excel_path), 12, seed=5)]
+    params = dict(dias_laborales=230, overrides_list=ovs, horas_turno=16,
+                  center_configs={str(master.centros[0]): {'shifts': 24}})
+    sc.simulate(None, **params)
+
+    # Nueva versión del Excel: filas modificadas, una baja (con override) y un alta
+    changed = df.copy()
+    changed.loc[[3, 40, 41], 'Volumen anual'] *= 3
+    changed.loc[7, '%OEE'] = 0.5
+    changed = changed.drop(index=changed.index[changed['Articulo'] == ovs[0].articulo][:1])
+    changed = pd.concat([changed, df.iloc[[10]].assign(Articulo='NUEVO1')], ignore_index=True)
+    changed.to_excel(excel_path, index=False)
+    assert sc.reload_master()
+
+    hits = sc.cache_stats()['hits']
+    rebased, _ = sc.simulate(None, **params)
+    assert sc.cache_stats()['hits'] == hits + 1
+    sc._result_cache.clear()
+    cold, _ = sc.simulate(None, **params)
+    assert rebased.master_version == cold.master_version != master.version
+    assert_same_result(rebased.detail, rebased.summary, cold)
+
+
+def test_preview_delta_only_against_the_clients_result(master, override):
+    p, articulo, centro, _ = single_row(master)
+    s1 = []
+    s2 = [override(articulo, centro, demanda_override=5e6)]
+
+    _, meta1 = sc.simulate_preview_incremental("cross", s1)
+    # Dos peticiones sobre el mismo resultado (ráfaga o respuestas desordenadas): la segunda
+    # ya no parte de lo que guarda la sesión y recibe el resultado completo
+    _, meta2 = sc.simulate_preview_incremental("cross", s2, base_token=meta1['preview_token'])
+    assert meta2['incremental']
+    result, meta3 = sc.simulate_preview_incremental("cross", s1, base_token=meta1['preview_token'])
+    assert not meta3['incremental']
+    assert result.detail['Volumen anual'].iloc[p] == master.base['Volumen anual'][p]
+
+    # El cliente se queda con S2 (la respuesta de S1 llegó tarde y se descartó): su token ya
+    # no es el de la sesión y volver a S1 devuelve también el resultado completo
+    result, meta4 = sc.simulate_preview_incremental("cross", s1, base_token=meta2['preview_token'])
+    assert not meta4['incremental']
+    expected, _ = sc.simulate(None)
+    assert_same_result(result.detail, result.summary, expected)
+
+
+def test_concurrent_previews_of_one_session_get_one_delta(master, override):
+    from concurrent.futures import ThreadPoolExecutor
+    _, articulo, centro, _ = single_row(master)
+    _, meta = sc.simulate_preview_incremental("burst", [])
+    requests = [[override(articulo, centro, oee_override=0.3 + i / 100)] for i in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        metas = list(pool.map(lambda ovs: sc.simulate_preview_incremental("burst", ovs, base_token=meta['preview_token'])[1], requests))
+    assert sum(m['incremental'] for m in metas) == 1
+
+
+def counting_build(monkeypatch, delay=0.0):
+    """Sustituye _build_master por una versión que cuenta sus llamadas (y tarda `delay`)."""
+    calls = []
+    build = sc._build_master
+
+    def counted():
+        calls.append(sc.EXCEL_PATH)
+        time.sleep(delay)
+        return build()
+    monkeypatch.setattr(sc, '_build_master', counted)
+    return calls
+
+
+def test_concurrent_first_requests_load_the_master_once(master, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    sc.reset_master()
+    calls = counting_build(monkeypatch, delay=0.2)
+    with ThreadPoolExecutor(8) as pool:
+        loaded = list(pool.map(lambda _: sc.get_master(), range(8)))
+    assert len(calls) == 1
+    assert all(m is loaded[0] for m in loaded)
+    assert loaded[0].version == master.version
+
+
+def test_load_failure_is_cached_and_retried(tmp_path, monkeypatch):
+    excel_path = str(tmp_path / "MAESTRO FLEJE_v1.xlsx")
+    monkeypatch.setattr(sc, 'LOAD_RETRY_SECONDS', 0.5)
+    sc.set_master(excel_path)
+    calls = counting_build(monkeypatch)
+
+    with pytest.raises(sc.MasterLoadError):
+        sc.get_master()
+    failed_at = time.monotonic()
+    # El Excel aparece, pero hasta LOAD_RETRY_SECONDS se devuelve el mismo error sin leerlo
+    write_master(generate_master(200, centros=5, seed=2), excel_path, excel=True)
+    with pytest.raises(sc.MasterLoadError):
+        sc.get_master()
+    assert len(calls) == 1 and time.monotonic() - failed_at < sc.LOAD_RETRY_SECONDS
+
+    time.sleep(sc.LOAD_RETRY_SECONDS)
+    assert sc.get_master().n_rows == 200
+    assert len(calls) == 2
+
+
+def test_overlay_only_copies_the_columns_it_changes(master, override):
+    p, articulo, centro, _ = single_row(master)
+    overlay = sc.build_overlay(master, [override(articulo, centro, oee_override=0.5, demanda_override=None)])
+
+    assert overlay.patched(master, 'Volumen anual') is master.base['Volumen anual']
+    oee = overlay.patched(master, '%OEE')
+    assert oee is not master.base['%OEE']
+    assert oee[p] == pytest.approx(0.5)
+    others = np.arange(master.n_rows) != p
+    np.testing.assert_array_equal(oee[others], master.base['%OEE'][others])
+    # Con `rows` solo se devuelven esas filas, también parcheadas
+    rows = np.unique([0, p, master.n_rows - 1])
+    np.testing.assert_array_equal(overlay.patched(master, '%OEE', rows), oee[rows])